@@ -7,14 +7,56 @@ using texture painting in Stencil mode, ensuring compatibility with Unreal Engin
 import bpy
 import os
 import importlib
-from bpy.props import StringProperty, BoolProperty, EnumProperty
+from bpy.props import StringProperty, BoolProperty, EnumProperty, IntProperty, FloatProperty
 from bpy.types import Operator, Panel, AddonPreferences
 from bpy_extras.io_utils import ImportHelper, ExportHelper
+from . import profiling
 from . import helpers
 from . import brush_manager
 from . import preferences
+from . import resample
+from . import scratch
+from . import pixels
+from . import precision
+from . import dds
+from . import import_cache
+from . import udim
+from . import stencil_cache
+from . import image_memory
+from . import shared_images
+from . import registry
+from . import panel_state
+from . import overlay
+from . import async_export
+from . import usd_incremental
+from . import library
+from . import decal
+from . import texel_maps
+from . import mirror
+from . import paint_proxy
 
 # Force reload of submodules to ensure changes are picked up
+importlib.reload(profiling)
+importlib.reload(paint_proxy)
+importlib.reload(resample)
+importlib.reload(scratch)
+importlib.reload(pixels)
+importlib.reload(precision)
+importlib.reload(dds)
+importlib.reload(import_cache)
+importlib.reload(udim)
+importlib.reload(stencil_cache)
+importlib.reload(image_memory)
+importlib.reload(shared_images)
+importlib.reload(registry)
+importlib.reload(overlay)
+importlib.reload(async_export)
+importlib.reload(usd_incremental)
+importlib.reload(library)
+importlib.reload(decal)
+importlib.reload(texel_maps)
+importlib.reload(mirror)
+importlib.reload(panel_state)
 importlib.reload(helpers)
 importlib.reload(brush_manager)
 importlib.reload(preferences)
@@ -49,6 +91,7 @@ class TATTOO_OT_import_metahuman_fbx(Operator, ImportHelper):
         subtype='FILE_PATH'
     )
 
+    @profiling.operator
     def execute(self, context):
         # Force Viewport to SOLID mode to prevent GPU driver crashes during heavy import
         # This avoids the GPU trying to render complex shaders while geometry is being processed
@@ -64,29 +107,12 @@ class TATTOO_OT_import_metahuman_fbx(Operator, ImportHelper):
             self.report({'ERROR'}, "No file selected")
             return {'CANCELLED'}
 
-        # Import the FBX file
-        # Optimized for static meshes (Skin only, no bones)
-        bpy.ops.import_scene.fbx(
-            filepath=filepath,
-            use_anim=False,
-            ignore_leaf_bones=True,
-            force_connect_children=False,
-            use_custom_normals=False,  # Changed to False to prevent viewport crashes
-            use_image_search=False     # Prevent hangs searching for missing textures
-        )
-
-        context.view_layer.update()
-
-        # Find the imported body object
-        body_obj = helpers.get_inzoi_body_object()
+        # Import the FBX file and find the imported body object
+        body_obj = helpers.import_inzoi_fbx(filepath)
         if not body_obj:
             self.report({'WARNING'}, "No body object found in imported FBX")
             return {'CANCELLED'}
 
-        # Ensure UV map exists (required for texture painting)
-        if not body_obj.data.uv_layers:
-            body_obj.data.uv_layers.new(name="UVMap")
-
         # Create material with texture
         material = helpers.create_character_material(body_obj, self.texture_path if self.texture_path else "")
 
@@ -108,13 +134,30 @@ class TATTOO_OT_import_metahuman_fbx(Operator, ImportHelper):
         return {'RUNNING_MODAL'}
 
 
+class TATTOO_OT_clear_import_cache(Operator):
+    """Delete every cached FBX import"""
+    bl_idname = "tattoo.clear_import_cache"
+    bl_label = "Clear Import Cache"
+
+    @profiling.operator
+    def execute(self, context):
+        try:
+            import_cache.clear()
+            self.report({'INFO'}, "Import cache cleared")
+            return {'FINISHED'}
+        except Exception as e:
+            self.report({'ERROR'}, str(e))
+            return {'CANCELLED'}
+
+
 class TATTOO_OT_resize_texture_to_4k(Operator):
     """Resize the active texture to 4K resolution"""
     bl_idname = "tattoo.resize_texture_to_4k"
     bl_label = "Resize Texture to 4K"
 
+    @profiling.operator
     def execute(self, context):
-        obj = context.active_object
+        obj = paint_proxy.source_object(context.active_object)
         if not obj or not obj.active_material:
             self.report({'ERROR'}, "No active object with material selected")
             return {'CANCELLED'}
@@ -130,7 +173,8 @@ class TATTOO_OT_resize_texture_to_4k(Operator):
             self.report({'ERROR'}, "Invalid image dimensions - image may not be loaded properly")
             return {'CANCELLED'}
 
-        current_size = max(image.size[0], image.size[1])
+        width, height = image.size
+        current_size = max(width, height)
 
         # Get target resolution from preferences
         try:
@@ -142,14 +186,27 @@ class TATTOO_OT_resize_texture_to_4k(Operator):
         except:
             target_resolution = 4096  # Default to 4K in case of error
 
+        if udim.is_tiled(image):
+            # Every tile is checked on its own
+            resized = udim.resize_tiles(image, target_resolution)
+            if resized:
+                shared_images.detach(image)
+            panel_state.invalidate(obj)
+            self.report({'INFO'}, f"Resized {resized} of {len(image.tiles)} UDIM tiles to {target_resolution}")
+            return {'FINISHED'}
+
         if current_size >= target_resolution:
-            self.report({'INFO'}, f"Texture is already {current_size}x{current_size}, no resize needed")
+            self.report({'INFO'}, f"Texture is already {width}x{height}, no resize needed")
             return {'FINISHED'}
 
-        # Resize the image to target resolution
-        image.scale(target_resolution, target_resolution)
+        # Resize the image to target resolution, keeping the aspect ratio
+        new_width, new_height = resample.fit_size(width, height, target_resolution)
+        image = pixels.resize_image(image, new_width, new_height)
+        # No longer the file at the resolution its key names
+        shared_images.detach(image)
+        panel_state.invalidate(obj)
 
-        self.report({'INFO'}, f"Resized texture from {current_size}x{current_size} to {target_resolution}x{target_resolution}")
+        self.report({'INFO'}, f"Resized texture from {width}x{height} to {new_width}x{new_height}")
         return {'FINISHED'}
 
 
@@ -158,6 +215,7 @@ class TATTOO_OT_setup_tattoo_brush(Operator):
     bl_idname = "tattoo.setup_tattoo_brush"
     bl_label = "Setup Tattoo Brush"
 
+    @profiling.operator
     def execute(self, context):
         try:
             brush = brush_manager.setup_tattoo_brush()
@@ -182,6 +240,7 @@ class TATTOO_OT_load_tattoo_image(Operator, ImportHelper):
         default=True
     )
 
+    @profiling.operator
     def execute(self, context):
         filepath = self.filepath
         if not filepath:
@@ -214,12 +273,187 @@ class TATTOO_OT_load_tattoo_image(Operator, ImportHelper):
         return {'RUNNING_MODAL'}
 
 
+class TATTOO_OT_pick_library_stencil(Operator):
+    """Load this tattoo from the library as the stencil"""
+    bl_idname = "tattoo.pick_library_stencil"
+    bl_label = "Pick Tattoo"
+
+    filepath: StringProperty(subtype='FILE_PATH', options={'HIDDEN'})
+
+    auto_resize: BoolProperty(
+        name="Auto-Resize to 4K",
+        description="Resize image to 4K maintaining aspect ratio to prevent pixelation",
+        default=True
+    )
+
+    @classmethod
+    def poll(cls, context):
+        return context.mode == 'PAINT_TEXTURE'
+
+    @profiling.operator
+    def execute(self, context):
+        try:
+            brush_manager.load_tattoo_image(self.filepath, self.auto_resize)
+        except Exception as e:
+            self.report({'ERROR'}, str(e))
+            return {'CANCELLED'}
+        self.report({'INFO'}, f"Loaded tattoo image: {os.path.basename(self.filepath)}")
+        return {'FINISHED'}
+
+
+class TATTOO_OT_library_page(Operator):
+    """Show another page of the tattoo library"""
+    bl_idname = "tattoo.library_page"
+    bl_label = "Library Page"
+
+    step: IntProperty(default=1)
+
+    @profiling.operator
+    def execute(self, context):
+        current = library.current()
+        if current is not None:
+            current.set_page(current.page + self.step)
+        return {'FINISHED'}
+
+
+class TATTOO_OT_refresh_library(Operator):
+    """Scan the tattoo library folder again"""
+    bl_idname = "tattoo.refresh_library"
+    bl_label = "Refresh Library"
+
+    @profiling.operator
+    def execute(self, context):
+        library.refresh()
+        return {'FINISHED'}
+
+
+class TATTOO_OT_stamp_decal(Operator, ImportHelper):
+    """Project a tattoo onto the surface at the 3D cursor without painting"""
+    bl_idname = "tattoo.stamp_decal"
+    bl_label = "Stamp Tattoo at Cursor"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    filename_ext = ".png;.jpg;.jpeg;.tga;.bmp"
+    filter_glob: StringProperty(default="*.png;*.jpg;*.jpeg;*.tga;*.bmp", options={'HIDDEN'})
+
+    size: FloatProperty(
+        name="Size",
+        description="Width of the tattoo on the surface",
+        default=0.1,
+        min=0.001,
+        subtype='DISTANCE'
+    )
+
+    rotation: FloatProperty(
+        name="Rotation",
+        description="Rotation around the surface normal (0 = tattoo up is world up)",
+        default=0.0,
+        subtype='ANGLE'
+    )
+
+    opacity: FloatProperty(
+        name="Opacity",
+        default=1.0,
+        min=0.0,
+        max=1.0,
+        subtype='FACTOR'
+    )
+
+    @profiling.operator
+    def execute(self, context):
+        obj = paint_proxy.source_object(context.active_object)
+        if not obj or obj.type != 'MESH' or not obj.active_material:
+            self.report({'ERROR'}, "No active mesh with material selected")
+            return {'CANCELLED'}
+
+        try:
+            surface = decal.MeshSurface(obj)
+            hit = surface.snap(context.scene.cursor.location)
+            if hit is None:
+                self.report({'ERROR'}, "Could not find the surface under the 3D cursor")
+                return {'CANCELLED'}
+            placement = decal.Placement(hit[0], hit[1], size=self.size, rotation=self.rotation, opacity=self.opacity)
+
+            stencil_image = brush_manager.get_stencil_image(self.filepath)
+            # Stencil and target are blended in display space, as the export composites layers
+            stencil = pixels.to_rgba(pixels.read_display(stencil_image, tag="decal_stencil"))
+            image, mode = decal.target_image(obj)
+            base = pixels.read_display(image, tag="decal_base")
+            maps = texel_maps.get_maps(obj, base.shape[1], base.shape[0], surface)
+            count = decal.stamp(base, surface, stencil, placement, mode, maps)
+            pixels.write_display(image, base)
+            shared_images.detach(image)
+        except Exception as e:
+            self.report({'ERROR'}, f"Could not stamp tattoo: {str(e)}")
+            return {'CANCELLED'}
+
+        panel_state.invalidate(obj)
+        self.report({'INFO'}, f"Stamped {os.path.basename(self.filepath)} into {count} texels of {image.name}")
+        return {'FINISHED'}
+
+    def invoke(self, context, event):
+        try:
+            addon_prefs = context.preferences.addons.get(__package__)
+            if addon_prefs and addon_prefs.preferences.default_texture_path:
+                self.filepath = addon_prefs.preferences.default_texture_path
+        except:
+            pass
+
+        context.window_manager.fileselect_add(self)
+        return {'RUNNING_MODAL'}
+
+
+class TATTOO_OT_mirror_tattoo_x(Operator):
+    """Copy the tattoo layer of one side of the body to the other side"""
+    bl_idname = "tattoo.mirror_tattoo_x"
+    bl_label = "Mirror Tattoo X"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    direction: EnumProperty(
+        name="Direction",
+        items=mirror.DIRECTION_ITEMS,
+        default='POSITIVE'
+    )
+
+    @profiling.operator
+    def execute(self, context):
+        import time
+
+        obj = paint_proxy.source_object(context.active_object)
+        if not obj or obj.type != 'MESH' or not obj.active_material:
+            self.report({'ERROR'}, "No active mesh with material selected")
+            return {'CANCELLED'}
+
+        # Only a tattoo layer tells tattoos apart from the skin under them
+        image = overlay.get_layer_image(obj)
+        if not image:
+            self.report({'ERROR'}, "Add a tattoo layer and paint on it to mirror tattoos")
+            return {'CANCELLED'}
+
+        start = time.perf_counter()
+        try:
+            surface = decal.MeshSurface(obj)
+            array = pixels.read_pixels(image, tag="mirror")
+            maps = texel_maps.get_maps(obj, array.shape[1], array.shape[0], surface)
+            correspondence = mirror.get_mirror_map(maps, surface)
+            count = mirror.mirror_pixels(array, correspondence, maps.position, self.direction)
+            pixels.write_pixels(image, array)
+        except Exception as e:
+            self.report({'ERROR'}, f"Could not mirror tattoo: {str(e)}")
+            return {'CANCELLED'}
+
+        panel_state.invalidate(obj)
+        self.report({'INFO'}, f"Mirrored {count} texels of {image.name} in {time.perf_counter() - start:.2f}s")
+        return {'FINISHED'}
+
+
 class TATTOO_OT_rotate_stencil(Operator):
     """Rotate the tattoo stencil by 90 degrees"""
     bl_idname = "tattoo.rotate_stencil"
     bl_label = "Rotate Stencil 90°"
     bl_options = {'REGISTER', 'UNDO'}
 
+    @profiling.operator
     def execute(self, context):
         import math
         
@@ -238,13 +472,88 @@ class TATTOO_OT_rotate_stencil(Operator):
         return {'FINISHED'}
 
 
+class TATTOO_OT_add_tattoo_layer(Operator):
+    """Paint tattoos into a separate layer instead of the skin texture"""
+    bl_idname = "tattoo.add_tattoo_layer"
+    bl_label = "Add Tattoo Layer"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    @profiling.operator
+    def execute(self, context):
+        obj = paint_proxy.source_object(context.active_object)
+        if not obj or obj.type != 'MESH' or not obj.active_material:
+            self.report({'ERROR'}, "No active object with material selected")
+            return {'CANCELLED'}
+
+        try:
+            image = overlay.add_layer(obj)
+            if context.mode == 'PAINT_TEXTURE':
+                brush_manager.setup_tattoo_brush()
+            panel_state.invalidate(obj)
+            self.report({'INFO'}, f"Painting into tattoo layer: {image.name}")
+            return {'FINISHED'}
+        except Exception as e:
+            self.report({'ERROR'}, str(e))
+            return {'CANCELLED'}
+
+
+class TATTOO_OT_set_layer_blend(Operator):
+    """Set how the tattoo layer blends over the skin"""
+    bl_idname = "tattoo.set_layer_blend"
+    bl_label = "Tattoo Layer Blend"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    blend: EnumProperty(
+        name="Blend",
+        items=overlay.BLEND_ITEMS,
+        default='MULTIPLY'
+    )
+
+    @profiling.operator
+    def execute(self, context):
+        obj = paint_proxy.source_object(context.active_object)
+        try:
+            overlay.set_blend(obj, self.blend)
+        except Exception as e:
+            self.report({'ERROR'}, str(e))
+            return {'CANCELLED'}
+        return {'FINISHED'}
+
+
+class TATTOO_OT_remove_tattoo_layer(Operator):
+    """Remove the tattoo layer and paint straight into the skin again"""
+    bl_idname = "tattoo.remove_tattoo_layer"
+    bl_label = "Remove Tattoo Layer"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    @profiling.operator
+    def execute(self, context):
+        obj = paint_proxy.source_object(context.active_object)
+        if not overlay.get_layer_node(obj):
+            self.report({'WARNING'}, "No tattoo layer on the active object")
+            return {'CANCELLED'}
+
+        layer = overlay.get_layer_image(obj)
+        overlay.remove_layer(obj)
+        image_memory.discard(layer)
+        if context.mode == 'PAINT_TEXTURE':
+            brush_manager.setup_tattoo_brush()
+        panel_state.invalidate(obj)
+        self.report({'INFO'}, "Tattoo layer removed")
+        return {'FINISHED'}
+
+    def invoke(self, context, event):
+        # Removing the layer discards everything painted into it
+        return context.window_manager.invoke_confirm(self, event)
+
+
 class TATTOO_OT_export_tattooed_texture(Operator, ExportHelper):
     """Export the tattooed texture"""
     bl_idname = "tattoo.export_tattooed_texture"
     bl_label = "Export Tattooed Texture"
 
     filename_ext = ".png"
-    filter_glob: StringProperty(default="*.png;*.tga", options={'HIDDEN'})
+    filter_glob: StringProperty(default="*.png;*.tga;*.dds", options={'HIDDEN'})
 
     # Define the file type
     file_type: EnumProperty(
@@ -252,13 +561,35 @@ class TATTOO_OT_export_tattooed_texture(Operator, ExportHelper):
         description="Choose the file format for export",
         items=[
             ('png', "PNG", "Export as PNG format"),
-            ('tga', "TGA", "Export as TGA format")
+            ('tga', "TGA", "Export as TGA format"),
+            ('dds', "DDS", "Export as block-compressed DDS with mipmaps for Unreal")
         ],
         default='png'
     )
 
+    dds_format: EnumProperty(
+        name="Compression",
+        description="Block compression of DDS exports",
+        items=dds.FORMAT_ITEMS,
+        default='BC7'
+    )
+
+    dds_mip_filter: EnumProperty(
+        name="Mip Filter",
+        description="Filter used to build the DDS mip chain",
+        items=dds.MIP_FILTER_ITEMS,
+        default='KAISER'
+    )
+
+    background: BoolProperty(
+        name="Background Export",
+        description="Write the file in a background thread so Blender stays responsive",
+        default=True
+    )
+
+    @profiling.operator
     def execute(self, context):
-        obj = context.active_object
+        obj = paint_proxy.source_object(context.active_object)
         if not obj or not obj.active_material:
             self.report({'ERROR'}, "No active object with material selected")
             return {'CANCELLED'}
@@ -275,16 +606,50 @@ class TATTOO_OT_export_tattooed_texture(Operator, ExportHelper):
             filepath = self.filepath
             if not filepath.endswith('.png'):
                 filepath += '.png'
-        else:  # TGA
+        elif self.file_type == 'tga':
             filepath = self.filepath
             if not filepath.endswith('.tga'):
                 filepath += '.tga'
+        else:  # DDS
+            filepath = self.filepath
+            if not filepath.endswith('.dds'):
+                filepath += '.dds'
 
-        # Save the image
-        image.filepath_raw = filepath
-        image.file_format = 'PNG' if self.file_type == 'png' else 'TARGA'
-        image.save()
+        # Save the image through the NumPy encoders
+        options = {}
+        if self.file_type == 'png':
+            file_format = 'PNG'
+        elif self.file_type == 'tga':
+            file_format = 'TARGA'
+        else:
+            file_format = 'DDS_' + self.dds_format
+            options["mip_filter"] = self.dds_mip_filter
+
+        if udim.is_tiled(image):
+            try:
+                written, skipped = udim.export_tiles(image, filepath, file_format, **options)
+            except Exception as e:
+                self.report({'ERROR'}, f"Could not export UDIM tiles: {str(e)}")
+                return {'CANCELLED'}
+            panel_state.invalidate(obj)
+            self.report({'INFO'}, f"Exported {len(written)} changed UDIM tiles to {udim.export_path(filepath)} "
+                                  f"({len(skipped)} unchanged)")
+            return {'FINISHED'}
 
+        try:
+            if self.background:
+                async_export.start(image, filepath, file_format, overlay.compositor(obj), **options)
+                self.report({'INFO'}, f"Exporting tattooed texture in background to: {filepath}")
+                return {'FINISHED'}
+            pixels.save_image(image, filepath, file_format, overlay.compositor(obj), **options)
+            panel_state.invalidate(obj)
+        except Exception as e:
+            self.report({'ERROR'}, f"Could not export texture: {str(e)}")
+            return {'CANCELLED'}
+
+        if self.file_type == 'dds':
+            self.report({'INFO'}, f"Exported tattooed texture to: {filepath} ({dds.throughput():.1f} MPix/s)")
+            return {'FINISHED'}
         self.report({'INFO'}, f"Exported tattooed texture to: {filepath}")
         return {'FINISHED'}
 
@@ -303,6 +668,19 @@ class TATTOO_OT_export_tattooed_texture(Operator, ExportHelper):
         return {'RUNNING_MODAL'}
 
 
+class TATTOO_OT_cancel_exports(Operator):
+    """Cancel every running background texture export"""
+    bl_idname = "tattoo.cancel_exports"
+    bl_label = "Cancel Exports"
+
+    @profiling.operator
+    def execute(self, context):
+        count = len(async_export.running())
+        async_export.cancel_all()
+        self.report({'INFO'}, f"Cancelled {count} export(s)")
+        return {'FINISHED'}
+
+
 class TATTOO_OT_export_usd(Operator, ExportHelper):
     """Export the mesh and textures as USD for UE5"""
     bl_idname = "tattoo.export_usd"
@@ -317,6 +695,13 @@ class TATTOO_OT_export_usd(Operator, ExportHelper):
         default=True
     )
 
+    incremental: BoolProperty(
+        name="Incremental",
+        description="Only rewrite the textures and meshes that changed since the last export to this file",
+        default=True
+    )
+
+    @profiling.operator
     def execute(self, context):
         if not context.active_object:
             self.report({'ERROR'}, "No active object selected")
@@ -326,25 +711,45 @@ class TATTOO_OT_export_usd(Operator, ExportHelper):
         if context.mode != 'OBJECT':
             bpy.ops.object.mode_set(mode='OBJECT')
 
+        # Export the full mesh, never its paint proxy
+        if paint_proxy.is_proxy(context.active_object):
+            paint_proxy.leave(context.active_object)
+
+        if self.incremental:
+            objects = list(context.selected_objects) or [context.active_object]
+            try:
+                report = usd_incremental.export(self.filepath, objects)
+            except Exception as e:
+                self.report({'ERROR'}, f"Incremental USD export failed: {str(e)}")
+                return {'CANCELLED'}
+            self.report({'INFO'}, f"Exported USD to: {self.filepath} - {report.summary()}")
+            return {'FINISHED'}
+
         # Auto-save texture before export
         if self.auto_save_textures:
             obj = context.active_object
             image_node = helpers.get_active_image_texture_node(obj)
             if image_node and image_node.image and image_node.image.is_dirty:
                 try:
-                    image_node.image.save()
+                    with profiling.measure("image.save"):
+                        image_node.image.save()
                     self.report({'INFO'}, f"Auto-saved texture: {image_node.image.name}")
                 except Exception as e:
                     self.report({'WARNING'}, f"Could not auto-save texture: {str(e)}")
 
-        # Export USD with settings optimized for UE5
-        bpy.ops.wm.usd_export(
-            filepath=self.filepath,
-            selected_objects_only=True,
-            export_materials=True,
-            export_textures=True,
-            relative_paths=True
-        )
+        # Export USD with settings optimized for UE5 (tattoo layer composited onto the skin)
+        try:
+            with overlay.composited_for_export(context.active_object), profiling.measure("wm.usd_export"):
+                bpy.ops.wm.usd_export(
+                    filepath=self.filepath,
+                    selected_objects_only=True,
+                    export_materials=True,
+                    export_textures=True,
+                    relative_paths=True
+                )
+        except Exception as e:
+            self.report({'ERROR'}, f"Could not export USD: {str(e)}")
+            return {'CANCELLED'}
 
         self.report({'INFO'}, f"Exported USD to: {self.filepath}")
         return {'FINISHED'}
@@ -355,6 +760,7 @@ class TATTOO_OT_export_usd(Operator, ExportHelper):
             addon_prefs = context.preferences.addons.get(__package__)
             if addon_prefs:
                 self.auto_save_textures = addon_prefs.preferences.auto_save_textures
+                self.incremental = addon_prefs.preferences.incremental_usd_export
                 if addon_prefs.preferences.default_export_path:
                     self.filepath = addon_prefs.preferences.default_export_path
         except:
@@ -370,6 +776,7 @@ class TATTOO_OT_select_body(Operator):
     bl_label = "Select Body"
     bl_description = "Select the inZOI body mesh"
 
+    @profiling.operator
     def execute(self, context):
         body_obj = helpers.get_inzoi_body_object()
         if body_obj:
@@ -387,6 +794,7 @@ class TATTOO_OT_select_head(Operator):
     bl_label = "Select Head"
     bl_description = "Select the inZOI head mesh"
 
+    @profiling.operator
     def execute(self, context):
         head_obj = helpers.get_inzoi_head_object()
         if head_obj:
@@ -410,6 +818,7 @@ class TATTOO_OT_select_object(Operator):
         default=""
     )
 
+    @profiling.operator
     def execute(self, context):
         if not self.object_name:
             self.report({'ERROR'}, "No object name specified")
@@ -421,6 +830,7 @@ class TATTOO_OT_select_object(Operator):
             # Try to create material if it doesn't exist
             if not obj.active_material:
                 helpers.create_character_material(obj)
+                panel_state.invalidate(obj)
             self.report({'INFO'}, f"Selected: {obj.name}")
             return {'FINISHED'}
         else:
@@ -436,8 +846,9 @@ class TATTOO_OT_load_skin_texture(Operator, ImportHelper):
     filename_ext = ".png;.jpg;.jpeg;.tga;.bmp"
     filter_glob: StringProperty(default="*.png;*.jpg;*.jpeg;*.tga;*.bmp", options={'HIDDEN'})
 
+    @profiling.operator
     def execute(self, context):
-        obj = context.active_object
+        obj = paint_proxy.source_object(context.active_object)
         if not obj or obj.type != 'MESH':
             self.report({'ERROR'}, "No mesh object selected")
             return {'CANCELLED'}
@@ -445,8 +856,9 @@ class TATTOO_OT_load_skin_texture(Operator, ImportHelper):
         # Check for unsaved changes in current texture
         image_node = helpers.get_active_image_texture_node(obj)
         if image_node and image_node.image and image_node.image.is_dirty:
-            # Allow overwriting if it's a generated texture (likely the default blank one)
-            if image_node.image.source != 'GENERATED':
+            # Allow overwriting if it's a generated texture (likely the default blank one).
+            # Resized skins are generated too but keep the filepath of their source.
+            if image_node.image.source != 'GENERATED' or image_node.image.filepath_raw:
                 self.report({'ERROR'}, "Current texture has unsaved changes! Save it first to avoid losing work.")
                 return {'CANCELLED'}
 
@@ -458,6 +870,9 @@ class TATTOO_OT_load_skin_texture(Operator, ImportHelper):
         try:
             # Use the helper to apply the material/texture
             helpers.create_character_material(obj, filepath)
+            if paint_proxy.is_proxy(context.active_object):
+                paint_proxy.sync_materials(context.active_object)
+            panel_state.invalidate(obj)
 
             self.report({'INFO'}, f"Loaded skin texture: {os.path.basename(filepath)}")
             return {'FINISHED'}
@@ -484,8 +899,9 @@ class TATTOO_OT_clear_texture(Operator):
     bl_label = "Clear Texture"
     bl_options = {'REGISTER', 'UNDO'}
 
+    @profiling.operator
     def execute(self, context):
-        obj = context.active_object
+        obj = paint_proxy.source_object(context.active_object)
         if not obj or obj.type != 'MESH' or not obj.active_material:
             return {'CANCELLED'}
 
@@ -497,6 +913,9 @@ class TATTOO_OT_clear_texture(Operator):
                 return {'CANCELLED'}
 
             image_node.image = None
+            shared_images.release(obj.active_material)
+            image_memory.collect()
+            panel_state.invalidate(obj)
             self.report({'INFO'}, "Texture cleared")
             return {'FINISHED'}
         return {'CANCELLED'}
@@ -507,9 +926,24 @@ class TATTOO_OT_enter_texture_paint(Operator):
     bl_idname = "tattoo.enter_texture_paint"
     bl_label = "Switch to Texture Paint"
 
+    @profiling.operator
     def execute(self, context):
         if context.object and context.object.type == 'MESH':
+            use_proxy, ratio = paint_proxy.get_settings()
+            if use_proxy and not paint_proxy.is_proxy(context.object):
+                if context.mode != 'OBJECT':
+                    bpy.ops.object.mode_set(mode='OBJECT')
+                proxy = paint_proxy.enter(context.object, ratio)
+                faces, full_faces = paint_proxy.face_counts(proxy)
+                self.report({'INFO'}, f"Painting on {proxy.name} ({faces} of {full_faces} faces)")
             bpy.ops.object.mode_set(mode='TEXTURE_PAINT')
+
+            # Strokes on UVs outside the tiles of a UDIM skin are lost
+            image_node = helpers.get_active_image_texture_node(context.object)
+            if image_node and udim.is_tiled(image_node.image):
+                missing = udim.missing_tiles(context.object, image_node.image)
+                if missing:
+                    self.report({'WARNING'}, f"UVs reach UDIM tiles with no image: {', '.join(map(str, missing))}")
             
             # Switch viewport shading to MATERIAL preview to ensure texture is visible
             for area in context.screen.areas:
@@ -520,6 +954,77 @@ class TATTOO_OT_enter_texture_paint(Operator):
         return {'FINISHED'}
 
 
+class TATTOO_OT_exit_paint_proxy(Operator):
+    """Hide the paint proxy and show the full mesh again"""
+    bl_idname = "tattoo.exit_paint_proxy"
+    bl_label = "Back to Full Mesh"
+
+    @profiling.operator
+    def execute(self, context):
+        proxy = context.active_object
+        if not paint_proxy.is_proxy(proxy):
+            self.report({'WARNING'}, "The active object is not a paint proxy")
+            return {'CANCELLED'}
+
+        mode = context.mode
+        if mode != 'OBJECT':
+            bpy.ops.object.mode_set(mode='OBJECT')
+        source = paint_proxy.leave(proxy)
+        if mode == 'PAINT_TEXTURE':
+            bpy.ops.object.mode_set(mode='TEXTURE_PAINT')
+        self.report({'INFO'}, f"Painting on {source.name}")
+        return {'FINISHED'}
+
+
+class TATTOO_OT_purge_images(Operator):
+    """Remove skins, stencils and layers that are no longer used and apply the image memory budget"""
+    bl_idname = "tattoo.purge_images"
+    bl_label = "Purge Unused Images"
+
+    include_dirty: BoolProperty(
+        name="Include Unsaved",
+        description="Also remove unused images with unsaved changes",
+        default=False
+    )
+
+    @profiling.operator
+    def execute(self, context):
+        before = image_memory.stats["purged_bytes"] + image_memory.stats["freed_bytes"]
+        image_memory.collect(include_dirty=self.include_dirty)
+        released = image_memory.stats["purged_bytes"] + image_memory.stats["freed_bytes"] - before
+        message = f"Released {released / (1024 * 1024):.0f} MB of image memory"
+        if image_memory.stats["kept_dirty"]:
+            message += f", kept {image_memory.stats['kept_dirty']} unused image(s) with unsaved changes"
+        self.report({'INFO'}, message)
+        return {'FINISHED'}
+
+
+class TATTOO_OT_toggle_profiling(Operator):
+    """Start or stop recording the time and memory of every operation"""
+    bl_idname = "tattoo.toggle_profiling"
+    bl_label = "Toggle Profiling"
+
+    def execute(self, context):
+        profiling.enabled = not profiling.enabled
+        try:
+            addon_prefs = context.preferences.addons.get(__package__)
+            if addon_prefs:
+                addon_prefs.preferences.use_profiling = profiling.enabled
+        except:
+            pass
+        return {'FINISHED'}
+
+
+class TATTOO_OT_clear_profiling(Operator):
+    """Clear the recent operations table (the trace file is kept)"""
+    bl_idname = "tattoo.clear_profiling"
+    bl_label = "Clear Profiling Table"
+
+    def execute(self, context):
+        profiling.clear()
+        return {'FINISHED'}
+
+
 class TATTOO_PT_panel(Panel):
     """Creates a Panel in the 3D View sidebar for inZOI Tattoo Studio"""
     bl_label = "inZOI Tattoo Studio"
@@ -549,16 +1054,17 @@ class TATTOO_PT_panel(Panel):
         col = box.column(align=True)
         col.operator("tattoo.import_metahuman_fbx", text="Import inZOI FBX", icon='FILE_FOLDER')
 
+        # Import cache counters
+        row = col.row(align=True)
+        row.label(text=f"Import cache: {import_cache.stats['hits']} hits / {import_cache.stats['misses']} misses", icon='FILE_CACHE')
+        row.operator("tattoo.clear_import_cache", text="", icon='TRASH')
+
         # Existing objects section
         col.separator()
         col.label(text="Or select existing:", icon='OBJECT_DATA')
 
-        # Find all mesh objects that could be inZOI
-        inzoi_objects = []
-        for obj in bpy.context.scene.objects:
-            if obj.type == 'MESH' and ('body' in obj.name.lower() or 'head' in obj.name.lower() or
-                                      'inzoi' in obj.name.lower() or 'character' in obj.name.lower()):
-                inzoi_objects.append(obj)
+        # All mesh objects that could be inZOI, from the character registry
+        inzoi_objects = registry.character_objects()
 
         if inzoi_objects:
             for obj in inzoi_objects:
@@ -567,8 +1073,10 @@ class TATTOO_PT_panel(Panel):
         else:
             col.label(text="  No existing inZOI objects found", icon='ERROR')
 
-        # Check if we have objects to work with
+        # Check if we have objects to work with. A paint proxy shows the
+        # state of its full mesh, which the operators below act on
         obj = context.active_object
+        source = paint_proxy.source_object(obj)
 
         # Step 2: Load skin texture
         if obj and obj.type == 'MESH':
@@ -576,15 +1084,22 @@ class TATTOO_PT_panel(Panel):
             box.label(text="2. Load Skin Texture", icon='IMAGE_DATA')
             col = box.column(align=True)
 
-            # Check if object already has a material with texture
-            has_texture = False
-            if obj.active_material:
-                image_node = helpers.get_active_image_texture_node(obj)
-                if image_node and image_node.image:
-                    has_texture = True
-                    img = image_node.image
-                    w, h = img.size
-                    col.label(text=f"Current: {img.name} ({w}x{h})", icon='IMAGE_DATA')
+            # Check if object already has a material with texture (cached between redraws)
+            state = panel_state.get_state(source)
+            has_texture = state.has_texture
+            if has_texture:
+                size = f"{state.width}x{state.height}" if state.image_loaded else "not loaded"
+                col.label(text=f"Current: {state.image_name} ({size})", icon='IMAGE_DATA')
+                if state.tile_count:
+                    col.label(text=f"UDIM: {state.tile_count} tiles", icon='UV')
+                image = bpy.data.images.get(state.image_name)
+                users = shared_images.material_count(image) if image else 0
+                if users > 1:
+                    col.label(text=f"Shared by {users} materials", icon='LINKED')
+            stats = shared_images.stats
+            if stats["shared"]:
+                col.label(text=f"Shared skins: {stats['shared']} reused, "
+                               f"{stats['saved_bytes'] / (1024 * 1024):.0f} MB not loaded twice", icon='LINKED')
 
             if not has_texture:
                 # Create material with texture button
@@ -603,7 +1118,11 @@ class TATTOO_PT_panel(Panel):
         if obj and obj.type == 'MESH':
             if context.mode == 'PAINT_TEXTURE':
                 col.label(text="Already in Texture Paint", icon='CHECKMARK')
-            else:
+            if paint_proxy.is_proxy(obj):
+                faces, full_faces = paint_proxy.face_counts(obj)
+                col.label(text=f"Paint proxy: {faces} of {full_faces} faces", icon='MOD_DECIM')
+                col.operator("tattoo.exit_paint_proxy", text="Back to Full Mesh", icon='LOOP_BACK')
+            elif context.mode != 'PAINT_TEXTURE':
                 col.operator("tattoo.enter_texture_paint", text="Switch to Texture Paint", icon='IMAGE_RGB_ALPHA')
         else:
             col.label(text="Select an object first", icon='ERROR')
@@ -615,8 +1134,31 @@ class TATTOO_PT_panel(Panel):
 
         if context.mode == 'PAINT_TEXTURE' and obj and obj.type == 'MESH':
             col.operator("tattoo.load_tattoo_image", text="Load Tattoo Image", icon='IMAGE_DATA')
+            stats = stencil_cache.stats
+            col.label(text=f"Stencil cache: {stats['hits']} hits / {stats['misses']} misses / "
+                           f"{stats['evicted_bytes'] / (1024 * 1024):.0f} MB evicted", icon='FILE_CACHE')
             col.operator("tattoo.setup_tattoo_brush", text="Setup Tattoo Brush", icon='BRUSH_DATA')
+            col.operator("tattoo.stamp_decal", text="Stamp Tattoo at Cursor", icon='PIVOT_CURSOR')
+            row = col.row(align=True)
+            row.enabled = panel_state.get_state(source).has_layer
+            row.operator("tattoo.mirror_tattoo_x", text="Mirror Tattoo X", icon='MOD_MIRROR')
             col.operator("tattoo.rotate_stencil", text="Rotate Stencil 90°", icon='FILE_REFRESH')
+
+            # Non-destructive tattoo layer
+            col.separator()
+            if panel_state.get_state(source).has_layer:
+                nodes = obj.active_material.node_tree.nodes
+                col.label(text="Painting into tattoo layer", icon='RENDERLAYERS')
+                # Only the blends the export reproduces, not the whole Mix node enum
+                row = col.row(align=True)
+                blend_type = nodes[overlay.MIX_NODE].blend_type
+                for identifier, name, _ in overlay.BLEND_ITEMS:
+                    row.operator("tattoo.set_layer_blend", text=name,
+                                 depress=blend_type == identifier).blend = identifier
+                col.prop(nodes[overlay.OPACITY_NODE].inputs[1], "default_value", text="Opacity")
+                col.operator("tattoo.remove_tattoo_layer", text="Remove Tattoo Layer", icon='TRASH')
+            elif obj.active_material:
+                col.operator("tattoo.add_tattoo_layer", text="Add Tattoo Layer", icon='RENDERLAYERS')
         else:
             col.label(text="Switch to Texture Paint first", icon='ERROR')
 
@@ -626,28 +1168,41 @@ class TATTOO_PT_panel(Panel):
             box.label(text="5. Process & Export", icon='EXPORT')
             col = box.column(align=True)
 
-            # Check if we can resize (valid object and image)
-            can_resize = obj and obj.type == 'MESH' and obj.active_material
-            if can_resize:
-                image_node = helpers.get_active_image_texture_node(obj)
-                can_resize = image_node and image_node.image and image_node.image.size[0] > 0 and image_node.image.size[1] > 0
+            # Check if we can resize / export (valid object and image)
+            state = panel_state.get_state(source)
 
             row = col.row()
-            row.enabled = bool(can_resize)
+            row.enabled = state.can_resize
             row.operator("tattoo.resize_texture_to_4k", text="Resize to 4K", icon='IMAGE_DATA')
 
-            # Check if we can export (valid object and image)
-            can_export = obj and obj.type == 'MESH' and obj.active_material
-            if can_export:
-                image_node = helpers.get_active_image_texture_node(obj)
-                can_export = image_node and image_node.image and image_node.image.size[0] > 0 and image_node.image.size[1] > 0
-
             row = col.row()
-            row.enabled = bool(can_export)
+            row.enabled = state.can_export
             row.operator("tattoo.export_tattooed_texture", text="Export Tattooed Texture", icon='EXPORT')
 
             col.operator("tattoo.export_usd", text="Export to UE5 (USD)", icon='SCENE_DATA')
 
+            # Background exports in progress or just finished
+            if async_export.jobs:
+                col.separator()
+                for job in async_export.jobs:
+                    if job.status == 'RUNNING':
+                        col.label(text=f"{job.name}: {int(job.progress * 100)}%", icon='TIME')
+                    else:
+                        detail = f" ({job.error})" if job.error else ""
+                        col.label(text=f"{job.name}: {job.status.lower()}{detail}",
+                                  icon='CHECKMARK' if job.status == 'DONE' else 'ERROR')
+                if async_export.running():
+                    col.operator("tattoo.cancel_exports", text="Cancel Exports", icon='CANCEL')
+
+        # Image memory of the skins, stencils and layers the addon loaded
+        stats = image_memory.stats
+        row = layout.row(align=True)
+        row.label(text=f"Images: {stats['current_bytes'] / (1024 * 1024):.0f} MB "
+                       f"(peak {stats['peak_bytes'] / (1024 * 1024):.0f} MB)", icon='IMAGE_DATA')
+        row.operator("tattoo.purge_images", text="", icon='TRASH')
+        if stats["kept_dirty"]:
+            layout.label(text=f"{stats['kept_dirty']} unused image(s) with unsaved changes kept", icon='ERROR')
+
         # Show current selection info
         if obj and obj.type == 'MESH':
             layout.separator()
@@ -657,13 +1212,103 @@ class TATTOO_PT_panel(Panel):
                 row.label(text=f"Material: {obj.active_material.name}", icon='MATERIAL')
 
 
+class TATTOO_PT_library(Panel):
+    """Browse the tattoo folder from the preferences as thumbnails"""
+    bl_label = "Tattoo Library"
+    bl_idname = "TATTOO_PT_library"
+    bl_space_type = 'VIEW_3D'
+    bl_region_type = 'UI'
+    bl_category = "inZOI Tattoo Studio"
+    bl_parent_id = "TATTOO_PT_panel"
+    bl_options = {'DEFAULT_CLOSED'}
+
+    def draw(self, context):
+        layout = self.layout
+        folder = ""
+        try:
+            addon_prefs = context.preferences.addons.get(__package__)
+            if addon_prefs:
+                folder = addon_prefs.preferences.default_texture_path
+        except:
+            pass
+        if not folder:
+            layout.label(text="Set the tattoo folder in the preferences", icon='INFO')
+            return
+
+        current = library.get_library(folder)
+        row = layout.row(align=True)
+        row.operator("tattoo.library_page", text="", icon='TRIA_LEFT').step = -1
+        row.label(text=f"Page {current.page + 1}/{current.page_count} ({len(current.files)} images)")
+        row.operator("tattoo.library_page", text="", icon='TRIA_RIGHT').step = 1
+        row.operator("tattoo.refresh_library", text="", icon='FILE_REFRESH')
+
+        grid = layout.grid_flow(columns=4, even_columns=True, even_rows=True, align=True)
+        for filepath, icon_id in current.page_items():
+            cell = grid.column(align=True)
+            if icon_id:
+                cell.template_icon(icon_value=icon_id, scale=4.0)
+            else:
+                cell.label(text="", icon='TIME')
+            cell.operator("tattoo.pick_library_stencil", text=os.path.basename(filepath)).filepath = filepath
+
+
+class TATTOO_PT_profiling(Panel):
+    """Time and memory of the most recent operations"""
+    bl_label = "Profiling"
+    bl_idname = "TATTOO_PT_profiling"
+    bl_space_type = 'VIEW_3D'
+    bl_region_type = 'UI'
+    bl_category = "inZOI Tattoo Studio"
+    bl_parent_id = "TATTOO_PT_panel"
+    bl_options = {'DEFAULT_CLOSED'}
+
+    def draw(self, context):
+        layout = self.layout
+        rows = 10
+        try:
+            addon_prefs = context.preferences.addons.get(__package__)
+            if addon_prefs:
+                rows = addon_prefs.preferences.profiling_rows
+        except:
+            pass
+
+        row = layout.row(align=True)
+        row.operator("tattoo.toggle_profiling", text="Recording" if profiling.enabled else "Record",
+                     icon='REC', depress=profiling.enabled)
+        row.operator("tattoo.clear_profiling", text="", icon='TRASH')
+        if not profiling.history:
+            layout.label(text="No operations recorded yet", icon='INFO')
+            return
+
+        grid = layout.grid_flow(row_major=True, columns=5, even_columns=False, align=True)
+        for heading in ("Operation", "Wall ms", "CPU ms", "+RSS MB", "Image MB"):
+            grid.label(text=heading)
+        for record in list(profiling.history)[-rows:][::-1]:
+            failed = record["status"] != "ok"
+            grid.label(text="  " * record["depth"] + record["name"], icon='ERROR' if failed else 'NONE')
+            grid.label(text=f"{record['wall'] * 1000:.1f}")
+            grid.label(text=f"{record['cpu'] * 1000:.1f}")
+            grid.label(text=f"{record['peak_rss_delta'] / (1024 * 1024):.0f}")
+            grid.label(text=f"{record.get('image_bytes', 0) / (1024 * 1024):.0f}")
+
+
 classes = (
     TATTOO_OT_import_metahuman_fbx,
+    TATTOO_OT_clear_import_cache,
     TATTOO_OT_resize_texture_to_4k,
     TATTOO_OT_setup_tattoo_brush,
     TATTOO_OT_load_tattoo_image,
+    TATTOO_OT_pick_library_stencil,
+    TATTOO_OT_library_page,
+    TATTOO_OT_refresh_library,
+    TATTOO_OT_stamp_decal,
+    TATTOO_OT_mirror_tattoo_x,
     TATTOO_OT_rotate_stencil,
+    TATTOO_OT_add_tattoo_layer,
+    TATTOO_OT_set_layer_blend,
+    TATTOO_OT_remove_tattoo_layer,
     TATTOO_OT_export_tattooed_texture,
+    TATTOO_OT_cancel_exports,
     TATTOO_OT_export_usd,
     TATTOO_OT_select_body,
     TATTOO_OT_select_head,
@@ -671,7 +1316,13 @@ classes = (
     TATTOO_OT_load_skin_texture,
     TATTOO_OT_clear_texture,
     TATTOO_OT_enter_texture_paint,
+    TATTOO_OT_exit_paint_proxy,
+    TATTOO_OT_purge_images,
+    TATTOO_OT_toggle_profiling,
+    TATTOO_OT_clear_profiling,
     TATTOO_PT_panel,
+    TATTOO_PT_library,
+    TATTOO_PT_profiling,
     preferences.TATTOO_AddonPreferences,
 )
 
@@ -679,6 +1330,12 @@ classes = (
 def register():
     for cls in classes:
         bpy.utils.register_class(cls)
+
+    registry.register()
+    panel_state.register()
+    texel_maps.register()
+    shared_images.register()
+    profiling.sync()
         
     # Load settings from JSON if available (delayed to ensure context is ready)
     bpy.app.timers.register(lambda: preferences.load_settings(__package__), first_interval=0.1)
@@ -688,6 +1345,15 @@ def unregister():
     for cls in reversed(classes):
         bpy.utils.unregister_class(cls)
 
+    async_export.unregister()
+    library.unregister()
+    registry.unregister()
+    panel_state.unregister()
+    texel_maps.unregister()
+    shared_images.unregister()
+    pixels.release_buffers()
+    scratch.cleanup()
+
 
 if __name__ == "__main__":
     register()
\ No newline at end of file
@@ -0,0 +1,179 @@
+"""
+Background texture export for the Tattoo Master addon
+
+The pixels are snapshotted on the main thread; encoding and writing happen
+in a worker thread (zlib and NumPy release the GIL) while a bpy.app.timers
+callback reports progress in the sidebar. Files are written atomically by
+pixels.encode_file, so a cancelled or failed export leaves nothing behind.
+
+When a job ends, the timer finishes it on the main thread like a foreground
+save: a plain lossless export relinks the image to the file it wrote, the
+panel state is refreshed and a failure is shown in a popup. The image is
+only relinked if its pixels still match the snapshot, so strokes painted
+while the file was written are not reloaded away.
+"""
+import bpy
+import os
+import time
+import hashlib
+import threading
+import numpy as np
+from . import pixels
+from . import panel_state
+
+
+POLL_INTERVAL = 0.2
+# Seconds a finished export stays listed in the panel
+RESULT_LINGER = 5.0
+
+
+class ExportJob:
+    """One texture being encoded in a worker thread."""
+
+    def __init__(self, rgba, filepath, file_format, options=None, image_name=None):
+        self.rgba = rgba
+        self.filepath = filepath
+        self.file_format = file_format
+        self.options = options or {}
+        # Image to relink once the file is written, and the digest of its snapshot
+        self.image_name = image_name
+        self.digest = None
+        self.progress = 0.0
+        self.status = 'RUNNING'  # RUNNING, DONE, CANCELLED, FAILED
+        self.error = ""
+        self.started = time.perf_counter()
+        self.finished = None
+        self.reported = False
+        self.cancel_event = threading.Event()
+        self.thread = threading.Thread(target=self._run, name="TattooExport", daemon=True)
+
+    @property
+    def name(self):
+        return os.path.basename(self.filepath)
+
+    @property
+    def elapsed(self):
+        return (self.finished or time.perf_counter()) - self.started
+
+    def _set_progress(self, value):
+        self.progress = value
+
+    def _run(self):
+        try:
+            if self.image_name:
+                self.digest = pixels_digest(self.rgba)
+            pixels.encode_file(self.filepath, self.rgba, self.file_format,
+                               progress=self._set_progress, cancel=self.cancel_event, **self.options)
+            self.status = 'DONE'
+        except pixels.ExportCancelled:
+            self.status = 'CANCELLED'
+        except Exception as e:
+            self.error = str(e)
+            self.status = 'FAILED'
+        finally:
+            self.rgba = None  # Release the snapshot as soon as possible
+            self.finished = time.perf_counter()
+
+    def cancel(self):
+        self.cancel_event.set()
+
+
+jobs = []
+
+
+def pixels_digest(rgba):
+    """Hash of an RGBA uint8 snapshot and its shape."""
+    digest = hashlib.blake2b()
+    digest.update(np.array(rgba.shape, dtype=np.int64).tobytes())
+    return pixels.update_hash(digest, rgba).hexdigest()
+
+
+def start(image, filepath, file_format, composite=None, **options):
+    """Snapshot `image` now and encode it to `filepath` in the background.
+
+    The image datablock is left untouched, so painting can continue while
+    the file is written. `options` are passed on to the encoder.
+    """
+    # As pixels.save_image: only a file equal to the datablock can replace it
+    relink = composite is None and file_format in pixels.LOSSLESS_FORMATS
+    job = ExportJob(pixels.snapshot_uint8(image, composite), filepath, file_format, options,
+                    image.name if relink else None)
+    jobs.append(job)
+    job.thread.start()
+    if not bpy.app.timers.is_registered(_poll):
+        bpy.app.timers.register(_poll, first_interval=POLL_INTERVAL)
+    return job
+
+
+def running():
+    return [job for job in jobs if job.status == 'RUNNING']
+
+
+def cancel_all():
+    for job in running():
+        job.cancel()
+
+
+def _redraw_sidebars():
+    for window in bpy.context.window_manager.windows:
+        for area in window.screen.areas:
+            if area.type == 'VIEW_3D':
+                area.tag_redraw()
+
+
+def _relink(job):
+    """Point the exported image at its new file, unless it was painted since the snapshot."""
+    image = bpy.data.images.get(job.image_name)
+    if image is None or pixels_digest(pixels.snapshot_uint8(image)) != job.digest:
+        return False
+    pixels.relink_image(image, job.filepath, job.file_format)
+    return True
+
+
+def _report_failure(job):
+    def draw(menu, context):
+        menu.layout.label(text=job.error)
+
+    try:
+        bpy.context.window_manager.popup_menu(draw, title=f"Export of {job.name} failed", icon='ERROR')
+    except Exception:
+        pass  # No window manager in background mode
+
+
+def _finish(job):
+    """Main-thread end of a job: relink, refresh the panel and report."""
+    if job.status == 'DONE' and job.image_name:
+        try:
+            if not _relink(job):
+                job.error = "painted during export, image left unsaved"
+        except Exception as e:
+            job.error = f"written, but not relinked: {str(e)}"
+    panel_state.invalidate()
+    if job.status == 'FAILED':
+        _report_failure(job)
+
+
+def _poll():
+    now = time.perf_counter()
+    for job in list(jobs):
+        if job.finished is not None and not job.reported:
+            job.reported = True
+            _finish(job)
+            message = f"{job.status.lower()} in {job.elapsed:.1f}s" + (f": {job.error}" if job.error else "")
+            print(f"Tattoo Master: export of {job.filepath} {message}")
+        elif job.finished is not None and now - job.finished > RESULT_LINGER:
+            jobs.remove(job)
+    try:
+        _redraw_sidebars()
+    except Exception:
+        pass  # No window manager in background mode
+    return POLL_INTERVAL if jobs else None
+
+
+def unregister():
+    cancel_all()
+    for job in jobs:
+        job.thread.join(timeout=5.0)
+    jobs.clear()
+    if bpy.app.timers.is_registered(_poll):
+        bpy.app.timers.unregister(_poll)
@@ -0,0 +1,371 @@
+"""
+Headless batch pipeline for the Tattoo Master addon
+
+Runs a job manifest of inZOI avatars through import -> skin -> stencils ->
+export in background Blender processes. Start it from Blender itself:
+
+    blender -b --python-expr "import tattoo_master.batch as b; b.main()" -- manifest.json -j 4
+
+Manifest format (paths are relative to the manifest file):
+
+    {
+        "output_dir": "out",
+        "jobs": [
+            {
+                "id": "avatar_01",
+                "fbx": "avatars/avatar_01.fbx",
+                "skin": "skins/T_body_BC.png",
+                "target": "body",
+                "format": "png",
+                "stencils": [
+                    {"image": "designs/rose.png", "uv": [0.25, 0.6], "size": 0.1,
+                     "rotation": 30.0, "opacity": 1.0},
+                    {"image": "designs/koi.png", "point": [0.12, -0.08, 1.31],
+                     "normal": [0.2, -0.97, 0.1], "up": [0, 0, 1], "size": 0.15}
+                ]
+            }
+        ]
+    }
+
+Stencils with a "point" are projected onto the mesh at that world-space
+position (see decal.py); "size" is then in scene units instead of a fraction
+of the texture width.
+"""
+import bpy
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+import threading
+import tempfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import numpy as np
+from . import helpers
+from . import brush_manager
+from . import pixels
+from . import decal
+from . import texel_maps
+from . import shared_images
+
+
+JOURNAL_NAME = "batch_journal.jsonl"
+
+FORMATS = {
+    'png': ('PNG', '.png'),
+    'tga': ('TARGA', '.tga'),
+}
+
+
+def load_manifest(manifest_path):
+    """Load a job manifest and resolve its paths against the manifest folder."""
+    with open(manifest_path, 'r') as f:
+        manifest = json.load(f)
+
+    base_dir = os.path.dirname(os.path.abspath(manifest_path))
+    manifest["output_dir"] = _resolve(base_dir, manifest.get("output_dir", "batch_output"))
+    manifest["jobs"] = [prepare_job(job, base_dir, index) for index, job in enumerate(manifest.get("jobs", []))]
+    return manifest
+
+
+def _resolve(base_dir, path):
+    return path if not path or os.path.isabs(path) else os.path.join(base_dir, path)
+
+
+def prepare_job(job, base_dir, index=0):
+    """Fill in job defaults and make its paths absolute."""
+    job.setdefault("id", f"job_{index:04d}")
+    job.setdefault("target", "body")
+    job.setdefault("format", "png")
+    job["fbx"] = _resolve(base_dir, job["fbx"])
+    job["skin"] = _resolve(base_dir, job.get("skin", ""))
+    for stencil in job.setdefault("stencils", []):
+        stencil["image"] = _resolve(base_dir, stencil["image"])
+    if job["format"] not in FORMATS:
+        raise ValueError(f"Job {job['id']}: unsupported format '{job['format']}'")
+    return job
+
+
+def output_path(manifest, job):
+    """Path of the exported texture for a job."""
+    return os.path.join(manifest["output_dir"], job["id"] + FORMATS[job["format"]][1])
+
+
+# ---------------------------------------------------------------------------
+# Stencil stamping in UV space
+
+
+def stamp_uv(base, stencil, uv, size, rotation=0.0, opacity=1.0):
+    """Multiply a stencil into a (height, width, 4) base array at a UV position.
+
+    `size` is the stencil width as a fraction of the texture width and
+    `rotation` is in degrees. Uses the same multiply blend as the stencil brush.
+    """
+    height, width = base.shape[:2]
+    st_h, st_w = stencil.shape[:2]
+    stamp_w = max(1.0, size * width)
+    stamp_h = stamp_w * st_h / st_w
+
+    center_x = uv[0] * width
+    center_y = uv[1] * height
+    angle = np.radians(rotation)
+    cos_a, sin_a = np.cos(angle), np.sin(angle)
+
+    # Bounding box of the rotated stamp in texel space
+    half = 0.5 * np.hypot(stamp_w, stamp_h)
+    x0, x1 = int(max(0, np.floor(center_x - half))), int(min(width, np.ceil(center_x + half)))
+    y0, y1 = int(max(0, np.floor(center_y - half))), int(min(height, np.ceil(center_y + half)))
+    if x0 >= x1 or y0 >= y1:
+        return base
+
+    ys, xs = np.mgrid[y0:y1, x0:x1].astype(np.float32)
+    dx = xs + 0.5 - center_x
+    dy = ys + 0.5 - center_y
+    # Inverse rotation into stencil space, normalized to [0, 1]
+    u = (dx * cos_a + dy * sin_a) / stamp_w + 0.5
+    v = (-dx * sin_a + dy * cos_a) / stamp_h + 0.5
+    inside = (u >= 0.0) & (u < 1.0) & (v >= 0.0) & (v < 1.0)
+
+    sx = np.clip((u * st_w).astype(np.intp), 0, st_w - 1)
+    sy = np.clip((v * st_h).astype(np.intp), 0, st_h - 1)
+    sample = stencil[sy, sx]
+
+    alpha = sample[..., 3:4] * opacity * inside[..., None]
+    factor = 1.0 - alpha + alpha * sample[..., :3]
+    base[y0:y1, x0:x1, :3] *= factor
+    return base
+
+
+# ---------------------------------------------------------------------------
+# Worker side (runs inside a background Blender process)
+
+
+def _target_object(target):
+    if target == 'head':
+        return helpers.get_inzoi_head_object()
+    return helpers.get_inzoi_body_object()
+
+
+def import_job_object(job):
+    """Import the job's FBX and return the object its texture belongs to."""
+    body_obj = helpers.import_inzoi_fbx(job["fbx"])
+    if not body_obj:
+        raise RuntimeError(f"No body object found in {job['fbx']}")
+    return _target_object(job["target"]) or body_obj
+
+
+def load_stencil(placement):
+    """Load a stencil through the brush manager and return its RGBA pixels in display space."""
+    brush, stencil_image = brush_manager.load_tattoo_image(placement["image"], placement.get("resize", False))
+    return pixels.to_rgba(pixels.read_display(stencil_image, tag="batch_stencil"))
+
+
+def apply_stencils(obj, image, placements, stencil_loader=load_stencil):
+    """Stamp every stencil placement of a job into the image.
+
+    Placements with a 3D "point" are projected onto the mesh by the decal
+    engine; the others are stamped at their "uv" position.
+    """
+    if not placements:
+        return
+    base = pixels.read_display(image, tag="batch_base")
+    bpy.context.view_layer.objects.active = obj
+    surface = maps = None
+    for placement in placements:
+        if "point" in placement:
+            if surface is None:
+                surface = decal.MeshSurface(obj)
+                maps = texel_maps.get_maps(obj, base.shape[1], base.shape[0], surface)
+            decal.stamp(base, surface, stencil_loader(placement), decal.Placement.from_dict(placement), maps=maps)
+            continue
+        stamp_uv(
+            base, stencil_loader(placement),
+            placement.get("uv", (0.5, 0.5)),
+            placement.get("size", 0.1),
+            placement.get("rotation", 0.0),
+            placement.get("opacity", 1.0),
+        )
+    pixels.write_display(image, base)
+    shared_images.detach(image)
+
+
+def run_job(job, destination, importer=None, stencil_loader=load_stencil):
+    """Run one job in the current Blender session and return its stage timings.
+
+    Without an `importer` the session is reset to an empty scene and the FBX
+    is imported from scratch.
+    """
+    timings = {}
+
+    start = time.perf_counter()
+    if importer is None:
+        bpy.ops.wm.read_factory_settings(use_empty=True)
+        obj = import_job_object(job)
+    else:
+        obj = importer(job)
+    timings["import"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    helpers.create_character_material(obj, job["skin"])
+    image = helpers.get_active_image_texture_node(obj).image
+    timings["material"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    apply_stencils(obj, image, job["stencils"], stencil_loader)
+    timings["stencils"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    os.makedirs(os.path.dirname(destination), exist_ok=True)
+    pixels.save_image(image, destination, FORMATS[job["format"]][0])
+    timings["export"] = time.perf_counter() - start
+
+    return timings
+
+
+def worker_main(argv=None):
+    """Entry point of a worker process: run the job file, write a result file."""
+    argv = argv if argv is not None else sys.argv[sys.argv.index("--") + 1:]
+    job_path, result_path = argv[:2]
+    with open(job_path, 'r') as f:
+        payload = json.load(f)
+
+    result = {"id": payload["job"]["id"]}
+    try:
+        result["timings"] = run_job(payload["job"], payload["output"])
+        result["status"] = "done"
+    except Exception as e:
+        result["status"] = "failed"
+        result["error"] = str(e)
+
+    with open(result_path, 'w') as f:
+        json.dump(result, f)
+
+
+# ---------------------------------------------------------------------------
+# Orchestrator side
+
+
+def read_journal(journal_path):
+    """Return {job id: last journal record} from a previous run."""
+    records = {}
+    if not os.path.exists(journal_path):
+        return records
+    with open(journal_path, 'r') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue  # A crash can leave a truncated last line
+            records[record["id"]] = record
+    return records
+
+
+def blender_command(module, entry, args, blender=None):
+    """Command line that calls `module.entry()` of this addon in a background Blender."""
+    addon_dir = os.path.dirname(os.path.abspath(__file__))
+    expr = (
+        "import sys; "
+        f"sys.path.insert(0, {os.path.dirname(addon_dir)!r}); "
+        f"from {os.path.basename(addon_dir)} import {module}; "
+        f"{module}.{entry}()"
+    )
+    return [blender or bpy.app.binary_path, "-b", "--factory-startup", "--python-expr", expr,
+            "--"] + [str(arg) for arg in args]
+
+
+def worker_command(job_path, result_path, blender=None):
+    """Command line that runs one job in a fresh background Blender."""
+    return blender_command("batch", "worker_main", [job_path, result_path], blender)
+
+
+def dispatch_job(manifest, job, blender=None, timeout=None):
+    """Run one job in its own Blender process and return its journal record."""
+    with tempfile.TemporaryDirectory(prefix="tattoo_batch_") as tmp:
+        job_path = os.path.join(tmp, "job.json")
+        result_path = os.path.join(tmp, "result.json")
+        with open(job_path, 'w') as f:
+            json.dump({"job": job, "output": output_path(manifest, job)}, f)
+
+        start = time.perf_counter()
+        try:
+            proc = subprocess.run(worker_command(job_path, result_path, blender),
+                                  stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+                                  timeout=timeout)
+            returncode = proc.returncode
+        except subprocess.TimeoutExpired:
+            returncode = None
+        elapsed = time.perf_counter() - start
+
+        if os.path.exists(result_path):
+            with open(result_path, 'r') as f:
+                record = json.load(f)
+        elif returncode is None:
+            record = {"id": job["id"], "status": "failed", "error": f"Timed out after {timeout}s"}
+        else:
+            record = {"id": job["id"], "status": "failed",
+                      "error": f"Worker exited with code {returncode}: {proc.stderr.decode(errors='replace')[-500:]}"}
+
+    record["wall_time"] = elapsed
+    record["output"] = output_path(manifest, job)
+    return record
+
+
+def run_manifest(manifest_path, workers=1, resume=True, blender=None, timeout=None, dispatch=None):
+    """Run every pending job of a manifest over `workers` Blender processes.
+
+    Finished jobs are appended to a journal in the output folder as they
+    complete, so a crashed or interrupted run picks up where it stopped.
+    """
+    manifest = load_manifest(manifest_path)
+    os.makedirs(manifest["output_dir"], exist_ok=True)
+    journal_path = os.path.join(manifest["output_dir"], JOURNAL_NAME)
+
+    previous = read_journal(journal_path) if resume else {}
+    pending = []
+    for job in manifest["jobs"]:
+        record = previous.get(job["id"])
+        if record and record.get("status") == "done" and os.path.exists(output_path(manifest, job)):
+            print(f"Tattoo Master: skipping {job['id']} (already done)")
+            continue
+        pending.append(job)
+
+    dispatch = dispatch or (lambda job: dispatch_job(manifest, job, blender, timeout))
+    lock = threading.Lock()
+    results = []
+
+    with open(journal_path, 'a') as journal, ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        futures = {pool.submit(dispatch, job): job for job in pending}
+        for future in as_completed(futures):
+            record = future.result()
+            with lock:
+                journal.write(json.dumps(record) + "\n")
+                journal.flush()
+                os.fsync(journal.fileno())
+            results.append(record)
+            stages = ", ".join(f"{k} {v:.2f}s" for k, v in record.get("timings", {}).items())
+            print(f"Tattoo Master: {record['id']} {record['status']} in {record['wall_time']:.2f}s"
+                  + (f" ({stages})" if stages else "")
+                  + (f" - {record['error']}" if record.get("error") else ""))
+
+    done = sum(1 for r in results if r["status"] == "done")
+    print(f"Tattoo Master: {done}/{len(results)} jobs done, {len(manifest['jobs']) - len(pending)} skipped")
+    return results
+
+
+def main(argv=None):
+    """Command line entry point of the batch pipeline."""
+    if argv is None:
+        argv = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else []
+
+    parser = argparse.ArgumentParser(prog="tattoo_master.batch", description="Batch-apply tattoos to inZOI avatars")
+    parser.add_argument("manifest", help="Path to the job manifest (JSON)")
+    parser.add_argument("-j", "--workers", type=int, default=os.cpu_count() or 1,
+                        help="Number of Blender worker processes")
+    parser.add_argument("--no-resume", action="store_true", help="Ignore the journal of a previous run")
+    parser.add_argument("--blender", default=None, help="Blender executable for the workers")
+    parser.add_argument("--timeout", type=float, default=None, help="Per-job timeout in seconds")
+    args = parser.parse_args(argv)
+
+    results = run_manifest(args.manifest, args.workers, not args.no_resume, args.blender, args.timeout)
+    return 0 if all(r["status"] == "done" for r in results) else 1
@@ -0,0 +1,305 @@
+"""
+Headless benchmark suite of the main Tattoo Master steps
+
+Generates a synthetic avatar mesh (configurable face count and UV layout) and
+skins from 1K to 16K, then times FBX import, material creation, resize,
+stencil loading, PNG/TGA export and USD export. Results are written as a JSON
+report; with --baseline the run is compared against an earlier report and
+Blender exits with code 1 when a step got slower than the threshold:
+    blender -b --python benchmarks/benchmark_suite.py -- --sizes 1024 4096 --output report.json
+    blender -b --python benchmarks/benchmark_suite.py -- --baseline report.json --threshold 0.15
+"""
+import bpy
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import importlib
+import numpy as np
+
+
+ADDON_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(ADDON_DIR))
+helpers = importlib.import_module(f"{os.path.basename(ADDON_DIR)}.helpers")
+pixels = importlib.import_module(f"{os.path.basename(ADDON_DIR)}.pixels")
+resample = importlib.import_module(f"{os.path.basename(ADDON_DIR)}.resample")
+profiling = importlib.import_module(f"{os.path.basename(ADDON_DIR)}.profiling")
+import_cache = importlib.import_module(f"{os.path.basename(ADDON_DIR)}.import_cache")
+stencil_cache = importlib.import_module(f"{os.path.basename(ADDON_DIR)}.stencil_cache")
+brush_manager = importlib.import_module(f"{os.path.basename(ADDON_DIR)}.brush_manager")
+usd_incremental = importlib.import_module(f"{os.path.basename(ADDON_DIR)}.usd_incremental")
+
+REPORT_VERSION = 1
+SIZES = [1024, 2048, 4096, 8192, 16384]
+UV_LAYOUTS = ['GRID', 'ISLANDS']
+
+
+# ---------------------------------------------------------------------------
+# Synthetic data
+
+
+def body_geometry(faces, uv_layout, islands=4):
+    """Vertices, quads and per-loop UVs of a closed tube shaped roughly like a body."""
+    segments = max(8, int(round(np.sqrt(faces / 2.0))))
+    rings = max(2, faces // segments)
+    angle = np.linspace(0.0, 2.0 * np.pi, segments, endpoint=False)
+    height = np.linspace(0.0, 1.7, rings + 1)
+    radius = 0.15 + 0.05 * np.sin(height * 3.0)[:, None]
+    vertices = np.stack([
+        np.cos(angle)[None, :] * radius,
+        np.sin(angle)[None, :] * radius,
+        np.broadcast_to(height[:, None], (rings + 1, segments)),
+    ], axis=-1).reshape(-1, 3)
+
+    i, j = np.meshgrid(np.arange(segments), np.arange(rings))
+    i, j = i.ravel(), j.ravel()
+    quads = np.stack([
+        j * segments + i,
+        j * segments + (i + 1) % segments,
+        (j + 1) * segments + (i + 1) % segments,
+        (j + 1) * segments + i,
+    ], axis=1)
+
+    # Corner (column, row) of every loop; the seam column is `segments`, not 0
+    u = np.stack([i, i + 1, i + 1, i], axis=1) / segments
+    v = np.stack([j, j, j + 1, j + 1], axis=1) / rings
+    if uv_layout == 'ISLANDS':
+        # Cut the layout into islands x islands tiles, each shrunk into its own cell
+        cell_u = np.minimum((i * islands) // segments, islands - 1)[:, None]
+        cell_v = np.minimum((j * islands) // rings, islands - 1)[:, None]
+        u = (cell_u + 0.05 + 0.9 * (u * islands - cell_u)) / islands
+        v = (cell_v + 0.05 + 0.9 * (v * islands - cell_v)) / islands
+    uvs = np.stack([u, v], axis=-1).reshape(-1, 2)
+    return vertices, quads, uvs
+
+
+def make_body(faces, uv_layout):
+    vertices, quads, uvs = body_geometry(faces, uv_layout)
+    mesh = bpy.data.meshes.new("Bench_Body")
+    mesh.from_pydata(vertices.tolist(), [], quads.tolist())
+    uv_layer = mesh.uv_layers.new(name="UVMap")
+    uv_layer.data.foreach_set("uv", uvs.astype(np.float32).ravel())
+    mesh.update()
+    obj = bpy.data.objects.new("Bench_Body", mesh)
+    bpy.context.scene.collection.objects.link(obj)
+    return obj
+
+
+def make_skin(name, size):
+    """Create a generated RGBA image filled with smooth noise."""
+    image = bpy.data.images.new(name, width=size, height=size, alpha=True)
+    rng = np.random.default_rng(size)
+    coarse = rng.random((64, 64, 4), dtype=np.float32)
+    data = resample.resample(coarse, size, size, 'BILINEAR', out=pixels.get_buffer("bench_skin", (size, size, 4)))
+    data[..., 3] = 1.0
+    pixels.write_pixels(image, data)
+    return image
+
+
+def remove_objects(objects):
+    for obj in objects:
+        mesh = obj.data if obj.type == 'MESH' else None
+        bpy.data.objects.remove(obj)
+        if mesh is not None and mesh.users == 0:
+            bpy.data.meshes.remove(mesh)
+
+
+def select_only(obj):
+    for other in bpy.context.view_layer.objects:
+        other.select_set(False)
+    obj.select_set(True)
+    bpy.context.view_layer.objects.active = obj
+
+
+# ---------------------------------------------------------------------------
+# Timing
+
+
+def best_time(step, repeat, setup=None, teardown=None):
+    """Fastest of `repeat` runs of step(state); setup and teardown are not timed."""
+    times = []
+    for _ in range(repeat):
+        state = setup() if setup else None
+        start = time.perf_counter()
+        result = step(state)
+        times.append(time.perf_counter() - start)
+        if teardown:
+            teardown(state, result)
+    return min(times)
+
+
+def run_mesh_steps(args, folder):
+    """Import timings, and the body object the texture steps work on."""
+    obj = make_body(args.faces, args.uv_layout)
+    select_only(obj)
+    fbx_path = os.path.join(folder, "bench_body.fbx")
+    bpy.ops.export_scene.fbx(filepath=fbx_path, use_selection=True)
+    remove_objects([obj])
+
+    def imported(state):
+        return [o for o in bpy.data.objects if o not in state]
+
+    results = {}
+    # Cold imports run with the import cache off, cached ones against a cache folder of their own
+    import_cache.overrides["enabled"] = False
+    results["import"] = best_time(
+        lambda state: helpers.import_inzoi_fbx(fbx_path), args.repeat,
+        setup=lambda: set(bpy.data.objects), teardown=lambda state, body: remove_objects(imported(state)))
+    import_cache.overrides.update(enabled=True, folder=os.path.join(folder, "import_cache"))
+    existing = set(bpy.data.objects)
+    helpers.import_inzoi_fbx(fbx_path)
+    remove_objects(imported(existing))
+    results["import_cached"] = best_time(
+        lambda state: helpers.import_inzoi_fbx(fbx_path), args.repeat,
+        setup=lambda: set(bpy.data.objects), teardown=lambda state, body: remove_objects(imported(state)))
+
+    body = helpers.import_inzoi_fbx(fbx_path)
+    results["faces"] = len(body.data.polygons)
+    return results, body
+
+
+def run_texture_steps(args, folder, body, size):
+    results = {}
+    skin = make_skin(f"Bench_Skin_{size}", size)
+    png_path = os.path.join(folder, f"skin_{size}.png")
+    tga_path = os.path.join(folder, f"skin_{size}.tga")
+
+    def fresh_image(path):
+        return lambda: bpy.data.images.load(path, check_existing=False)
+
+    def remove_image(image, *args):
+        if image is not None and image.name in bpy.data.images:
+            bpy.data.images.remove(image)
+
+    results["export_png"] = best_time(lambda state: pixels.save_image(skin, png_path, 'PNG'), args.repeat)
+    results["export_tga"] = best_time(
+        lambda image: pixels.save_image(image, tga_path, 'TARGA'), args.repeat,
+        setup=fresh_image(png_path), teardown=remove_image)
+    results["resize"] = best_time(
+        lambda image: pixels.resize_image(image, size // 2, size // 2), args.repeat,
+        setup=fresh_image(png_path), teardown=lambda image, resized: remove_image(resized))
+
+    def load_stencil(state):
+        return brush_manager.get_stencil_image(png_path)
+    results["stencil_load"] = best_time(load_stencil, args.repeat, teardown=lambda state, image: stencil_cache.clear())
+
+    # Includes the automatic upscale of skins below the default resolution
+    def material_image(state, material):
+        for node in material.node_tree.nodes:
+            if node.type == 'TEX_IMAGE' and node.image:
+                remove_image(node.image)
+    results["material"] = best_time(
+        lambda state: helpers.create_character_material(body, png_path), args.repeat, teardown=material_image)
+    helpers.create_character_material(body, png_path)
+
+    select_only(body)
+    usd_folder = os.path.join(folder, f"usd_{size}")
+
+    def usd_export(state):
+        os.makedirs(usd_folder, exist_ok=True)
+        bpy.ops.wm.usd_export(filepath=os.path.join(usd_folder, "full.usda"), selected_objects_only=True,
+                              export_materials=True, export_textures=True, relative_paths=True)
+    results["usd_export"] = best_time(usd_export, args.repeat, teardown=lambda *a: shutil.rmtree(usd_folder))
+
+    def usd_incremental_export(state):
+        return usd_incremental.export(os.path.join(usd_folder, "incremental.usda"), [body])
+    results["usd_incremental"] = best_time(usd_incremental_export, args.repeat,
+                                           setup=lambda: shutil.rmtree(usd_folder, ignore_errors=True))
+    results["usd_incremental_unchanged"] = best_time(usd_incremental_export, args.repeat)
+    shutil.rmtree(usd_folder, ignore_errors=True)
+
+    for image in list(bpy.data.images):
+        bpy.data.images.remove(image)
+    pixels.release_buffers()
+    results["peak_rss_mb"] = profiling.peak_rss() / (1024 * 1024)
+    return results
+
+
+# ---------------------------------------------------------------------------
+# Report
+
+
+def metadata(args):
+    return {
+        "blender": bpy.app.version_string,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "numpy": np.__version__,
+        "faces": args.faces,
+        "uv_layout": args.uv_layout,
+        "repeat": args.repeat,
+        "date": time.strftime("%Y-%m-%d %H:%M:%S"),
+    }
+
+
+def timings(report):
+    """Flat {"group/step": seconds} view of a report."""
+    return {
+        f"{group}/{step}": value
+        for group, steps in report["results"].items()
+        for step, value in steps.items()
+        if step not in ("faces", "peak_rss_mb")
+    }
+
+
+def compare(report, baseline, threshold, min_seconds):
+    """Return [(key, baseline s, current s, ratio, regressed)] for the steps in both reports."""
+    current, previous = timings(report), timings(baseline)
+    rows = []
+    for key in sorted(set(current) & set(previous)):
+        ratio = current[key] / previous[key] if previous[key] > 0 else 1.0
+        regressed = ratio > 1.0 + threshold and current[key] - previous[key] > min_seconds
+        rows.append((key, previous[key], current[key], ratio, regressed))
+    return rows
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES)
+    parser.add_argument("--faces", type=int, default=50000, help="Faces of the synthetic body")
+    parser.add_argument("--uv-layout", default='GRID', choices=UV_LAYOUTS)
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per step; the fastest is reported")
+    parser.add_argument("--output", default=None, help="Where to write the JSON report")
+    parser.add_argument("--baseline", default=None, help="Earlier report to compare against")
+    parser.add_argument("--threshold", type=float, default=0.15, help="Slowdown ratio flagged as a regression")
+    parser.add_argument("--min-seconds", type=float, default=0.05, help="Ignore slowdowns smaller than this")
+    args = parser.parse_args(argv)
+
+    report = {"version": REPORT_VERSION, "meta": metadata(args), "results": {}}
+    folder = tempfile.mkdtemp(prefix="tattoo_bench_")
+    try:
+        report["results"]["mesh"], body = run_mesh_steps(args, folder)
+        for size in args.sizes:
+            report["results"][str(size)] = run_texture_steps(args, folder, body, size)
+            print(f"{size:>6}: " + ", ".join(f"{step} {value:.2f}" for step, value in report["results"][str(size)].items()))
+    finally:
+        import_cache.overrides.clear()
+        shutil.rmtree(folder, ignore_errors=True)
+
+    print(f"{'step':<36}{'seconds':>10}")
+    for key, value in timings(report).items():
+        print(f"{key:<36}{value:>10.3f}")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, 'r') as f:
+            baseline = json.load(f)
+        rows = compare(report, baseline, args.threshold, args.min_seconds)
+        print(f"\n{'step':<36}{'baseline':>10}{'current':>10}{'ratio':>8}")
+        for key, previous, current, ratio, regressed in rows:
+            print(f"{key:<36}{previous:>10.3f}{current:>10.3f}{ratio:>7.2f}x" + ("  REGRESSION" if regressed else ""))
+        regressions = sum(row[4] for row in rows)
+        print(f"{regressions} regression(s) above {args.threshold:.0%}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main(sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else [])
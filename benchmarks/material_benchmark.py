@@ -0,0 +1,141 @@
+"""
+Skin swap benchmark of the material template against rebuilt node trees
+
+Creates a number of characters and cycles each of them through a set of
+skins, once with the old per-call rebuild of the node tree and once with the
+template instances, and reports the time per swap, the depsgraph update that
+follows it and how many node trees had to be rebuilt (a rebuilt tree is what
+makes the render engine recompile the shader). In the UI it also times the
+first redraw after a swap, which includes the shader compilation:
+    blender -b --python benchmarks/material_benchmark.py -- --objects 20 --skins 4 --rounds 5
+"""
+import bpy
+import os
+import sys
+import time
+import argparse
+import importlib
+
+
+ADDON_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(ADDON_DIR))
+helpers = importlib.import_module(f"{os.path.basename(ADDON_DIR)}.helpers")
+
+
+def make_objects(count):
+    objects = []
+    for index in range(count):
+        mesh = bpy.data.meshes.new(f"Bench_Body_{index}")
+        mesh.from_pydata([(0, 0, index), (1, 0, index), (1, 1, index), (0, 1, index)], [], [(0, 1, 2, 3)])
+        mesh.uv_layers.new(name="UVMap")
+        obj = bpy.data.objects.new(f"Bench_Body_{index}", mesh)
+        bpy.context.scene.collection.objects.link(obj)
+        objects.append(obj)
+    return objects
+
+
+def make_skins(count, resolution):
+    skins = []
+    for index in range(count):
+        image = bpy.data.images.new(f"Bench_Skin_{index}", resolution, resolution)
+        image.generated_color = (index / max(count, 1), 0.5, 0.5, 1.0)
+        skins.append(image)
+    return skins
+
+
+def rebuild_material(obj, image):
+    """What create_character_material used to do on every call."""
+    material_name = f"{obj.name}_TattooMaterial"
+    material = bpy.data.materials.get(material_name)
+    if not material:
+        material = bpy.data.materials.new(name=material_name)
+        obj.data.materials.append(material)
+    else:
+        obj.active_material = material
+
+    material.use_nodes = True
+    nodes = material.node_tree.nodes
+    links = material.node_tree.links
+    nodes.clear()
+    output_node = nodes.new(type='ShaderNodeOutputMaterial')
+    bsdf_node = nodes.new(type='ShaderNodeBsdfPrincipled')
+    output_node.location = (400, 0)
+    bsdf_node.location = (200, 0)
+    links.new(bsdf_node.outputs['BSDF'], output_node.inputs['Surface'])
+    image_node = nodes.new(type='ShaderNodeTexImage')
+    image_node.location = (0, 0)
+    image_node.image = image
+    links.new(image_node.outputs['Color'], bsdf_node.inputs['Base Color'])
+    return material
+
+
+def node_pointers(obj):
+    material = obj.active_material
+    return {node.as_pointer() for node in material.node_tree.nodes} if material else set()
+
+
+def run(label, swap, objects, skins, rounds):
+    # First assignment builds whatever the method needs; it is not counted
+    for obj in objects:
+        swap(obj, skins[0])
+    bpy.context.view_layer.update()
+
+    swap_time = update_time = redraw_time = 0.0
+    swaps = rebuilt = 0
+    for round_index in range(rounds):
+        for skin_index in range(1, len(skins) + 1):
+            skin = skins[skin_index % len(skins)]
+            before = [node_pointers(obj) for obj in objects]
+
+            start = time.perf_counter()
+            for obj in objects:
+                swap(obj, skin)
+            swap_time += time.perf_counter() - start
+
+            start = time.perf_counter()
+            bpy.context.view_layer.update()
+            update_time += time.perf_counter() - start
+
+            if not bpy.app.background:
+                start = time.perf_counter()
+                bpy.ops.wm.redraw_timer(type='DRAW_WIN', iterations=1)
+                redraw_time += time.perf_counter() - start
+
+            rebuilt += sum(node_pointers(obj) != pointers for obj, pointers in zip(objects, before))
+            swaps += len(objects)
+
+    slots = sum(len(obj.material_slots) for obj in objects) / len(objects)
+    line = (f"{label:<10}{swap_time / swaps * 1e6:>12.1f}{update_time / swaps * 1e6:>12.1f}"
+            f"{rebuilt:>10}/{swaps:<6}{slots:>8.1f}")
+    if not bpy.app.background:
+        line += f"{redraw_time / (swaps / len(objects)) * 1e3:>12.1f}"
+    print(line)
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--objects", type=int, default=20)
+    parser.add_argument("--skins", type=int, default=4)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--resolution", type=int, default=1024)
+    args = parser.parse_args(argv)
+
+    skins = make_skins(args.skins, args.resolution)
+    header = f"{'method':<10}{'swap us':>12}{'update us':>12}{'rebuilt':>17}{'slots':>8}"
+    if not bpy.app.background:
+        header += f"{'redraw ms':>12}"
+    print(header)
+    for label, swap in (("rebuild", rebuild_material), ("template", helpers.assign_skin_material)):
+        objects = make_objects(args.objects)
+        run(label, swap, objects, skins, args.rounds)
+        for obj in objects:
+            material = obj.active_material
+            mesh = obj.data
+            bpy.data.objects.remove(obj)
+            bpy.data.meshes.remove(mesh)
+            if material:
+                bpy.data.materials.remove(material)
+
+
+if __name__ == "__main__":
+    main(sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else [])
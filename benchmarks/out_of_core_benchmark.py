@@ -0,0 +1,122 @@
+"""
+Peak memory of skin processing with and without the out-of-core budget
+
+Every resolution and budget runs in a fresh background Blender, which creates
+a skin, composites a layer into an export snapshot, hashes it, encodes it as
+PNG and resizes it to half size, then reports its peak resident size:
+    blender -b --python benchmarks/out_of_core_benchmark.py -- --resolutions 4096 8192 16384 --budgets 0 2048
+"""
+import bpy
+import os
+import sys
+import json
+import time
+import hashlib
+import argparse
+import resource
+import tempfile
+import importlib
+import subprocess
+
+
+ADDON_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(ADDON_DIR))
+pixels = importlib.import_module(f"{os.path.basename(ADDON_DIR)}.pixels")
+scratch = importlib.import_module(f"{os.path.basename(ADDON_DIR)}.scratch")
+
+
+def peak_rss_mb():
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+
+
+def darken(array):
+    """Stand-in for a layer composite, done band by band like the real ones."""
+    for start, stop in scratch.bands(array.shape[0], array.strides[0]):
+        array[start:stop, :, :3] *= 0.8
+        scratch.release_pages(array, start, stop)
+
+
+def run_child(args):
+    scratch.overrides["budget_mb"] = args.budget
+    timings = {}
+    baseline = peak_rss_mb()
+
+    start = time.perf_counter()
+    image = bpy.data.images.new("OOC_Skin", args.resolution, args.resolution, alpha=True, float_buffer=args.float)
+    array = pixels.read_pixels(image, tag="bench")
+    for row, stop in scratch.bands(array.shape[0], array.strides[0]):
+        array[row:stop] = (row / array.shape[0], 0.5, 0.25, 1.0)
+        scratch.release_pages(array, row, stop)
+    pixels.write_pixels(image, array)
+    timings["create"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    snapshot = pixels.snapshot_uint8(image, composite=darken)
+    timings["composite"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    digest = pixels.update_hash(hashlib.blake2b(), snapshot).hexdigest()
+    timings["hash"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    with tempfile.TemporaryDirectory(prefix="tattoo_ooc_") as folder:
+        pixels.encode_file(os.path.join(folder, "skin.png"), snapshot, 'PNG', compress_level=1)
+    timings["encode"] = time.perf_counter() - start
+    del snapshot
+
+    start = time.perf_counter()
+    pixels.resize_image(image, args.resolution // 2, args.resolution // 2)
+    timings["resize"] = time.perf_counter() - start
+
+    print(json.dumps({
+        "resolution": args.resolution,
+        "budget_mb": args.budget,
+        "image_mb": args.resolution ** 2 * 4 * (4 if args.float else 1) / (1024 * 1024),
+        "baseline_mb": baseline,
+        "peak_mb": peak_rss_mb(),
+        "seconds": timings,
+        "hash": digest[:16],
+    }))
+
+
+def run_parent(args):
+    blender = args.blender or bpy.app.binary_path
+    print(f"{'size':>7}{'budget MB':>11}{'image MB':>10}{'peak RSS MB':>13}{'over base':>11}{'seconds':>9}")
+    for resolution in args.resolutions:
+        for budget in args.budgets:
+            command = [blender, "-b", "--factory-startup", "--python", os.path.abspath(__file__), "--",
+                       "--child", "--resolution", str(resolution), "--budget", str(budget)]
+            if args.float:
+                command.append("--float")
+            result = subprocess.run(command, capture_output=True, text=True)
+            lines = [line for line in result.stdout.splitlines() if line.startswith("{")]
+            if result.returncode or not lines:
+                print(f"{resolution:>7}{budget:>11}  failed (exit code {result.returncode})")
+                continue
+            report = json.loads(lines[-1])
+            print(f"{resolution:>7}{budget:>11}{report['image_mb']:>10.0f}{report['peak_mb']:>13.0f}"
+                  f"{report['peak_mb'] - report['baseline_mb']:>11.0f}{sum(report['seconds'].values()):>9.1f}")
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--resolutions", type=int, nargs="+", default=[2048, 4096, 8192, 16384])
+    parser.add_argument("--budgets", type=int, nargs="+", default=[0, 2048],
+                        help="Memory budgets in MB to compare (0 = everything in RAM)")
+    parser.add_argument("--float", action="store_true", help="Use float skins instead of 8-bit ones")
+    parser.add_argument("--blender", default=None)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--resolution", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--budget", type=int, default=0, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        run_child(args)
+    else:
+        run_parent(args)
+
+
+if __name__ == "__main__":
+    main(sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else [])
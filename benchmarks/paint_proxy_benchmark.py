@@ -0,0 +1,138 @@
+"""
+Stroke latency on dense meshes with and without the paint proxy
+
+Builds a dense UV sphere standing in for a MetaHuman body, then times the
+proxy build, a cached proxy lookup, and BVH ray casts (what projection
+painting does for every dab) on the full mesh and on the proxy. In the UI
+it also paints the same stroke on both, reports the time per stroke and
+how many texels of the two results differ:
+    blender --python benchmarks/paint_proxy_benchmark.py -- --segments 1024 --rings 512 --ratio 0.25
+"""
+import bpy
+import os
+import sys
+import time
+import argparse
+import importlib
+import numpy as np
+from mathutils import Vector
+from mathutils.bvhtree import BVHTree
+
+
+ADDON_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(ADDON_DIR))
+helpers = importlib.import_module(f"{os.path.basename(ADDON_DIR)}.helpers")
+paint_proxy = importlib.import_module(f"{os.path.basename(ADDON_DIR)}.paint_proxy")
+
+
+def make_body(segments, rings, resolution):
+    bpy.ops.mesh.primitive_uv_sphere_add(segments=segments, ring_count=rings, radius=1.0)
+    obj = bpy.context.active_object
+    obj.name = "Bench_Body"
+    image = bpy.data.images.new("Bench_Skin", resolution, resolution)
+    image.generated_color = (0.8, 0.8, 0.8, 1.0)
+    helpers.assign_skin_material(obj, image)
+    return obj, image
+
+
+def ray_cast_time(obj, rays):
+    """Seconds per ray of a BVH cast onto the object, the core of a projection paint dab."""
+    tree = BVHTree.FromObject(obj, bpy.context.evaluated_depsgraph_get())
+    directions = np.random.default_rng(0).normal(size=(rays, 3))
+    start = time.perf_counter()
+    for direction in directions:
+        direction = Vector(direction).normalized()
+        tree.ray_cast(direction * 3.0, -direction)
+    return (time.perf_counter() - start) / rays
+
+
+def find_view():
+    for window in bpy.context.window_manager.windows:
+        for area in window.screen.areas:
+            if area.type == 'VIEW_3D':
+                region = next(region for region in area.regions if region.type == 'WINDOW')
+                return window, area, region
+    return None
+
+
+def stroke_points(region, count):
+    points = []
+    for index in range(count):
+        x = region.width * (0.3 + 0.4 * index / max(count - 1, 1))
+        y = region.height * 0.5
+        points.append({
+            "name": "", "location": (0.0, 0.0, 0.0), "mouse": (x, y), "mouse_event": (x, y),
+            "pressure": 1.0, "size": 40.0, "pen_flip": False, "time": float(index),
+            "is_start": index == 0, "x_tilt": 0.0, "y_tilt": 0.0,
+        })
+    return points
+
+
+def paint_stroke(obj, image, view, strokes, dabs):
+    """Seconds per stroke painted on `obj`, and the painted pixels."""
+    window, area, region = view
+    image.generated_color = (0.8, 0.8, 0.8, 1.0)
+    bpy.context.view_layer.objects.active = obj
+    with bpy.context.temp_override(window=window, area=area, region=region):
+        bpy.ops.view3d.view_selected()
+        bpy.ops.object.mode_set(mode='TEXTURE_PAINT')
+        points = stroke_points(region, dabs)
+        start = time.perf_counter()
+        for _ in range(strokes):
+            bpy.ops.paint.image_paint(stroke=points)
+        seconds = (time.perf_counter() - start) / strokes
+        bpy.ops.object.mode_set(mode='OBJECT')
+    result = np.empty(len(image.pixels), dtype=np.float32)
+    image.pixels.foreach_get(result)
+    return seconds, result
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--segments", type=int, default=1024)
+    parser.add_argument("--rings", type=int, default=512)
+    parser.add_argument("--ratio", type=float, default=paint_proxy.DEFAULT_RATIO)
+    parser.add_argument("--resolution", type=int, default=2048)
+    parser.add_argument("--rays", type=int, default=20000)
+    parser.add_argument("--strokes", type=int, default=5)
+    parser.add_argument("--dabs", type=int, default=30)
+    args = parser.parse_args(argv)
+
+    obj, image = make_body(args.segments, args.rings, args.resolution)
+
+    start = time.perf_counter()
+    proxy = paint_proxy.get_proxy(obj, args.ratio)
+    build = time.perf_counter() - start
+    start = time.perf_counter()
+    paint_proxy.get_proxy(obj, args.ratio)
+    lookup = time.perf_counter() - start
+
+    faces, full_faces = paint_proxy.face_counts(proxy)
+    print(f"faces: {full_faces} full, {faces} proxy")
+    print(f"proxy build: {build:.2f}s, cached lookup: {lookup * 1e3:.1f} ms")
+    full_ray = ray_cast_time(obj, args.rays)
+    proxy_ray = ray_cast_time(proxy, args.rays)
+    print(f"ray cast: {full_ray * 1e6:.2f} us full, {proxy_ray * 1e6:.2f} us proxy")
+
+    view = None if bpy.app.background else find_view()
+    if view is None:
+        print("stroke latency needs the UI (run without -b)")
+        return
+
+    paint_proxy.leave(proxy)
+    full_seconds, full_pixels = paint_stroke(obj, image, view, args.strokes, args.dabs)
+    paint_proxy.enter(obj, args.ratio)
+    proxy_seconds, proxy_pixels = paint_stroke(proxy, image, view, args.strokes, args.dabs)
+    paint_proxy.leave(proxy)
+
+    full_rgb = full_pixels.reshape(-1, 4)[:, :3]
+    proxy_rgb = proxy_pixels.reshape(-1, 4)[:, :3]
+    differing = np.count_nonzero(np.any(np.abs(full_rgb - proxy_rgb) > 0.5 / 255, axis=1))
+    painted = np.count_nonzero(np.any(np.abs(full_rgb - 0.8) > 0.5 / 255, axis=1))
+    print(f"stroke: {full_seconds * 1e3:.1f} ms full, {proxy_seconds * 1e3:.1f} ms proxy "
+          f"({full_seconds / proxy_seconds:.1f}x)")
+    print(f"texels differing: {differing} of {painted} painted")
+
+
+if __name__ == "__main__":
+    main(sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else [])
@@ -0,0 +1,87 @@
+"""
+Redraw-timing benchmark of the cached panel state
+
+Builds a mesh whose material has many nodes and compares the per-redraw cost
+of the old material traversal with the cached panel state. In the UI it also
+times full sidebar redraws:
+    blender -b --python benchmarks/panel_benchmark.py -- --nodes 500 --redraws 1000
+"""
+import bpy
+import os
+import sys
+import time
+import argparse
+import importlib
+
+
+ADDON_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(ADDON_DIR))
+helpers = importlib.import_module(f"{os.path.basename(ADDON_DIR)}.helpers")
+panel_state = importlib.import_module(f"{os.path.basename(ADDON_DIR)}.panel_state")
+
+
+def build_object(node_count):
+    """Create a plane whose material has `node_count` nodes before its image node."""
+    mesh = bpy.data.meshes.new("Bench_Body")
+    mesh.from_pydata([(0, 0, 0), (1, 0, 0), (1, 1, 0), (0, 1, 0)], [], [(0, 1, 2, 3)])
+    obj = bpy.data.objects.new("Bench_Body", mesh)
+    bpy.context.scene.collection.objects.link(obj)
+
+    material = bpy.data.materials.new("Bench_Material")
+    material.use_nodes = True
+    nodes = material.node_tree.nodes
+    for index in range(node_count):
+        nodes.new('ShaderNodeMath').location = (index * 10, -300)
+    image_node = nodes.new('ShaderNodeTexImage')
+    image_node.image = bpy.data.images.new("Bench_BC", 1024, 1024)
+    mesh.materials.append(material)
+    return obj
+
+
+def uncached_draw(obj):
+    """What the panel used to do on every redraw."""
+    image_node = helpers.get_active_image_texture_node(obj)
+    if image_node and image_node.image:
+        w, h = image_node.image.size
+    for _ in range(2):
+        image_node = helpers.get_active_image_texture_node(obj)
+        image_node and image_node.image and image_node.image.size[0] > 0 and image_node.image.size[1] > 0
+
+
+def cached_draw(obj):
+    state = panel_state.get_state(obj)
+    state.has_texture, state.can_resize, state.can_export
+
+
+def time_calls(func, obj, count):
+    start = time.perf_counter()
+    for _ in range(count):
+        func(obj)
+    return (time.perf_counter() - start) / count * 1e6
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--nodes", type=int, nargs="+", default=[10, 100, 500, 2000])
+    parser.add_argument("--redraws", type=int, default=1000)
+    args = parser.parse_args(argv)
+
+    print(f"{'nodes':>8}{'uncached us':>14}{'cached us':>12}{'speedup':>10}")
+    for node_count in args.nodes:
+        obj = build_object(node_count)
+        bpy.context.view_layer.objects.active = obj
+        uncached = time_calls(uncached_draw, obj, args.redraws)
+        cached = time_calls(cached_draw, obj, args.redraws)
+        print(f"{node_count:>8}{uncached:>14.1f}{cached:>12.2f}{uncached / cached:>9.0f}x")
+
+        if not bpy.app.background:
+            start = time.perf_counter()
+            bpy.ops.wm.redraw_timer(type='DRAW_WIN', iterations=args.redraws // 10)
+            print(f"{'':>8}full window redraw: {(time.perf_counter() - start) / (args.redraws // 10) * 1e3:.2f} ms")
+
+        bpy.data.objects.remove(obj)
+        panel_state.invalidate()
+
+
+if __name__ == "__main__":
+    main(sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else [])
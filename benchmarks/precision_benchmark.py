@@ -0,0 +1,84 @@
+"""
+Memory footprint of float skins under each image precision policy
+
+Writes a half-resolution float EXR skin per size, loads it through the skin
+loader (which applies the policy and upscales it to the target size) and
+reports the image memory in RAM, the GPU texture size, the pooled working
+buffers, the load time and how far the exported 8-bit pixels are from the
+full float result:
+    blender -b --python benchmarks/precision_benchmark.py -- --sizes 4096 8192
+"""
+import bpy
+import os
+import sys
+import time
+import argparse
+import tempfile
+import importlib
+import numpy as np
+
+
+ADDON_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(ADDON_DIR))
+helpers = importlib.import_module(f"{os.path.basename(ADDON_DIR)}.helpers")
+pixels = importlib.import_module(f"{os.path.basename(ADDON_DIR)}.pixels")
+precision = importlib.import_module(f"{os.path.basename(ADDON_DIR)}.precision")
+
+
+def write_exr(filepath, size):
+    """Save a float skin with a gradient and some noise as a half float EXR."""
+    image = bpy.data.images.new("Bench_EXR", size, size, alpha=True, float_buffer=True)
+    rows = np.linspace(0.0, 1.0, size, dtype=np.float32)[:, None]
+    array = np.empty((size, size, 4), dtype=np.float32)
+    array[..., 0] = rows
+    array[..., 1] = rows.T
+    array[..., 2] = np.random.default_rng(0).random((size, size), dtype=np.float32) * 0.5
+    array[..., 3] = 1.0
+    pixels.write_pixels(image, array)
+    settings = bpy.context.scene.render.image_settings
+    settings.file_format = 'OPEN_EXR'
+    settings.color_depth = '16'
+    image.save_render(filepath)
+    bpy.data.images.remove(image)
+
+
+def gpu_bytes(image):
+    width, height = image.size
+    if not image.is_float:
+        return width * height * 4
+    return width * height * 4 * (2 if image.use_half_precision else 4)
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[4096, 8192])
+    args = parser.parse_args(argv)
+
+    print(f"{'size':>6}  {'policy':<7}{'RAM MB':>9}{'GPU MB':>9}{'pool MB':>9}{'load s':>8}{'export diff':>13}")
+    with tempfile.TemporaryDirectory(prefix="tattoo_precision_") as folder:
+        for size in args.sizes:
+            filepath = os.path.join(folder, f"skin_{size}.exr")
+            write_exr(filepath, size // 2)
+            reference = None
+            for policy in ('FLOAT', 'HALF', 'BYTE'):
+                precision.overrides["policy"] = policy
+                pixels.release_buffers()
+
+                start = time.perf_counter()
+                image = helpers.load_skin_image(filepath, size)
+                seconds = time.perf_counter() - start
+
+                ram = pixels.image_bytes(image)
+                gpu = gpu_bytes(image)
+                pool = pixels.pooled_bytes()
+                snapshot = pixels.snapshot_uint8(image)
+                if reference is None:
+                    reference = snapshot
+                diff = int(np.abs(snapshot.astype(np.int16) - reference).max())
+                print(f"{size:>6}  {policy:<7}{ram >> 20:>9}{gpu >> 20:>9}{pool >> 20:>9}{seconds:>8.2f}{diff:>13}")
+                bpy.data.images.remove(image)
+            precision.overrides.clear()
+
+
+if __name__ == "__main__":
+    main(sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else [])
@@ -0,0 +1,75 @@
+"""
+Benchmark of the tiled NumPy resampler against Blender's image.scale()
+
+Run in Blender's background mode:
+    blender -b --python benchmarks/resample_benchmark.py -- --max-size 16384
+"""
+import bpy
+import os
+import sys
+import time
+import argparse
+import importlib
+import numpy as np
+
+
+ADDON_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(ADDON_DIR))
+resample = importlib.import_module(f"{os.path.basename(ADDON_DIR)}.resample")
+pixels = importlib.import_module(f"{os.path.basename(ADDON_DIR)}.pixels")
+
+CASES = [(2048, 4096), (4096, 8192), (8192, 16384)]
+
+
+def make_image(name, size):
+    """Create a generated RGBA image filled with smooth noise."""
+    image = bpy.data.images.new(name, width=size, height=size, alpha=True)
+    rng = np.random.default_rng(0)
+    coarse = rng.random((64, 64, 4), dtype=np.float32)
+    data = resample.resample(coarse, size, size, 'BILINEAR')
+    data[..., 3] = 1.0
+    pixels.write_pixels(image, data)
+    return image
+
+
+def time_scale(src_size, dst_size):
+    image = make_image("bench_scale", src_size)
+    start = time.perf_counter()
+    image.scale(dst_size, dst_size)
+    elapsed = time.perf_counter() - start
+    bpy.data.images.remove(image)
+    return elapsed
+
+
+def time_resample(src_size, dst_size, filter_name, workers):
+    image = make_image("bench_resample", src_size)
+    start = time.perf_counter()
+    image = pixels.resize_image(image, dst_size, dst_size, filter_name=filter_name, workers=workers)
+    elapsed = time.perf_counter() - start
+    bpy.data.images.remove(image)
+    pixels.release_buffers()
+    return elapsed
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--max-size", type=int, default=16384, help="Skip cases whose output exceeds this size")
+    parser.add_argument("--filters", nargs="+", default=list(resample.FILTERS), choices=list(resample.FILTERS))
+    parser.add_argument("--workers", type=int, default=0, help="Resample threads (0 = automatic)")
+    args = parser.parse_args(argv)
+
+    print(f"{'case':<14}{'image.scale':>14}" + "".join(f"{name:>14}" for name in args.filters))
+    for src_size, dst_size in CASES:
+        if dst_size > args.max_size:
+            continue
+        row = f"{src_size}->{dst_size}".ljust(14)
+        row += f"{time_scale(src_size, dst_size):>13.3f}s"
+        for filter_name in args.filters:
+            row += f"{time_resample(src_size, dst_size, filter_name, args.workers or None):>13.3f}s"
+        print(row)
+        scratch = resample.strip_bytes((src_size, src_size), (dst_size, dst_size), 4)
+        print(f"{'':<14}strip scratch per worker: {scratch / 2**20:.1f} MiB")
+
+
+if __name__ == "__main__":
+    main(sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else [])
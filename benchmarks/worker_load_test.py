@@ -0,0 +1,96 @@
+"""
+Load test of warm worker pool against cold per-job Blender processes
+
+Run in Blender's background mode with a batch manifest:
+    blender -b --python benchmarks/worker_load_test.py -- manifest.json --workers 4 --jobs 32
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+import importlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+
+ADDON_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(ADDON_DIR))
+batch = importlib.import_module(f"{os.path.basename(ADDON_DIR)}.batch")
+worker_pool = importlib.import_module(f"{os.path.basename(ADDON_DIR)}.worker_pool")
+
+
+def expand_jobs(manifest, count, output_dir):
+    """Cycle the manifest jobs into `count` uniquely named (job, output) pairs."""
+    jobs = []
+    for index in range(count):
+        job = dict(manifest["jobs"][index % len(manifest["jobs"])])
+        job["id"] = f"load_{index:04d}"
+        jobs.append((job, batch.output_path({"output_dir": output_dir}, job)))
+    return jobs
+
+
+def summarize(label, latencies, elapsed, failures):
+    latencies = np.asarray(latencies)
+    print(f"{label:<6}{len(latencies) / elapsed:>10.2f}{np.percentile(latencies, 50):>10.2f}s"
+          f"{np.percentile(latencies, 99):>10.2f}s{failures:>10}")
+
+
+def run_warm(jobs, workers, blender):
+    server = worker_pool.JobServer(port=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    server.start_workers(workers, blender)
+    try:
+        if not server.wait_for_workers(workers, timeout=300):
+            raise RuntimeError("Workers did not connect in time")
+        host, port = server.server_address[:2]
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=len(jobs)) as pool:
+            results = list(pool.map(lambda pair: worker_pool.submit(pair[0], pair[1], host, port), jobs))
+        elapsed = time.perf_counter() - start
+    finally:
+        server.stop_workers()
+        server.shutdown()
+        server.server_close()
+
+    return [r["latency"] for r in results], elapsed, sum(r["status"] != "done" for r in results)
+
+
+def run_cold(jobs, workers, blender):
+    manifest = {"output_dir": os.path.dirname(jobs[0][1])}
+    submitted = time.perf_counter()
+
+    def dispatch(pair):
+        record = batch.dispatch_job(manifest, pair[0], blender)
+        record["latency"] = time.perf_counter() - submitted
+        return record
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(dispatch, jobs))
+    elapsed = time.perf_counter() - submitted
+    return [r["latency"] for r in results], elapsed, sum(r["status"] != "done" for r in results)
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("manifest", help="Batch manifest whose jobs are replayed")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--jobs", type=int, default=32)
+    parser.add_argument("--blender", default=None)
+    parser.add_argument("--skip-cold", action="store_true")
+    args = parser.parse_args(argv)
+
+    manifest = batch.load_manifest(args.manifest)
+    with tempfile.TemporaryDirectory(prefix="tattoo_load_") as output_dir:
+        jobs = expand_jobs(manifest, args.jobs, output_dir)
+        print(f"{'mode':<6}{'jobs/s':>10}{'p50':>11}{'p99':>11}{'failed':>10}")
+        summarize("warm", *run_warm(jobs, args.workers, args.blender))
+        if not args.skip_cold:
+            summarize("cold", *run_cold(jobs, args.workers, args.blender))
+
+
+if __name__ == "__main__":
+    main(sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else [])
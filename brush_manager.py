@@ -3,6 +3,12 @@ Brush management functions for the Tattoo Master addon
 """
 import bpy
 from . import helpers
+from . import pixels
+from . import resample
+from . import precision
+from . import overlay
+from . import stencil_cache
+from . import image_memory
 
 
 def setup_tattoo_brush():
@@ -60,7 +66,15 @@ def setup_tattoo_brush():
         raise Exception("Could not get or create a brush for texture painting")
 
     # Set brush properties
-    brush.blend = 'MUL'  # Multiply blend mode
+    layer_image = overlay.get_layer_image(obj)
+    if layer_image:
+        # Deposit the stencil into the transparent layer; the layer's own
+        # blend mode is applied in the material and on export
+        brush.blend = 'MIX'
+        overlay.set_paint_target(obj, layer_image)
+    else:
+        brush.blend = 'MUL'  # Multiply blend mode
+        bpy.context.tool_settings.image_paint.mode = 'MATERIAL'
     brush.color = (1.0, 1.0, 1.0)  # White color
     brush.strength = 0.75
 
@@ -76,10 +90,9 @@ def setup_tattoo_brush():
     return brush
 
 
-def load_tattoo_image(filepath, resize_to_4k=False):
-    """Load a tattoo image for the stencil brush."""
-    # Load the image
-    image = bpy.data.images.load(filepath)
+def _load_stencil_image(filepath, resize_to_4k):
+    """Load (and optionally upscale) a stencil image into a new datablock."""
+    image = precision.apply(bpy.data.images.load(filepath))
 
     # Auto-resize logic (maintain aspect ratio)
     if resize_to_4k:
@@ -88,10 +101,19 @@ def load_tattoo_image(filepath, resize_to_4k=False):
         target_res = 4096
         
         if max_dim < target_res and max_dim > 0:
-            scale_factor = target_res / max_dim
-            new_width = int(width * scale_factor)
-            new_height = int(height * scale_factor)
-            image.scale(new_width, new_height)
+            new_width, new_height = resample.fit_size(width, height, target_res)
+            image = pixels.resize_image(image, new_width, new_height)
+    return image_memory.track(image)
+
+
+def get_stencil_image(filepath, resize_to_4k=False):
+    """Return the stencil image of a file, reusing the datablock if it was already loaded."""
+    return stencil_cache.get(filepath, resize_to_4k, lambda: _load_stencil_image(filepath, resize_to_4k))
+
+
+def load_tattoo_image(filepath, resize_to_4k=False):
+    """Load a tattoo image for the stencil brush."""
+    image = get_stencil_image(filepath, resize_to_4k)
 
     # Setup the brush
     brush = setup_tattoo_brush()
@@ -0,0 +1,329 @@
+"""
+DDS block-compression export for the Tattoo Master addon
+
+Vectorized BC1, BC3 and BC7 (mode 6) encoders writing DDS files with a full
+mip chain, so Unreal can import the textures without recompressing them.
+Each mip level is encoded in bands of 4x4 block rows spread over a thread pool
+and written as it goes; only the level being encoded and the next one down
+are held, in scratch files for large skins (see scratch.py).
+"""
+import struct
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from . import pixels
+from . import resample
+from . import scratch
+
+
+BAND_BLOCK_ROWS = 16
+
+# BC7 4-bit index interpolation weights (out of 64)
+BC7_WEIGHTS4 = np.array([0, 4, 9, 13, 17, 21, 26, 30, 34, 38, 43, 47, 51, 55, 60, 64], dtype=np.float32)
+
+FORMAT_ITEMS = [
+    ('BC1', "BC1 (DXT1)", "RGB, 4 bits per pixel, no alpha"),
+    ('BC3', "BC3 (DXT5)", "RGBA, 8 bits per pixel"),
+    ('BC7', "BC7", "High quality RGBA, 8 bits per pixel"),
+]
+
+MIP_FILTER_ITEMS = [
+    ('BOX', "Box", "Average of each 2x2 area"),
+    ('KAISER', "Kaiser", "Kaiser-windowed sinc, sharper mips"),
+]
+
+BLOCK_BYTES = {'BC1': 8, 'BC3': 16, 'BC7': 16}
+
+# Last encode statistics, shown by the export operator
+last_stats = {"megapixels": 0.0, "seconds": 0.0}
+
+
+# ---------------------------------------------------------------------------
+# Block helpers
+
+
+def to_blocks(rgba):
+    """Split a top-down (height, width, 4) uint8 array into (rows, cols, 16, 4) blocks.
+
+    Sizes that are not a multiple of 4 are padded by repeating the edge.
+    """
+    height, width = rgba.shape[:2]
+    pad_h, pad_w = -height % 4, -width % 4
+    if pad_h or pad_w:
+        rgba = np.pad(rgba, ((0, pad_h), (0, pad_w), (0, 0)), mode='edge')
+    rows, cols = rgba.shape[0] // 4, rgba.shape[1] // 4
+    blocks = rgba.reshape(rows, 4, cols, 4, 4).transpose(0, 2, 1, 3, 4)
+    return blocks.reshape(rows, cols, 16, 4)
+
+
+def pack_bits(fields, nbytes):
+    """Pack (values, bit offset, bit count) fields LSB-first into (n, nbytes) uint8."""
+    count = fields[0][0].shape[0]
+    words = np.zeros((count, nbytes // 8), dtype=np.uint64)
+    for values, offset, bits in fields:
+        values = values.astype(np.uint64) & np.uint64((1 << bits) - 1)
+        word, shift = divmod(offset, 64)
+        words[:, word] |= values << np.uint64(shift)
+        if shift + bits > 64:
+            # Field straddles two 64-bit words
+            words[:, word + 1] |= values >> np.uint64(64 - shift)
+    return words.astype('<u8').view(np.uint8)
+
+
+def _principal_endpoints(data):
+    """Ends of (n, 16, c) float blocks along their principal axis, as two (n, c) arrays."""
+    mean = data.mean(axis=1, keepdims=True)
+    centered = data - mean
+
+    # Power iterations on the block covariance, started from the texel farthest from the mean
+    covariance = np.einsum('nki,nkj->nij', centered, centered)
+    farthest = (centered ** 2).sum(axis=-1).argmax(axis=1)
+    axis = centered[np.arange(data.shape[0]), farthest]
+    for _ in range(4):
+        axis = np.einsum('nij,nj->ni', covariance, axis)
+        axis /= np.maximum(np.linalg.norm(axis, axis=1, keepdims=True), 1e-8)
+
+    projection = np.einsum('nki,ni->nk', centered, axis)
+    low = mean[:, 0] + axis * projection.min(axis=1, keepdims=True)
+    high = mean[:, 0] + axis * projection.max(axis=1, keepdims=True)
+    return low, high
+
+
+def _nearest(pixels, palette):
+    """Index of the nearest palette entry for each pixel; (n, 16, c) x (n, k, c) -> (n, 16)."""
+    distance = ((pixels[:, :, None, :] - palette[:, None, :, :]) ** 2).sum(axis=-1)
+    return distance.argmin(axis=-1)
+
+
+# ---------------------------------------------------------------------------
+# BC1 / BC3
+
+
+def _to565(rgb):
+    r = (rgb[:, 0] * 31.0 / 255.0 + 0.5).astype(np.uint16)
+    g = (rgb[:, 1] * 63.0 / 255.0 + 0.5).astype(np.uint16)
+    b = (rgb[:, 2] * 31.0 / 255.0 + 0.5).astype(np.uint16)
+    return (r << 11) | (g << 5) | b
+
+
+def _from565(color):
+    r = ((color >> 11) & 31).astype(np.float32) * 255.0 / 31.0
+    g = ((color >> 5) & 63).astype(np.float32) * 255.0 / 63.0
+    b = (color & 31).astype(np.float32) * 255.0 / 31.0
+    return np.stack([r, g, b], axis=-1)
+
+
+def encode_bc1_colors(blocks):
+    """Encode (n, 16, 4) uint8 blocks as (n, 8) BC1 color blocks in 4-color mode."""
+    rgb = blocks[..., :3].astype(np.float32)
+    # Endpoints along the principal axis (a bounding box diagonal misses
+    # colors that rise in one channel while falling in another), inset
+    # slightly against outliers
+    low, high = _principal_endpoints(rgb)
+    inset = (high - low) / 16.0
+    c0 = _to565(np.clip(high - inset, 0, 255))
+    c1 = _to565(np.clip(low + inset, 0, 255))
+
+    # 4-color mode needs c0 > c1; equal endpoints mean a flat block
+    swap = c0 < c1
+    c0, c1 = np.where(swap, c1, c0), np.where(swap, c0, c1)
+
+    e0, e1 = _from565(c0), _from565(c1)
+    palette = np.stack([e0, e1, (2 * e0 + e1) / 3.0, (e0 + 2 * e1) / 3.0], axis=1)
+    indices = _nearest(rgb, palette)
+    indices[c0 == c1] = 0
+
+    fields = [(c0, 0, 16), (c1, 16, 16)]
+    fields += [(indices[:, i], 32 + 2 * i, 2) for i in range(16)]
+    return pack_bits(fields, 8)
+
+
+def encode_bc3_alpha(blocks):
+    """Encode the alpha of (n, 16, 4) uint8 blocks as (n, 8) BC3 alpha blocks."""
+    alpha = blocks[..., 3].astype(np.float32)
+    a0 = alpha.max(axis=1)
+    a1 = alpha.min(axis=1)
+    # Palette order of the 8-alpha mode: a0, a1, then 6 interpolated values
+    weights = np.array([7, 0, 6, 5, 4, 3, 2, 1], dtype=np.float32) / 7.0
+    palette = a0[:, None] * weights[None, :] + a1[:, None] * (1.0 - weights[None, :])
+    indices = _nearest(alpha[..., None], palette[..., None])
+    indices[a0 == a1] = 0
+
+    fields = [(a0.astype(np.uint8), 0, 8), (a1.astype(np.uint8), 8, 8)]
+    fields += [(indices[:, i], 16 + 3 * i, 3) for i in range(16)]
+    return pack_bits(fields, 8)
+
+
+def encode_bc1(blocks):
+    return encode_bc1_colors(blocks)
+
+
+def encode_bc3(blocks):
+    return np.concatenate([encode_bc3_alpha(blocks), encode_bc1_colors(blocks)], axis=1)
+
+
+# ---------------------------------------------------------------------------
+# BC7 (mode 6: one subset, RGBA endpoints 7 bits + p-bit, 4-bit indices)
+
+
+def _bc7_endpoint(values):
+    """Quantize (n, 4) endpoints to 7 bits per channel plus a shared p-bit."""
+    values = np.clip(np.round(values), 0, 255).astype(np.int32)
+    pbit = ((values & 1).sum(axis=1) >= 2).astype(np.int32)
+    high = np.clip((values - pbit[:, None]) >> 1, 0, 127)
+    return high, pbit
+
+
+def encode_bc7(blocks):
+    """Encode (n, 16, 4) uint8 blocks as (n, 16) BC7 mode 6 blocks."""
+    data = blocks.astype(np.float32)
+    e0, e1 = _principal_endpoints(data)
+
+    q0, p0 = _bc7_endpoint(e0)
+    q1, p1 = _bc7_endpoint(e1)
+    d0 = ((q0 << 1) | p0[:, None]).astype(np.float32)
+    d1 = ((q1 << 1) | p1[:, None]).astype(np.float32)
+
+    weights = BC7_WEIGHTS4 / 64.0
+    palette = d0[:, None, :] * (1.0 - weights[None, :, None]) + d1[:, None, :] * weights[None, :, None]
+    indices = _nearest(data, palette)
+
+    # The anchor (first) index is stored with 3 bits, so its top bit must be 0
+    flip = indices[:, 0] >= 8
+    q0[flip], q1[flip] = q1[flip].copy(), q0[flip].copy()
+    p0[flip], p1[flip] = p1[flip].copy(), p0[flip].copy()
+    indices[flip] = 15 - indices[flip]
+
+    fields = [(np.full(data.shape[0], 1 << 6), 0, 7)]
+    offset = 7
+    for channel in range(4):
+        fields.append((q0[:, channel], offset, 7))
+        fields.append((q1[:, channel], offset + 7, 7))
+        offset += 14
+    fields += [(p0, 63, 1), (p1, 64, 1), (indices[:, 0], 65, 3)]
+    fields += [(indices[:, i], 68 + 4 * (i - 1), 4) for i in range(1, 16)]
+    return pack_bits(fields, 16)
+
+
+ENCODE_BLOCKS = {
+    'BC1': encode_bc1,
+    'BC3': encode_bc3,
+    'BC7': encode_bc7,
+}
+
+
+# ---------------------------------------------------------------------------
+# Mip chain and DDS container
+
+
+def mip_count(width, height):
+    return max(width, height).bit_length()
+
+
+def _quantize(level, srgb):
+    """uint8 copy of a linear float level, converted band by band."""
+    out = scratch.empty(level.shape, np.uint8)
+    for start, stop in scratch.bands(level.shape[0], level.strides[0]):
+        band = level[start:stop].copy()
+        if srgb:
+            pixels.linear_to_srgb(band)
+        np.multiply(band, 255.0, out=band)
+        np.add(band, 0.5, out=band)
+        out[start:stop] = np.clip(band, 0, 255)
+        scratch.release_pages(out, start, stop)
+    return out
+
+
+def mip_levels(rgba, mip_filter='KAISER', srgb=True):
+    """Yield the top-down uint8 levels of a full mip chain, largest first.
+
+    Each level is computed from the previous float level only when the
+    caller asks for it, so the chain is never held in memory at once.
+    """
+    yield rgba
+    level = pixels.to_float32(rgba, out=scratch.empty(rgba.shape, np.float32))
+    if srgb:
+        pixels.srgb_to_linear(level)
+    while max(level.shape[:2]) > 1:
+        height, width = level.shape[:2]
+        smaller = scratch.empty((max(1, height // 2), max(1, width // 2), level.shape[2]), np.float32)
+        level = resample.resample(level, smaller.shape[1], smaller.shape[0], mip_filter, out=smaller, release=scratch.release_pages)
+        yield _quantize(level, srgb)
+
+
+def encode_level(rgba, block_format, workers=None, cancel=None):
+    """Block-compress one top-down level in parallel bands of block rows.
+
+    Yields the compressed bands in order, so they can be written while the
+    next ones are encoded.
+    """
+    height, width = rgba.shape[:2]
+    rows = -(-height // 4)
+    encoder = ENCODE_BLOCKS[block_format]
+
+    def run(start):
+        if cancel is not None and cancel.is_set():
+            return b""
+        stop = min(start + BAND_BLOCK_ROWS, rows)
+        blocks = to_blocks(rgba[start * 4:stop * 4])
+        data = encoder(blocks.reshape(-1, 16, 4)).tobytes()
+        scratch.release_pages(rgba, start * 4, stop * 4)
+        return data
+
+    starts = range(0, rows, BAND_BLOCK_ROWS)
+    with ThreadPoolExecutor(max_workers=workers or resample.default_workers()) as pool:
+        for data in pool.map(run, starts):
+            yield data
+    if cancel is not None and cancel.is_set():
+        raise pixels.ExportCancelled()
+
+
+def dds_header(width, height, mip_count, block_format, srgb=True):
+    """Build the DDS header (with a DX10 extension for BC7)."""
+    flags = 0x1 | 0x2 | 0x4 | 0x1000 | 0x20000 | 0x80000
+    linear_size = max(1, (width + 3) // 4) * max(1, (height + 3) // 4) * BLOCK_BYTES[block_format]
+    four_cc = {'BC1': b"DXT1", 'BC3': b"DXT5", 'BC7': b"DX10"}[block_format]
+    pixel_format = struct.pack("<II4s5I", 32, 0x4, four_cc, 0, 0, 0, 0, 0)
+    caps = 0x1000 | 0x8 | 0x400000
+    header = struct.pack("<7I", 124, flags, height, width, linear_size, 0, mip_count)
+    header += b"\0" * 44 + pixel_format + struct.pack("<5I", caps, 0, 0, 0, 0)
+    if block_format == 'BC7':
+        dxgi_format = 99 if srgb else 98  # DXGI_FORMAT_BC7_UNORM(_SRGB)
+        header += struct.pack("<5I", dxgi_format, 3, 0, 1, 0)
+    return b"DDS " + header
+
+
+def write_dds(f, rgba, progress=None, cancel=None, block_format='BC7', mip_filter='KAISER', srgb=True, workers=None):
+    """Encode a bottom-up RGBA uint8 array as a block-compressed DDS with mips."""
+    start = time.perf_counter()
+    height, width = rgba.shape[:2]
+    count = mip_count(width, height)
+    f.write(dds_header(width, height, count, block_format, srgb))
+
+    total = sum(max(1, height >> i) * max(1, width >> i) for i in range(count))
+    done = 0
+    for level in mip_levels(rgba[::-1], mip_filter, srgb):
+        for data in encode_level(level, block_format, workers, cancel):
+            f.write(data)
+        done += level.shape[0] * level.shape[1]
+        if progress is not None:
+            progress(done / total)
+
+    elapsed = time.perf_counter() - start
+    last_stats["megapixels"] = total / 1e6
+    last_stats["seconds"] = elapsed
+
+
+def throughput():
+    """Megapixels per second of the last DDS encode, mip levels included."""
+    return last_stats["megapixels"] / last_stats["seconds"] if last_stats["seconds"] else 0.0
+
+
+def _encoder(block_format):
+    def encode(f, rgba, progress=None, cancel=None, **options):
+        write_dds(f, rgba, progress, cancel, block_format=block_format, **options)
+    return encode
+
+
+for _format in ENCODE_BLOCKS:
+    pixels.ENCODERS['DDS_' + _format] = _encoder(_format)
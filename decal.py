@@ -0,0 +1,283 @@
+"""
+UV-space decal stamping for the Tattoo Master addon
+
+Projects a stencil onto a mesh from a 3D placement (surface point, normal,
+up vector, size and rotation) and writes it straight into the UV texture,
+without interactive stencil painting. Triangles near the placement are found
+with a BVH and rasterized in UV space; everything after that is vectorized
+over texels, so the result only depends on the placement and the mesh.
+"""
+import bpy
+import numpy as np
+from mathutils import Vector
+from mathutils.bvhtree import BVHTree
+from . import helpers
+from . import overlay
+from . import udim
+
+
+# Texels whose centre lies this far outside a triangle (in barycentric units)
+# are still stamped, so UV island borders do not show a seam
+BARY_EPSILON = 0.01
+
+
+class Placement:
+    """Where and how big a stencil goes on the surface, in world space."""
+
+    def __init__(self, point, normal, up=(0.0, 0.0, 1.0), size=0.1, rotation=0.0, opacity=1.0, depth=None):
+        self.point = np.asarray(point, dtype=np.float64)
+        self.normal = np.asarray(normal, dtype=np.float64)
+        self.up = np.asarray(up, dtype=np.float64)
+        self.size = float(size)  # Stencil width in scene units
+        self.rotation = float(rotation)  # Radians around the normal
+        self.opacity = float(opacity)
+        self.depth = float(depth) if depth is not None else 0.5 * self.size
+
+    @classmethod
+    def from_dict(cls, data):
+        """Placement from a batch manifest entry; `rotation` is in degrees there."""
+        return cls(
+            data["point"], data["normal"], data.get("up", (0.0, 0.0, 1.0)),
+            data.get("size", 0.1), np.radians(data.get("rotation", 0.0)),
+            data.get("opacity", 1.0), data.get("depth"),
+        )
+
+    def frame(self):
+        """Return the (right, up, normal) unit vectors of the decal."""
+        normal = self.normal / np.linalg.norm(self.normal)
+        up = self.up - normal * np.dot(self.up, normal)
+        if np.linalg.norm(up) < 1e-6:
+            # Up vector along the normal: any perpendicular direction will do
+            up = np.cross(normal, (1.0, 0.0, 0.0) if abs(normal[0]) < 0.9 else (0.0, 1.0, 0.0))
+        up /= np.linalg.norm(up)
+        right = np.cross(up, normal)
+        cos_r, sin_r = np.cos(self.rotation), np.sin(self.rotation)
+        return right * cos_r + up * sin_r, up * cos_r - right * sin_r, normal
+
+
+# ---------------------------------------------------------------------------
+# Vectorized texel helpers
+
+
+def rasterize(tri_uv, width, height):
+    """Texels covered by UV triangles.
+
+    `tri_uv` is (n, 3, 2) in [0, 1] UV space. Returns (triangle index, x, y,
+    barycentric weights) for every texel centre inside a triangle.
+    """
+    corners = tri_uv * np.array([width, height], dtype=np.float64)
+    low = np.clip(np.floor(corners.min(axis=1) - 0.5), 0, [width - 1, height - 1]).astype(np.int64)
+    high = np.clip(np.ceil(corners.max(axis=1) - 0.5), 0, [width - 1, height - 1]).astype(np.int64)
+    span = high - low + 1
+    counts = span[:, 0] * span[:, 1]
+
+    # One entry per texel of every triangle's bounding box
+    triangle = np.repeat(np.arange(len(corners)), counts)
+    offset = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    x = low[triangle, 0] + offset % span[triangle, 0]
+    y = low[triangle, 1] + offset // span[triangle, 0]
+
+    a, b, c = corners[triangle, 0], corners[triangle, 1], corners[triangle, 2]
+    px = x + 0.5
+    py = y + 0.5
+    v0 = b - a
+    v1 = c - a
+    denom = v0[:, 0] * v1[:, 1] - v1[:, 0] * v0[:, 1]
+    valid = np.abs(denom) > 1e-12
+    denom = np.where(valid, denom, 1.0)
+    w1 = ((px - a[:, 0]) * v1[:, 1] - v1[:, 0] * (py - a[:, 1])) / denom
+    w2 = (v0[:, 0] * (py - a[:, 1]) - (px - a[:, 0]) * v0[:, 1]) / denom
+    weights = np.stack([1.0 - w1 - w2, w1, w2], axis=1)
+
+    inside = valid & (weights.min(axis=1) >= -BARY_EPSILON)
+    return triangle[inside], x[inside], y[inside], weights[inside]
+
+
+def sample_bilinear(image, u, v):
+    """Bilinearly sample a (height, width, channels) array at normalized coordinates."""
+    height, width = image.shape[:2]
+    fx = np.clip(u * width - 0.5, 0.0, width - 1.0)
+    fy = np.clip(v * height - 0.5, 0.0, height - 1.0)
+    x0 = fx.astype(np.intp)
+    y0 = fy.astype(np.intp)
+    x1 = np.minimum(x0 + 1, width - 1)
+    y1 = np.minimum(y0 + 1, height - 1)
+    tx = (fx - x0)[:, None]
+    ty = (fy - y0)[:, None]
+    top = image[y0, x0] * (1.0 - tx) + image[y0, x1] * tx
+    bottom = image[y1, x0] * (1.0 - tx) + image[y1, x1] * tx
+    return top * (1.0 - ty) + bottom * ty
+
+
+def project(positions, placement, aspect):
+    """Decal coordinates of world positions: (u, v, inside mask)."""
+    right, up, normal = placement.frame()
+    local = positions - placement.point
+    u = local @ right / placement.size + 0.5
+    v = local @ up / (placement.size * aspect) + 0.5
+    depth = local @ normal
+    inside = (u >= 0.0) & (u < 1.0) & (v >= 0.0) & (v < 1.0) & (np.abs(depth) <= placement.depth)
+    return u, v, inside
+
+
+def composite_over(target, sample, opacity):
+    """Alpha-composite RGBA samples over RGBA texels (used for the tattoo layer)."""
+    alpha = sample[:, 3:4] * opacity
+    base_alpha = target[:, 3:4]
+    out_alpha = alpha + base_alpha * (1.0 - alpha)
+    color = sample[:, :3] * alpha + target[:, :3] * base_alpha * (1.0 - alpha)
+    target[:, :3] = np.where(out_alpha > 0.0, color / np.maximum(out_alpha, 1e-8), target[:, :3])
+    target[:, 3:4] = out_alpha
+    return target
+
+
+# ---------------------------------------------------------------------------
+# Mesh surface
+
+
+class MeshSurface:
+    """World-space triangles of a mesh with their UVs and a BVH over them."""
+
+    def __init__(self, obj, depsgraph=None):
+        depsgraph = depsgraph or bpy.context.evaluated_depsgraph_get()
+        evaluated = obj.evaluated_get(depsgraph)
+        mesh = evaluated.to_mesh()
+        try:
+            uv_layer = mesh.uv_layers.active
+            if uv_layer is None:
+                raise RuntimeError(f"{obj.name} has no UV map")
+            mesh.calc_loop_triangles()
+
+            count = len(mesh.vertices)
+            positions = np.empty(count * 3, dtype=np.float32)
+            mesh.vertices.foreach_get("co", positions)
+            self.local_positions = positions.reshape(count, 3)
+            normals = np.empty(count * 3, dtype=np.float32)
+            mesh.vertices.foreach_get("normal", normals)
+            self.vertex_normals = normals.reshape(count, 3)
+            self.matrix = np.array(obj.matrix_world, dtype=np.float64)
+            self.positions = self.to_world(self.local_positions)
+
+            count = len(mesh.loop_triangles)
+            self.triangles = np.empty(count * 3, dtype=np.int32)
+            mesh.loop_triangles.foreach_get("vertices", self.triangles)
+            self.triangles = self.triangles.reshape(count, 3)
+            loops = np.empty(count * 3, dtype=np.int32)
+            mesh.loop_triangles.foreach_get("loops", loops)
+
+            uvs = np.empty(len(mesh.loops) * 2, dtype=np.float32)
+            uv_layer.data.foreach_get("uv", uvs)
+            self.uvs = uvs.reshape(-1, 2)[loops].reshape(count, 3, 2)
+        finally:
+            evaluated.to_mesh_clear()
+
+        corners = self.positions[self.triangles]
+        normals = np.cross(corners[:, 1] - corners[:, 0], corners[:, 2] - corners[:, 0])
+        self.normals = normals / np.maximum(np.linalg.norm(normals, axis=1, keepdims=True), 1e-12)
+        self.bvh = BVHTree.FromPolygons(self.positions.tolist(), self.triangles.tolist())
+
+    def to_world(self, positions):
+        return positions @ self.matrix[:3, :3].T + self.matrix[:3, 3]
+
+    def snap(self, point):
+        """Nearest surface point and its normal."""
+        location, normal, index, distance = self.bvh.find_nearest(Vector(point))
+        if location is None:
+            return None
+        return tuple(location), tuple(normal)
+
+    def ray_cast(self, origin, direction):
+        """First surface hit of a ray as (point, normal), or None."""
+        location, normal, index, distance = self.bvh.ray_cast(Vector(origin), Vector(direction))
+        if location is None:
+            return None
+        return tuple(location), tuple(normal)
+
+    def candidates(self, placement, aspect):
+        """Indices of the front-facing triangles that can touch the decal volume."""
+        half = 0.5 * placement.size * np.array([1.0, aspect])
+        radius = float(np.sqrt(half[0] ** 2 + half[1] ** 2 + placement.depth ** 2))
+        found = self.bvh.find_nearest_range(Vector(placement.point), radius)
+        indices = np.array([index for location, normal, index, distance in found], dtype=np.int64)
+        if not len(indices):
+            return indices
+        facing = self.normals[indices] @ (placement.normal / np.linalg.norm(placement.normal)) > 0.0
+        return indices[facing]
+
+
+def surface_texels(surface, indices, width, height, maps=None):
+    """Texel coordinates and world positions of the given triangles: (x, y, positions).
+
+    Texels on shared edges or under overlapping UVs are listed once per
+    triangle covering them.
+    """
+    if maps is None:
+        return _rasterized_texels(surface, indices, width, height)
+
+    # Baked maps (see texel_maps.py): a lookup instead of a rasterization
+    overlapped = maps.overlapped[indices]
+    flat = maps.texels_of(indices[~overlapped])
+    y, x = np.divmod(flat, width)
+    positions = surface.to_world(maps.position.reshape(-1, 3)[flat])
+    if not overlapped.any():
+        return x, y, positions
+
+    # A texel shared by overlapping UVs holds one triangle only, and it may be
+    # one on the other side of the body: rasterize those triangles again
+    extra_x, extra_y, extra_positions = _rasterized_texels(surface, indices[overlapped], width, height)
+    return (np.concatenate([x, extra_x]), np.concatenate([y, extra_y]),
+            np.concatenate([positions, extra_positions]))
+
+
+def _rasterized_texels(surface, indices, width, height):
+    triangle, x, y, weights = rasterize(surface.uvs[indices], width, height)
+    corners = surface.positions[surface.triangles[indices[triangle]]]
+    return x, y, np.einsum('nk,nkc->nc', weights, corners)
+
+
+def stamp(base, surface, stencil, placement, mode='MULTIPLY', maps=None):
+    """Project a float RGBA stencil into a (height, width, channels) texture array.
+
+    Four-channel targets without a blend `mode` (the tattoo layer) are
+    alpha-composited; otherwise the stencil is blended like the brush would.
+    `maps` are optional baked texel maps of the surface at the texture size.
+    Returns the number of texels written.
+    """
+    height, width = base.shape[:2]
+    aspect = stencil.shape[0] / stencil.shape[1]
+    indices = surface.candidates(placement, aspect)
+    if not len(indices):
+        return 0
+
+    x, y, positions = surface_texels(surface, indices, width, height, maps)
+    u, v, inside = project(positions, placement, aspect)
+    if not inside.any():
+        return 0
+    # Keep one entry per texel, chosen among the triangles under the decal,
+    # so mirrored UV islands do not stamp the other side's position
+    flat, first = np.unique((y * width + x)[inside], return_index=True)
+    keep = np.flatnonzero(inside)[first]
+    x, y = x[keep], y[keep]
+    sample = sample_bilinear(stencil, u[keep], v[keep]).astype(np.float32)
+
+    texels = base[y, x]
+    if mode is None:
+        composite_over(texels, sample, placement.opacity)
+        base[y, x] = texels
+    else:
+        base[y, x, :3] = overlay.blend(texels[:, :3], sample, mode, placement.opacity)
+    return len(x)
+
+
+def target_image(obj):
+    """Return (image, blend mode): the tattoo layer when there is one, else the skin."""
+    layer = overlay.get_layer_image(obj)
+    if layer:
+        return layer, None
+    node = helpers.get_active_image_texture_node(obj)
+    if not node:
+        raise RuntimeError("No image texture found in active material")
+    if udim.is_tiled(node.image):
+        # Only the first tile of a UDIM image can be read and written from Python
+        raise RuntimeError("Not supported on UDIM skins")
+    return node.image, 'MULTIPLY'
@@ -3,6 +3,30 @@ Helper functions for the Tattoo Master addon
 """
 import bpy
 import os
+from . import pixels
+from . import profiling
+from . import image_memory
+from . import shared_images
+from . import resample
+from . import precision
+from . import udim
+from . import import_cache
+from . import registry
+
+
+MATERIAL_TEMPLATE = "Tattoo_Skin_Template"
+TEMPLATE_PROPERTY = "tattoo_template"
+TEMPLATE_VERSION = 1
+SKIN_NODE = "Skin Texture"
+
+# Optimized for static meshes (Skin only, no bones)
+FBX_IMPORT_OPTIONS = {
+    "use_anim": False,
+    "ignore_leaf_bones": True,
+    "force_connect_children": False,
+    "use_custom_normals": False,  # Changed to False to prevent viewport crashes
+    "use_image_search": False,    # Prevent hangs searching for missing textures
+}
 
 
 def get_active_image_texture_node(obj):
@@ -13,25 +37,67 @@ def get_active_image_texture_node(obj):
     material = obj.active_material
     if material.use_nodes:
         for node in material.node_tree.nodes:
-            if node.type == 'TEX_IMAGE' and node.image:
+            # Tattoo layer nodes are paint targets, not the skin texture
+            if node.type == 'TEX_IMAGE' and node.image and not node.name.startswith("TattooLayer"):
                 return node
     return None
 
 
 def get_inzoi_body_object():
-    """Find the inZOI body object by name."""
-    for obj in bpy.context.scene.objects:
-        if obj.type == 'MESH' and ('body' in obj.name.lower() or 'body' in obj.data.name.lower() or 'character' in obj.name.lower()):
-            return obj
-    return None
+    """Find the inZOI body object through the character registry."""
+    return registry.get_object(registry.ROLE_BODY)
 
 
 def get_inzoi_head_object():
-    """Find the inZOI head object by name."""
-    for obj in bpy.context.scene.objects:
-        if obj.type == 'MESH' and ('head' in obj.name.lower() or 'head' in obj.data.name.lower() or 'character' in obj.name.lower()):
-            return obj
-    return None
+    """Find the inZOI head object through the character registry."""
+    return registry.get_object(registry.ROLE_HEAD)
+
+
+def _imported_body(objects):
+    """The body among just imported objects, or the registry's body if they have none.
+
+    The registry returns the first body in the scene, which is an older
+    avatar's when one was imported before.
+    """
+    roles = {}
+    for obj in objects:
+        roles.setdefault(registry.detect_role(obj), obj)
+    return roles.get(registry.ROLE_BODY) or roles.get(registry.ROLE_CHARACTER) or get_inzoi_body_object()
+
+
+@profiling.profiled()
+def import_inzoi_fbx(filepath):
+    """Import an inZOI FBX and return its body object with a UV map and a material slot ensured.
+
+    Repeated imports of the same file are served from the import cache.
+    """
+    cached = import_cache.lookup(filepath, FBX_IMPORT_OPTIONS)
+    if cached is not None:
+        return _imported_body(cached)
+
+    existing = set(bpy.data.objects)
+    bpy.ops.import_scene.fbx(filepath=filepath, **FBX_IMPORT_OPTIONS)
+
+    bpy.context.view_layer.update()
+
+    imported = [obj for obj in bpy.data.objects if obj not in existing]
+    body_obj = _imported_body(imported)
+    if not body_obj:
+        return None
+
+    # Ensure UV map exists (required for texture painting)
+    if not body_obj.data.uv_layers:
+        body_obj.data.uv_layers.new(name="UVMap")
+
+    # Ensure a material slot exists, so the cached mesh already has the slot the skin material fills
+    if not body_obj.material_slots:
+        body_obj.data.materials.append(None)
+
+    # Record the role on the object so later lookups are unambiguous
+    registry.tag(body_obj, registry.ROLE_BODY)
+
+    import_cache.store(filepath, FBX_IMPORT_OPTIONS, imported)
+    return body_obj
 
 
 def ensure_uv_layer(obj):
@@ -43,90 +109,145 @@ def ensure_uv_layer(obj):
     return False
 
 
-def create_character_material(obj, image_path=None):
-    """Create or update a material for the character object with an image texture."""
-    # Check preferences for auto UV creation
+def load_skin_image(image_path, target_resolution):
+    """Load a skin image, upscaling it when it is smaller than the target resolution."""
+    final_image = None
+    # Try loading directly first
     try:
-        addon_prefs = bpy.context.preferences.addons.get(__package__)
-        if addon_prefs:
-            use_auto_uv = addon_prefs.preferences.use_auto_uv
-            target_resolution = addon_prefs.preferences.default_resolution
-        else:
-            use_auto_uv = True  # Default value
-            target_resolution = 4096
+        final_image = bpy.data.images.load(image_path)
     except:
-        use_auto_uv = True  # Default value in case of error
-        target_resolution = 4096
+        # Try absolute path if direct load fails
+        try:
+            abs_path = bpy.path.abspath(image_path)
+            final_image = bpy.data.images.load(abs_path)
+        except:
+            pass
 
-    if use_auto_uv and not obj.data.uv_layers:
-        bpy.context.view_layer.objects.active = obj
-        bpy.ops.mesh.uv_texture_add()
+    if not final_image:
+        # If path was provided but failed to load, raise error instead of fallback
+        raise RuntimeError(f"Failed to load image: {image_path}")
 
-    # Create or get material
-    material_name = f"{obj.name}_TattooMaterial"
-    material = bpy.data.materials.get(material_name)
+    # 16-bit and EXR skins load as float images
+    final_image = precision.apply(final_image)
 
-    if not material:
-        material = bpy.data.materials.new(name=material_name)
-        obj.data.materials.append(material)
-    else:
-        obj.active_material = material
+    # Auto-scale if resolution is lower than target (keeping the aspect ratio)
+    if max(final_image.size) < target_resolution:
+        new_width, new_height = resample.fit_size(final_image.size[0], final_image.size[1], target_resolution)
+        final_image = pixels.resize_image(final_image, new_width, new_height)
+    return final_image
 
-    # Enable use of nodes
-    material.use_nodes = True
-    nodes = material.node_tree.nodes
-    links = material.node_tree.links
 
-    # Clear existing nodes
+def get_material_template():
+    """Return the material every character material is copied from, building it once per session."""
+    template = bpy.data.materials.get(MATERIAL_TEMPLATE)
+    if template is not None and template.get(TEMPLATE_PROPERTY) == TEMPLATE_VERSION:
+        return template
+    if template is None:
+        template = bpy.data.materials.new(name=MATERIAL_TEMPLATE)
+
+    # Enable use of nodes
+    template.use_nodes = True
+    nodes = template.node_tree.nodes
+    links = template.node_tree.links
     nodes.clear()
 
     # Create shader nodes
     output_node = nodes.new(type='ShaderNodeOutputMaterial')
     bsdf_node = nodes.new(type='ShaderNodeBsdfPrincipled')
+    image_node = nodes.new(type='ShaderNodeTexImage')
+    image_node.name = SKIN_NODE
 
     # Position nodes
     output_node.location = (400, 0)
     bsdf_node.location = (200, 0)
+    image_node.location = (0, 0)
 
-    # Link nodes
+    # Link nodes: image -> Base Color -> Surface
     links.new(bsdf_node.outputs['BSDF'], output_node.inputs['Surface'])
+    links.new(image_node.outputs['Color'], bsdf_node.inputs['Base Color'])
 
-    # Create image texture node
-    image_node = nodes.new(type='ShaderNodeTexImage')
-    image_node.location = (0, 0)
+    template[TEMPLATE_PROPERTY] = TEMPLATE_VERSION
+    return template
 
-    # Load image if provided
-    final_image = None
-    
-    if image_path:
-        # Try loading directly first
-        try:
-            final_image = bpy.data.images.load(image_path)
-        except:
-            # Try absolute path if direct load fails
-            try:
-                abs_path = bpy.path.abspath(image_path)
-                final_image = bpy.data.images.load(abs_path)
-            except:
-                pass
-        
-        if final_image:
-            # Auto-scale if resolution is lower than target
-            if final_image.size[0] < target_resolution or final_image.size[1] < target_resolution:
-                final_image.scale(target_resolution, target_resolution)
+
+def _matches_template(material, template):
+    return (
+        material.get(TEMPLATE_PROPERTY) == TEMPLATE_VERSION
+        and material.use_nodes
+        and {node.name for node in material.node_tree.nodes} == {node.name for node in template.node_tree.nodes}
+    )
+
+
+def assign_skin_material(obj, image):
+    """Show `image` on the object through its copy of the material template.
+
+    A material that still matches the template only gets its image pointer
+    changed, so its shader is not rebuilt. Otherwise (first skin, or a tattoo
+    layer was added since) a fresh copy of the template replaces it.
+    """
+    template = get_material_template()
+    material_name = f"{obj.name}_TattooMaterial"
+    material = bpy.data.materials.get(material_name)
+    if material is None or not _matches_template(material, template):
+        instance = template.copy()
+        if material is not None:
+            material.user_remap(instance)
+            bpy.data.materials.remove(material)
+        instance.name = material_name
+        material = instance
+
+    # Fill the active slot instead of appending a new one on every call
+    if obj.active_material != material:
+        obj.active_material = material
+
+    image_node = material.node_tree.nodes[SKIN_NODE]
+    if image_node.image != image:
+        image_node.image = image
+    shared_images.retain(material, image)
+    return material
+
+
+@profiling.profiled()
+def create_character_material(obj, image_path=None):
+    """Create or update a material for the character object with an image texture."""
+    # Check preferences for auto UV creation
+    try:
+        addon_prefs = bpy.context.preferences.addons.get(__package__)
+        if addon_prefs:
+            use_auto_uv = addon_prefs.preferences.use_auto_uv
+            target_resolution = addon_prefs.preferences.default_resolution
         else:
-            # If path was provided but failed to load, raise error instead of fallback
+            use_auto_uv = True  # Default value
+            target_resolution = 4096
+    except:
+        use_auto_uv = True  # Default value in case of error
+        target_resolution = 4096
+
+    if use_auto_uv and not obj.data.uv_layers:
+        bpy.context.view_layer.objects.active = obj
+        bpy.ops.mesh.uv_texture_add()
+
+    # Load image if provided (shared with every material using the same file)
+    if image_path and udim.is_udim_path(image_path):
+        try:
+            key = udim.file_key(image_path, target_resolution)
+        except OSError:
+            raise RuntimeError(f"Failed to load UDIM tiles: {image_path}")
+        final_image = shared_images.get(key, lambda: udim.load_skin_tiles(image_path, target_resolution))
+    elif image_path:
+        try:
+            key = shared_images.file_key(image_path, target_resolution)
+        except OSError:
             raise RuntimeError(f"Failed to load image: {image_path}")
+        final_image = shared_images.get(key, lambda: load_skin_image(image_path, target_resolution))
     else:
-        # Fallback: Create a default white image if no path provided
-        final_image = bpy.data.images.new(f"{obj.name}_BC", width=target_resolution, height=target_resolution)
-        final_image.generated_color = (0.8, 0.8, 0.8, 1.0)  # Light gray
+        # Fallback: a light gray image of its own, painting on it must not show on other meshes
+        final_image = precision.new_image(f"{obj.name}_BC", target_resolution, target_resolution, (0.8, 0.8, 0.8, 1.0))
 
-    image_node.image = final_image
-
-    # Connect image to BSDF
-    links.new(image_node.outputs['Color'], bsdf_node.inputs['Base Color'])
+    material = assign_skin_material(obj, image_memory.track(final_image))
 
+    # The skin this replaced has no users left
+    image_memory.collect()
     return material
 
 
@@ -0,0 +1,103 @@
+"""
+Image memory governor for the Tattoo Master addon
+
+Skins, stencils and tattoo layers created or loaded by the addon are marked
+with a custom property. Replacing a skin or clearing a texture leaves the old
+image without users but with its pixels in memory until the file is saved
+and reopened, so marked images without users are removed after every such
+operation. Unsaved paint is never thrown away: orphans with unsaved changes
+are kept and counted. Above the session budget, unused stencils are evicted
+and the pixels of saved images are freed (Blender reloads them when drawn).
+"""
+import bpy
+from . import pixels
+from . import stencil_cache
+
+
+MANAGED_PROPERTY = "tattoo_managed"
+
+# Session counters shown in the panel
+stats = {"current_bytes": 0, "peak_bytes": 0, "purged": 0, "purged_bytes": 0, "freed_bytes": 0, "kept_dirty": 0}
+
+
+def get_budget():
+    """Session image memory budget in bytes from the addon preferences (0 = no limit)."""
+    budget_mb = 8192
+    try:
+        addon_prefs = bpy.context.preferences.addons.get(__package__)
+        if addon_prefs:
+            budget_mb = addon_prefs.preferences.image_memory_budget
+    except:
+        pass
+    return budget_mb * 1024 * 1024
+
+
+def track(image):
+    """Mark an image as created or loaded by the addon."""
+    image[MANAGED_PROPERTY] = True
+    update()
+    return image
+
+
+def managed_images():
+    return [image for image in bpy.data.images if image.get(MANAGED_PROPERTY)]
+
+
+def update():
+    """Recount the memory of the managed images; returns the current bytes."""
+    current = sum(pixels.image_bytes(image) for image in managed_images())
+    stats["current_bytes"] = current
+    stats["peak_bytes"] = max(stats["peak_bytes"], current)
+    return current
+
+
+def _remove(image):
+    stats["purged"] += 1
+    stats["purged_bytes"] += pixels.image_bytes(image)
+    bpy.data.images.remove(image)
+
+
+def discard(image):
+    """Remove an image the user chose to throw away, unsaved changes included, once unused."""
+    if image is not None and not image.users:
+        _remove(image)
+        update()
+
+
+def collect(budget=None, include_dirty=False):
+    """Remove managed images without users, then bring the rest within `budget` bytes.
+
+    Stencils are left to the stencil cache, which keeps unused ones for reuse
+    until the budget is exceeded. Returns the bytes still in use.
+    """
+    budget = get_budget() if budget is None else budget
+    kept_dirty = 0
+    for image in managed_images():
+        if image.users or image.get(stencil_cache.KEY_PROPERTY):
+            continue
+        if image.is_dirty and not include_dirty:
+            kept_dirty += 1
+            continue
+        _remove(image)
+    stats["kept_dirty"] = kept_dirty
+
+    current = update()
+    if budget and current > budget:
+        stencil_cache.evict(budget=max(0, stencil_cache.used_bytes() - (current - budget)))
+        current = update()
+
+    if budget and current > budget:
+        # Saved images can give their pixels back; they are reloaded from disk when needed
+        reloadable = [
+            image for image in managed_images()
+            if image.has_data and not image.is_dirty and image.source == 'FILE' and not image.packed_file
+        ]
+        for image in sorted(reloadable, key=pixels.image_bytes, reverse=True):
+            size = pixels.image_bytes(image)
+            image.buffers_free()
+            stats["freed_bytes"] += size
+            current -= size
+            if current <= budget:
+                break
+        current = update()
+    return current
@@ -0,0 +1,171 @@
+"""
+Content-addressed FBX import cache for the Tattoo Master addon
+
+Imported avatars are written to a .blend file named after a hash of the FBX
+contents and the import options. Later imports of the same file append the
+objects from that .blend instead of parsing the FBX again.
+"""
+import bpy
+import os
+import json
+import time
+import hashlib
+
+
+INDEX_NAME = "index.json"
+HASH_CHUNK = 1 << 20
+
+# Session counters shown in the panel
+stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+# Settings used instead of the addon preferences (benchmarks)
+overrides = {}
+
+
+def get_settings():
+    """Return (enabled, cache folder, budget in bytes) from the addon preferences."""
+    enabled, folder, budget_mb = True, "", 2048
+    try:
+        addon_prefs = bpy.context.preferences.addons.get(__package__)
+        if addon_prefs:
+            prefs = addon_prefs.preferences
+            enabled = prefs.use_import_cache
+            folder = bpy.path.abspath(prefs.import_cache_dir) if prefs.import_cache_dir else ""
+            budget_mb = prefs.import_cache_size
+    except:
+        pass
+    enabled = overrides.get("enabled", enabled)
+    folder = overrides.get("folder", folder)
+    if not folder:
+        folder = bpy.utils.user_resource('DATAFILES', path=os.path.join("tattoo_master", "import_cache"), create=True)
+    return enabled, folder, budget_mb * 1024 * 1024
+
+
+def _read_index(folder):
+    try:
+        with open(os.path.join(folder, INDEX_NAME), 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {"entries": {}, "hashes": {}}
+
+
+def _write_index(folder, index):
+    # Write-then-rename so concurrent batch workers never see a torn index
+    path = os.path.join(folder, INDEX_NAME)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(index, f, indent=1)
+    os.replace(tmp_path, path)
+
+
+def file_digest(filepath, index=None):
+    """SHA-256 of a file, reusing the stored digest while size and mtime match."""
+    filepath = os.path.abspath(filepath)
+    stat = os.stat(filepath)
+    if index is not None:
+        known = index["hashes"].get(filepath)
+        if known and known[0] == stat.st_size and known[1] == stat.st_mtime:
+            return known[2]
+
+    digest = hashlib.sha256()
+    with open(filepath, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK), b""):
+            digest.update(chunk)
+    digest = digest.hexdigest()
+
+    if index is not None:
+        index["hashes"][filepath] = [stat.st_size, stat.st_mtime, digest]
+    return digest
+
+
+def cache_key(filepath, options, index=None):
+    """Cache key for an FBX file imported with the given options."""
+    options_blob = json.dumps(options, sort_keys=True).encode('utf-8')
+    return hashlib.sha256(file_digest(filepath, index).encode('ascii') + options_blob).hexdigest()
+
+
+def lookup(filepath, options):
+    """Append the cached objects for this FBX into the scene, or return None on a miss."""
+    enabled, folder, budget = get_settings()
+    if not enabled:
+        return None
+
+    index = _read_index(folder)
+    key = cache_key(filepath, options, index)
+    blend_path = os.path.join(folder, key + ".blend")
+    if key not in index["entries"] or not os.path.exists(blend_path):
+        stats["misses"] += 1
+        _write_index(folder, index)
+        return None
+
+    with bpy.data.libraries.load(blend_path, link=False) as (data_from, data_to):
+        data_to.objects = list(data_from.objects)
+
+    collection = bpy.context.scene.collection
+    objects = [obj for obj in data_to.objects if obj is not None]
+    for obj in objects:
+        # The cache file was written with fake users on everything it holds
+        for datablock in [obj, obj.data] + [slot.material for slot in obj.material_slots]:
+            if datablock is not None:
+                datablock.use_fake_user = False
+        collection.objects.link(obj)
+    bpy.context.view_layer.update()
+
+    index["entries"][key]["last_used"] = time.time()
+    _write_index(folder, index)
+    stats["hits"] += 1
+    return objects
+
+
+def store(filepath, options, objects):
+    """Write freshly imported objects to the cache and evict old entries."""
+    enabled, folder, budget = get_settings()
+    if not enabled or not objects:
+        return
+
+    index = _read_index(folder)
+    key = cache_key(filepath, options, index)
+    blend_path = os.path.join(folder, key + ".blend")
+    tmp_path = os.path.join(folder, f"{key}.{os.getpid()}.tmp.blend")
+    try:
+        bpy.data.libraries.write(tmp_path, set(objects), fake_user=True, compress=False)
+        os.replace(tmp_path, blend_path)
+    except Exception as e:
+        print(f"Tattoo Master: could not write import cache: {e}")
+        return
+
+    index["entries"][key] = {
+        "fbx": os.path.abspath(filepath),
+        "size": os.path.getsize(blend_path),
+        "last_used": time.time(),
+    }
+    evict(folder, index, budget)
+    _write_index(folder, index)
+
+
+def evict(folder, index, budget):
+    """Remove least recently used entries until the cache fits in `budget` bytes."""
+    entries = index["entries"]
+    total = sum(entry["size"] for entry in entries.values())
+    for key in sorted(entries, key=lambda k: entries[k]["last_used"]):
+        if total <= budget or len(entries) <= 1:
+            break
+        total -= entries[key]["size"]
+        try:
+            os.remove(os.path.join(folder, key + ".blend"))
+        except OSError:
+            pass
+        del entries[key]
+        stats["evictions"] += 1
+
+
+def clear():
+    """Delete every cached import."""
+    enabled, folder, budget = get_settings()
+    index = _read_index(folder)
+    for key in index["entries"]:
+        try:
+            os.remove(os.path.join(folder, key + ".blend"))
+        except OSError:
+            pass
+    _write_index(folder, {"entries": {}, "hashes": {}})
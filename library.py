@@ -0,0 +1,210 @@
+"""
+Tattoo library browser for the Tattoo Master addon
+
+Lists the stencil images of the default tattoo folder one page at a time.
+Thumbnails are decoded and downscaled in a thread pool and stored in a cache
+folder under the hash of the image file, so a folder that was browsed before
+opens with just a directory listing and a few stat calls per visible page.
+Full resolution images are only loaded when a stencil is picked.
+"""
+import bpy
+import os
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import bpy.utils.previews
+import imbuf
+from . import import_cache
+from . import resample
+
+
+IMAGE_EXTENSIONS = {".png", ".jpg", ".jpeg", ".tga", ".bmp", ".tif", ".tiff", ".exr"}
+THUMBNAIL_SIZE = 128
+PAGE_SIZE = 24
+INDEX_NAME = "index.json"
+POLL_INTERVAL = 0.25
+
+
+def get_cache_folder():
+    return bpy.utils.user_resource('DATAFILES', path=os.path.join("tattoo_master", "thumbnails"), create=True)
+
+
+def _read_index(folder):
+    try:
+        with open(os.path.join(folder, INDEX_NAME), 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {"hashes": {}}
+
+
+def _write_index(folder, index):
+    path = os.path.join(folder, INDEX_NAME)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(index, f)
+    os.replace(tmp_path, path)
+
+
+def make_thumbnail(filepath, thumbnail_path):
+    """Decode an image and write a downscaled copy (runs in a worker thread)."""
+    image = imbuf.load(filepath)
+    try:
+        width, height = image.size
+        new_width, new_height = resample.fit_size(width, height, THUMBNAIL_SIZE)
+        if (new_width, new_height) != (width, height) and max(width, height) > THUMBNAIL_SIZE:
+            image.resize((new_width, new_height), method='BILINEAR')
+        # Written under a temporary name so a half-written thumbnail is never picked up
+        tmp_path = f"{thumbnail_path}.{threading.get_ident()}.tmp"
+        imbuf.write(image, filepath=tmp_path)
+        os.replace(tmp_path, thumbnail_path)
+    finally:
+        image.free()
+
+
+class Library:
+    """One browsed folder: its file list, the current page and its thumbnails."""
+
+    def __init__(self, folder):
+        self.folder = folder
+        self.cache_folder = get_cache_folder()
+        self.page = 0
+        self.files = sorted(
+            entry.path for entry in os.scandir(folder)
+            if entry.is_file() and os.path.splitext(entry.name)[1].lower() in IMAGE_EXTENSIONS
+        ) if os.path.isdir(folder) else []
+        self.index = _read_index(self.cache_folder)
+        self.index_dirty = False
+        self.previews = bpy.utils.previews.new()
+        self.executor = ThreadPoolExecutor(max_workers=resample.default_workers(), thread_name_prefix="TattooThumb")
+        self.thumbnails = {}  # image path -> thumbnail path
+        self.pending = {}  # image path -> Future
+        self.failed = set()
+
+    @property
+    def page_count(self):
+        return max(1, -(-len(self.files) // PAGE_SIZE))
+
+    def set_page(self, page):
+        self.page = min(max(page, 0), self.page_count - 1)
+        # Thumbnails of pages flipped past are not worth waiting for
+        start = self.page * PAGE_SIZE
+        visible = set(self.files[start:start + PAGE_SIZE])
+        for filepath, future in list(self.pending.items()):
+            if filepath not in visible and future.cancel():
+                del self.pending[filepath]
+
+    def _thumbnail_path(self, digest):
+        return os.path.join(self.cache_folder, digest + ".thumb")
+
+    def _known_thumbnail(self, filepath):
+        """Thumbnail path when the hash index is still valid for the file, without reading it."""
+        known = self.index["hashes"].get(os.path.abspath(filepath))
+        if not known:
+            return None
+        stat = os.stat(filepath)
+        if known[0] != stat.st_size or known[1] != stat.st_mtime:
+            return None
+        path = self._thumbnail_path(known[2])
+        return path if os.path.exists(path) else None
+
+    def _generate(self, filepath):
+        digest = import_cache.file_digest(filepath, self.index)
+        self.index_dirty = True
+        path = self._thumbnail_path(digest)
+        if not os.path.exists(path):
+            make_thumbnail(filepath, path)
+        return path
+
+    def page_items(self):
+        """Return [(image path, icon id or 0)] for the current page, queueing missing thumbnails."""
+        start = self.page * PAGE_SIZE
+        items = []
+        for filepath in self.files[start:start + PAGE_SIZE]:
+            thumbnail = self.thumbnails.get(filepath)
+            if thumbnail is None and filepath not in self.pending and filepath not in self.failed:
+                thumbnail = self._known_thumbnail(filepath)
+                if thumbnail:
+                    self.thumbnails[filepath] = thumbnail
+                else:
+                    self.pending[filepath] = self.executor.submit(self._generate, filepath)
+                    _start_polling()
+            if thumbnail:
+                preview = self.previews.get(thumbnail) or self.previews.load(thumbnail, thumbnail, 'IMAGE')
+                items.append((filepath, preview.icon_id))
+            else:
+                items.append((filepath, 0))
+        return items
+
+    def collect(self):
+        """Pick up finished thumbnails; returns True while some are still being made."""
+        for filepath, future in list(self.pending.items()):
+            if not future.done():
+                continue
+            del self.pending[filepath]
+            try:
+                self.thumbnails[filepath] = future.result()
+            except Exception as e:
+                self.failed.add(filepath)
+                print(f"Tattoo Master: no thumbnail for {filepath}: {e}")
+        if not self.pending and self.index_dirty:
+            self.index_dirty = False
+            _write_index(self.cache_folder, self.index)
+        return bool(self.pending)
+
+    def close(self):
+        for future in self.pending.values():
+            future.cancel()
+        self.executor.shutdown(wait=False)
+        bpy.utils.previews.remove(self.previews)
+
+
+_library = None
+
+
+def get_library(folder):
+    """Return the library of `folder`, opening it when the folder changed."""
+    global _library
+    folder = os.path.abspath(bpy.path.abspath(folder))
+    if _library is None or _library.folder != folder:
+        if _library is not None:
+            _library.close()
+        _library = Library(folder)
+    return _library
+
+
+def current():
+    """The library shown in the panel, if it was opened."""
+    return _library
+
+
+def refresh():
+    """Forget the listing so the folder is scanned again on the next redraw."""
+    global _library
+    if _library is not None:
+        _library.close()
+        _library = None
+
+
+def _poll():
+    if _library is None:
+        return None
+    busy = _library.collect()
+    try:
+        for window in bpy.context.window_manager.windows:
+            for area in window.screen.areas:
+                if area.type == 'VIEW_3D':
+                    area.tag_redraw()
+    except Exception:
+        pass
+    return POLL_INTERVAL if busy else None
+
+
+def _start_polling():
+    if not bpy.app.timers.is_registered(_poll):
+        bpy.app.timers.register(_poll, first_interval=POLL_INTERVAL)
+
+
+def unregister():
+    refresh()
+    if bpy.app.timers.is_registered(_poll):
+        bpy.app.timers.unregister(_poll)
@@ -0,0 +1,161 @@
+"""
+Symmetric tattoo mirroring for the Tattoo Master addon
+
+Builds, once per mesh and texture size, a texel-to-texel correspondence map
+across the mesh's X = 0 plane (object space) from the baked texel maps:
+mirror[i] is the flat index of the texel on the other side of the body that
+matches texel i, or -1. Mirroring a texture is then one gather.
+"""
+import os
+import numpy as np
+from mathutils import Vector
+from mathutils.kdtree import KDTree
+
+
+MAP_NAME = "mirror_x.npy"
+CHUNK_TEXELS = 1 << 17
+# Texels whose mirrored point is further outside its best triangle than
+# this (in barycentric units) have no counterpart, e.g. asymmetric parts
+MAX_OUTSIDE = 0.25
+
+DIRECTION_ITEMS = [
+    ('POSITIVE', "+X to -X", "Copy the tattoos of the +X side to the -X side"),
+    ('NEGATIVE', "-X to +X", "Copy the tattoos of the -X side to the +X side"),
+]
+
+
+def mirror_vertices(positions):
+    """Index of the vertex nearest to each vertex's mirror image."""
+    tree = KDTree(len(positions))
+    for index, co in enumerate(positions):
+        tree.insert(Vector(co), index)
+    tree.balance()
+    return np.array([tree.find(Vector((-co[0], co[1], co[2])))[1] for co in positions], dtype=np.int64)
+
+
+def triangle_candidates(triangles, vertex_count, mirrored):
+    """(triangles, k) indices of the triangles around each triangle's mirrored corners, -1 padded."""
+    flat = triangles.ravel()
+    owners = np.repeat(np.arange(len(triangles)), 3)
+    order = np.argsort(flat, kind='stable')
+    degree = np.bincount(flat, minlength=vertex_count)
+    starts = np.cumsum(degree) - degree
+    width = int(degree.max())
+
+    # (vertices, width) table of incident triangles
+    slots = np.arange(width)
+    incident = np.where(slots < degree[:, None], owners[order][np.minimum(starts[:, None] + slots, len(flat) - 1)], -1)
+    return incident[mirrored[triangles]].reshape(len(triangles), 3 * width)
+
+
+class _TriangleFrames:
+    """Per-triangle terms of the barycentric projection, computed once."""
+
+    def __init__(self, positions, triangles):
+        corners = positions[triangles]
+        self.origin = corners[:, 0]
+        self.edge0 = corners[:, 1] - corners[:, 0]
+        self.edge1 = corners[:, 2] - corners[:, 0]
+        self.d00 = (self.edge0 * self.edge0).sum(-1)
+        self.d01 = (self.edge0 * self.edge1).sum(-1)
+        self.d11 = (self.edge1 * self.edge1).sum(-1)
+        denom = self.d00 * self.d11 - self.d01 * self.d01
+        self.inverse = np.where(np.abs(denom) > 1e-20, 1.0 / np.where(denom == 0.0, 1.0, denom), 0.0)
+
+    def barycentric(self, points, triangles):
+        """Barycentric coordinates of (n, 3) points projected onto (n, k) triangles."""
+        offset = points[:, None, :] - self.origin[triangles]
+        d20 = np.einsum('nkc,nkc->nk', offset, self.edge0[triangles])
+        d21 = np.einsum('nkc,nkc->nk', offset, self.edge1[triangles])
+        inverse = self.inverse[triangles]
+        w1 = (self.d11[triangles] * d20 - self.d01[triangles] * d21) * inverse
+        w2 = (self.d00[triangles] * d21 - self.d01[triangles] * d20) * inverse
+        return np.stack([1.0 - w1 - w2, w1, w2], axis=-1)
+
+
+def prune_candidates(candidates, frames, positions, triangles):
+    """Keep the candidates that contain a sample point of the mirrored triangle, compacted to the left.
+
+    The samples are the centroid and points just inside the corners and
+    edge midpoints, so every triangle the mirror image overlaps is kept.
+    """
+    corners = positions[triangles] * (-1.0, 1.0, 1.0)
+    centroid = corners.mean(axis=1, keepdims=True)
+    edges = 0.5 * (corners + np.roll(corners, -1, axis=1))
+    samples = np.concatenate([centroid, centroid + 0.9 * (corners - centroid), centroid + 0.9 * (edges - centroid)], axis=1)
+
+    safe = np.maximum(candidates, 0)
+    keep = np.zeros(candidates.shape, dtype=bool)
+    for index in range(samples.shape[1]):
+        keep |= frames.barycentric(samples[:, index], safe).min(axis=-1) >= -0.01
+    keep &= candidates >= 0
+
+    # Duplicates (a triangle around several mirrored corners) are kept once
+    ranked = np.sort(np.where(keep, candidates, -1), axis=1)[:, ::-1]
+    ranked[:, 1:][ranked[:, 1:] == ranked[:, :-1]] = -1
+    ranked = -np.sort(-ranked, axis=1)
+    width = max(1, int((ranked >= 0).sum(axis=1).max()))
+    return ranked[:, :width]
+
+
+def build(maps, surface):
+    """Compute the mirror correspondence of baked texel maps."""
+    width, height = maps.width, maps.height
+    positions = surface.local_positions.astype(np.float64)
+    candidates = triangle_candidates(surface.triangles, len(positions), mirror_vertices(positions))
+    frames = _TriangleFrames(positions, surface.triangles)
+    candidates = prune_candidates(candidates, frames, positions, surface.triangles)
+
+    mirror = np.full(width * height, -1, dtype=np.int32)
+    covered = np.flatnonzero(maps.triangle.reshape(-1) >= 0)
+    texel_positions = maps.position.reshape(-1, 3)
+    texel_triangles = maps.triangle.reshape(-1)
+
+    for start in range(0, len(covered), CHUNK_TEXELS):
+        texels = covered[start:start + CHUNK_TEXELS]
+        points = texel_positions[texels].astype(np.float64) * (-1.0, 1.0, 1.0)
+        options = candidates[texel_triangles[texels]]  # (n, k)
+        safe = np.maximum(options, 0)
+        weights = frames.barycentric(points, safe)
+
+        # The triangle the mirrored point is deepest inside of
+        score = np.where(options >= 0, weights.min(axis=-1), -np.inf)
+        best = score.argmax(axis=1)
+        rows = np.arange(len(texels))
+        found = score[rows, best] >= -MAX_OUTSIDE
+        triangle = safe[rows, best]
+        weight = np.clip(weights[rows, best], 0.0, 1.0)
+        weight /= np.maximum(weight.sum(axis=1, keepdims=True), 1e-12)
+
+        uv = np.einsum('nk,nkc->nc', weight, surface.uvs[triangle])
+        x = np.clip((uv[:, 0] * width).astype(np.int64), 0, width - 1)
+        y = np.clip((uv[:, 1] * height).astype(np.int64), 0, height - 1)
+        mirror[texels[found]] = (y * width + x)[found]
+    return mirror
+
+
+def get_mirror_map(maps, surface):
+    """Return the mirror map stored with the texel maps, building it on first use."""
+    path = os.path.join(maps.folder, MAP_NAME)
+    if not os.path.exists(path):
+        tmp_path = f"{path}.{os.getpid()}.tmp.npy"
+        np.save(tmp_path, build(maps, surface))
+        os.replace(tmp_path, path)
+    return np.load(path, mmap_mode='r')
+
+
+def mirror_pixels(array, mirror, positions, direction='POSITIVE'):
+    """Copy the tattoos of one side of a (height, width, 4) tattoo layer onto the other in place.
+
+    Only painted source texels are copied, so paint already on the
+    destination side is kept. The skin itself is never mirrored: outside a
+    layer there is no telling tattoo texels from asymmetric skin detail.
+    """
+    flat = array.reshape(-1, array.shape[2])
+    side = positions.reshape(-1, 3)[:, 0]
+    destination = np.flatnonzero((side < 0.0 if direction == 'POSITIVE' else side > 0.0) & (mirror >= 0))
+    source = flat[mirror[destination]]
+    painted = source[:, 3] > flat[destination, 3]
+    destination, source = destination[painted], source[painted]
+    flat[destination] = source
+    return len(destination)
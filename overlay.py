@@ -0,0 +1,306 @@
+"""
+Non-destructive tattoo layer for the Tattoo Master addon
+
+Tattoos can be painted into a transparent layer image instead of straight
+into the skin. The material previews the layer over the skin with a Mix node
+whose blend type and factor are the layer settings. On export the layer is
+read back and reduced to the tiles that were actually painted, which are
+composited onto a copy of the skin, so the skin image itself is never
+modified.
+
+Blender paints into a full-size layer image and does not tell Python which
+texels a stroke touched, so every export reads the whole layer and scans
+its alpha. The sparse tiles bound the memory and time of compositing only;
+reading the layer still follows the texture resolution.
+"""
+import bpy
+import os
+import tempfile
+from contextlib import contextmanager
+import numpy as np
+from . import helpers
+from . import pixels
+from . import precision
+from . import udim
+from . import image_memory
+
+
+LAYER_NODE = "TattooLayer"
+MIX_NODE = "TattooLayerMix"
+OPACITY_NODE = "TattooLayerOpacity"
+
+TILE_SIZE = 64
+
+# Mix node blend type -> composite mode
+BLEND_MODES = {
+    'MULTIPLY': 'MULTIPLY',
+    'MIX': 'NORMAL',
+    'OVERLAY': 'OVERLAY',
+}
+
+# The only blend types the panel offers: the ones the export can reproduce
+BLEND_ITEMS = [
+    ('MULTIPLY', "Multiply", "Darken the skin with the tattoo ink"),
+    ('MIX', "Normal", "Paint the tattoo over the skin"),
+    ('OVERLAY', "Overlay", "Keep the skin detail under the tattoo"),
+]
+
+
+def blend(base, layer, mode, opacity):
+    """Blend float RGBA layer pixels over float base RGB pixels in place."""
+    alpha = layer[..., 3:4] * opacity
+    color = layer[..., :3]
+    if mode == 'MULTIPLY':
+        result = base * color
+    elif mode == 'OVERLAY':
+        result = np.where(base < 0.5, 2.0 * base * color, 1.0 - 2.0 * (1.0 - base) * (1.0 - color))
+    else:
+        result = color
+    base += (result - base) * alpha
+    return base
+
+
+class SparseLayer:
+    """RGBA layer stored as uint8 tiles, holding only the tiles with paint on them."""
+
+    def __init__(self, width, height, tile_size=TILE_SIZE):
+        self.width = width
+        self.height = height
+        self.tile_size = tile_size
+        self.tiles = {}  # (tile row, tile column) -> (tile_size, tile_size, 4) uint8
+
+    @classmethod
+    def from_array(cls, array, tile_size=TILE_SIZE):
+        """Keep the tiles of a (height, width, 4) float array whose alpha is non-zero.
+
+        The whole array is scanned, so this step follows the texture size.
+        """
+        height, width = array.shape[:2]
+        layer = cls(width, height, tile_size)
+
+        # Per-tile maximum alpha, reduced over row bands first so the only
+        # temporary is one row per tile row (edge tiles may be partial)
+        alpha = array[..., 3]
+        bands = np.maximum.reduceat(alpha, np.arange(0, height, tile_size), axis=0)
+        painted = np.maximum.reduceat(bands, np.arange(0, width, tile_size), axis=1) > 0.0
+
+        for row, col in np.argwhere(painted):
+            y0, x0 = row * tile_size, col * tile_size
+            tile = np.zeros((tile_size, tile_size, 4), dtype=np.uint8)
+            region = array[y0:y0 + tile_size, x0:x0 + tile_size]
+            tile[:region.shape[0], :region.shape[1]] = np.clip(region * 255.0 + 0.5, 0.0, 255.0)
+            layer.tiles[(int(row), int(col))] = tile
+        return layer
+
+    @property
+    def nbytes(self):
+        return sum(tile.nbytes for tile in self.tiles.values())
+
+    @property
+    def coverage(self):
+        """Fraction of the texture covered by stored tiles."""
+        total = -(-self.height // self.tile_size) * -(-self.width // self.tile_size)
+        return len(self.tiles) / total if total else 0.0
+
+    def composite(self, base, mode='MULTIPLY', opacity=1.0):
+        """Blend the layer onto a (height, width, channels) float array in place.
+
+        Only painted tiles are visited, so compositing follows the painted area.
+        """
+        if not self.tiles:
+            return base
+        size = self.tile_size
+        height, width = base.shape[:2]
+        keys = list(self.tiles)
+        layer = np.stack([self.tiles[key] for key in keys]).astype(np.float32) * (1.0 / 255.0)
+
+        if height % size == 0 and width % size == 0:
+            # Gather every painted tile of the base at once through a tiled view
+            grid = base.reshape(height // size, size, width // size, size, base.shape[2])
+            rows = np.array([key[0] for key in keys])
+            cols = np.array([key[1] for key in keys])
+            region = grid[rows, :, cols, :, :3]
+            grid[rows, :, cols, :, :3] = blend(region, layer, mode, opacity)
+        else:
+            for index, (row, col) in enumerate(keys):
+                region = base[row * size:(row + 1) * size, col * size:(col + 1) * size, :3]
+                h, w = region.shape[:2]
+                blend(region, layer[index, :h, :w], mode, opacity)
+        return base
+
+
+# ---------------------------------------------------------------------------
+# Layer in the material
+
+
+def _socket(sockets, identifier):
+    for socket in sockets:
+        if socket.identifier == identifier:
+            return socket
+    return None
+
+
+def get_layer_node(obj):
+    """Return the tattoo layer image node of the object's material, if any."""
+    if not obj or not obj.active_material or not obj.active_material.use_nodes:
+        return None
+    return obj.active_material.node_tree.nodes.get(LAYER_NODE)
+
+
+def get_layer_image(obj):
+    node = get_layer_node(obj)
+    return node.image if node else None
+
+
+def get_layer_settings(obj):
+    """Return (composite mode, opacity) of the object's tattoo layer.
+
+    Raises RuntimeError for a blend type set outside the panel (e.g. in the
+    shader editor) that the export cannot reproduce.
+    """
+    nodes = obj.active_material.node_tree.nodes
+    mix = nodes.get(MIX_NODE)
+    opacity = nodes.get(OPACITY_NODE)
+    if mix and mix.blend_type not in BLEND_MODES:
+        names = ", ".join(name for _, name, _ in BLEND_ITEMS)
+        raise RuntimeError(f"Tattoo layer blend '{mix.blend_type.title()}' cannot be exported, use {names}")
+    mode = BLEND_MODES[mix.blend_type] if mix else 'MULTIPLY'
+    return mode, opacity.inputs[1].default_value if opacity else 1.0
+
+
+def set_blend(obj, blend_type):
+    """Set the blend type of the object's tattoo layer Mix node."""
+    mix = obj.active_material.node_tree.nodes.get(MIX_NODE)
+    if mix is None:
+        raise RuntimeError("No tattoo layer on the active object")
+    mix.blend_type = blend_type
+
+
+def add_layer(obj):
+    """Add a transparent tattoo layer over the skin texture and return its image."""
+    base_node = helpers.get_active_image_texture_node(obj)
+    if not base_node:
+        raise RuntimeError("No skin texture to add a tattoo layer to")
+    if udim.is_tiled(base_node.image):
+        raise RuntimeError("Tattoo layers are not supported on UDIM skins")
+
+    node_tree = obj.active_material.node_tree
+    nodes = node_tree.nodes
+    links = node_tree.links
+
+    layer_node = nodes.get(LAYER_NODE)
+    if layer_node and layer_node.image:
+        return layer_node.image
+
+    width, height = base_node.image.size
+    # Always 8-bit: the layer holds display values, composited over the skin in display space
+    image = precision.new_image(f"{obj.name}_TattooLayer", width, height, (0.0, 0.0, 0.0, 0.0),
+                                alpha=True, policy='BYTE')
+    image_memory.track(image)
+
+    layer_node = nodes.new(type='ShaderNodeTexImage')
+    layer_node.name = LAYER_NODE
+    layer_node.label = "Tattoo Layer"
+    layer_node.image = image
+    layer_node.location = (base_node.location.x, base_node.location.y - 300)
+
+    opacity = nodes.new(type='ShaderNodeMath')
+    opacity.name = OPACITY_NODE
+    opacity.label = "Tattoo Opacity"
+    opacity.operation = 'MULTIPLY'
+    opacity.inputs[1].default_value = 1.0
+    opacity.location = (base_node.location.x + 150, base_node.location.y - 300)
+
+    mix = nodes.new(type='ShaderNodeMix')
+    mix.name = MIX_NODE
+    mix.label = "Tattoo Blend"
+    mix.data_type = 'RGBA'
+    mix.blend_type = 'MULTIPLY'
+    mix.location = (base_node.location.x + 150, base_node.location.y)
+
+    # Re-route skin -> Base Color through the mix node
+    for link in list(base_node.outputs['Color'].links):
+        target = link.to_socket
+        links.remove(link)
+        links.new(_socket(mix.outputs, 'Result_Color'), target)
+    links.new(base_node.outputs['Color'], _socket(mix.inputs, 'A_Color'))
+    links.new(layer_node.outputs['Color'], _socket(mix.inputs, 'B_Color'))
+    links.new(layer_node.outputs['Alpha'], opacity.inputs[0])
+    links.new(opacity.outputs['Value'], _socket(mix.inputs, 'Factor_Float'))
+
+    return image
+
+
+def remove_layer(obj):
+    """Remove the tattoo layer nodes and reconnect the skin directly."""
+    node_tree = obj.active_material.node_tree
+    nodes = node_tree.nodes
+    mix = nodes.get(MIX_NODE)
+    base_node = helpers.get_active_image_texture_node(obj)
+    if mix and base_node:
+        for link in list(_socket(mix.outputs, 'Result_Color').links):
+            node_tree.links.new(base_node.outputs['Color'], link.to_socket)
+    for name in (LAYER_NODE, OPACITY_NODE, MIX_NODE):
+        node = nodes.get(name)
+        if node:
+            nodes.remove(node)
+
+
+def set_paint_target(obj, image):
+    """Make the layer image the texture paint canvas."""
+    image_paint = bpy.context.tool_settings.image_paint
+    image_paint.mode = 'IMAGE'
+    image_paint.canvas = image
+
+
+# ---------------------------------------------------------------------------
+# Export
+
+
+def harvest(obj):
+    """Return the object's tattoo layer as a SparseLayer, or None without a layer.
+
+    Reads the full-resolution layer image: Blender keeps no record of the
+    painted region between exports.
+    """
+    image = get_layer_image(obj)
+    if not image:
+        return None
+    # A float layer from an older file holds linear values
+    return SparseLayer.from_array(pixels.read_display(image, tag="layer"))
+
+
+def compositor(obj):
+    """Return a callable compositing the object's layer, or None without a layer."""
+    layer = harvest(obj)
+    if layer is None:
+        return None
+    mode, opacity = get_layer_settings(obj)
+
+    def composite(base):
+        layer.composite(base, mode, opacity)
+
+    return composite
+
+
+@contextmanager
+def composited_for_export(obj):
+    """Temporarily swap the skin for a composited copy (used by the USD export)."""
+    base_node = helpers.get_active_image_texture_node(obj)
+    composite = compositor(obj) if base_node else None
+    if composite is None:
+        yield None
+        return
+
+    base_image = base_node.image
+    name = bpy.path.clean_name(base_image.name)
+    filepath = os.path.join(tempfile.gettempdir(), f"{name}_Tattooed.png")
+    pixels.encode_file(filepath, pixels.snapshot_uint8(base_image, composite), 'PNG')
+    exported = bpy.data.images.load(filepath)
+    exported.name = f"{name}_Tattooed"
+    base_node.image = exported
+    try:
+        yield exported
+    finally:
+        base_node.image = base_image
+        bpy.data.images.remove(exported)
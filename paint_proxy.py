@@ -0,0 +1,187 @@
+"""
+Paint proxies for the Tattoo Master addon
+
+Texture painting projects every stroke through the whole mesh, so strokes
+on a dense MetaHuman-style body stutter. A paint proxy is a decimated copy
+of the body or head that keeps its UV map and its materials. Strokes on it
+land in the same image datablock, so nothing has to be copied back. While
+painting, the proxy takes the place of the full mesh in the viewport.
+Proxies are kept in their own collection and reused while the evaluated
+mesh and the decimation ratio hash the same; a proxy of an older version of
+the mesh is replaced when painting starts again.
+"""
+import bpy
+import hashlib
+import numpy as np
+
+
+PROXY_PROPERTY = "tattoo_proxy_of"
+KEY_PROPERTY = "tattoo_proxy_key"
+COLLECTION_NAME = "Tattoo Paint Proxies"
+DEFAULT_RATIO = 0.25
+
+# Session counters shown in the panel
+stats = {"builds": 0, "hits": 0}
+
+
+def get_settings():
+    """(enabled, decimation ratio) from the addon preferences."""
+    enabled, ratio = False, DEFAULT_RATIO
+    try:
+        addon_prefs = bpy.context.preferences.addons.get(__package__)
+        if addon_prefs:
+            enabled = addon_prefs.preferences.use_paint_proxy
+            ratio = addon_prefs.preferences.paint_proxy_ratio
+    except:
+        pass
+    return enabled, ratio
+
+
+def is_proxy(obj):
+    return obj is not None and bool(obj.get(PROXY_PROPERTY))
+
+
+def source_object(obj):
+    """The full mesh a paint proxy stands in for, or the object itself."""
+    if is_proxy(obj):
+        return bpy.data.objects.get(obj[PROXY_PROPERTY]) or obj
+    return obj
+
+
+def mesh_key(obj, depsgraph, ratio):
+    """Hash of the evaluated mesh positions, topology and UVs, and the ratio."""
+    digest = hashlib.blake2b()
+    evaluated = obj.evaluated_get(depsgraph)
+    mesh = evaluated.to_mesh()
+    try:
+        arrays = [
+            (mesh.vertices, "co", np.float32, 3),
+            (mesh.loops, "vertex_index", np.int32, 1),
+            (mesh.polygons, "loop_total", np.int32, 1),
+        ]
+        if mesh.uv_layers.active:
+            arrays.append((mesh.uv_layers.active.data, "uv", np.float32, 2))
+        for collection, attribute, dtype, width in arrays:
+            values = np.empty(len(collection) * width, dtype=dtype)
+            collection.foreach_get(attribute, values)
+            digest.update(values.tobytes())
+    finally:
+        evaluated.to_mesh_clear()
+    digest.update(f"{ratio:.4f}".encode('ascii'))
+    return digest.hexdigest()
+
+
+def get_collection():
+    """The collection holding the proxies, linked to the current scene."""
+    scene = bpy.context.scene
+    collection = bpy.data.collections.get(COLLECTION_NAME)
+    if collection is None:
+        collection = bpy.data.collections.new(COLLECTION_NAME)
+    if collection.name not in scene.collection.children:
+        scene.collection.children.link(collection)
+    return collection
+
+
+def _decimate(obj, depsgraph, ratio):
+    """A new mesh of the evaluated object reduced to `ratio` of its faces."""
+    collection = get_collection()
+    source = bpy.data.meshes.new_from_object(obj.evaluated_get(depsgraph))
+    work = bpy.data.objects.new(f"{obj.name}_Decimating", source)
+    collection.objects.link(work)
+    try:
+        # Collapse interpolates the UVs of the corners it merges, so the
+        # proxy still maps onto the same texture space
+        modifier = work.modifiers.new("Decimate", 'DECIMATE')
+        modifier.decimate_type = 'COLLAPSE'
+        modifier.ratio = ratio
+        bpy.context.view_layer.update()
+        return bpy.data.meshes.new_from_object(work.evaluated_get(bpy.context.evaluated_depsgraph_get()))
+    finally:
+        bpy.data.objects.remove(work)
+        bpy.data.meshes.remove(source)
+
+
+def build_proxy(obj, key, ratio, depsgraph):
+    mesh = _decimate(obj, depsgraph, ratio)
+    mesh.name = f"{obj.name}_PaintProxy"
+    proxy = bpy.data.objects.new(mesh.name, mesh)
+    proxy[PROXY_PROPERTY] = obj.name
+    proxy[KEY_PROPERTY] = key
+    proxy.hide_render = True
+    get_collection().objects.link(proxy)
+    stats["builds"] += 1
+    return proxy
+
+
+def remove_proxy(proxy):
+    mesh = proxy.data
+    bpy.data.objects.remove(proxy)
+    if mesh.users == 0:
+        bpy.data.meshes.remove(mesh)
+
+
+def get_proxy(obj, ratio=None):
+    """Return the proxy of the object's current mesh, building it when there is none."""
+    ratio = get_settings()[1] if ratio is None else ratio
+    depsgraph = bpy.context.evaluated_depsgraph_get()
+    key = mesh_key(obj, depsgraph, ratio)
+
+    found = None
+    for candidate in [o for o in bpy.data.objects if is_proxy(o)]:
+        source = bpy.data.objects.get(candidate[PROXY_PROPERTY])
+        if source is None:
+            remove_proxy(candidate)
+        elif source == obj:
+            if found is None and candidate.get(KEY_PROPERTY) == key:
+                found = candidate
+            else:
+                # Built from an older version of the mesh
+                remove_proxy(candidate)
+
+    if found is not None:
+        stats["hits"] += 1
+        return found
+    return build_proxy(obj, key, ratio, depsgraph)
+
+
+def sync_materials(proxy):
+    """Give a proxy the materials its full mesh has now, so both show the same skin."""
+    source = source_object(proxy)
+    for index, slot in enumerate(source.material_slots):
+        if index < len(proxy.material_slots) and proxy.material_slots[index].material != slot.material:
+            proxy.material_slots[index].material = slot.material
+
+
+def enter(obj, ratio=None):
+    """Show the paint proxy of `obj` in its place and make it the active object."""
+    proxy = get_proxy(obj, ratio)
+    sync_materials(proxy)
+    proxy.matrix_world = obj.matrix_world
+    proxy.active_material_index = obj.active_material_index
+
+    view_layer = bpy.context.view_layer
+    proxy.hide_set(False)
+    obj.select_set(False)
+    obj.hide_set(True)
+    proxy.select_set(True)
+    view_layer.objects.active = proxy
+    return proxy
+
+
+def leave(proxy):
+    """Hide a paint proxy and make its full mesh the active object again."""
+    source = source_object(proxy)
+    view_layer = bpy.context.view_layer
+    proxy.select_set(False)
+    proxy.hide_set(True)
+    if source != proxy:
+        source.hide_set(False)
+        source.select_set(True)
+        view_layer.objects.active = source
+    return source
+
+
+def face_counts(proxy):
+    """(proxy faces, full mesh faces) of a proxy."""
+    source = source_object(proxy)
+    return len(proxy.data.polygons), len(source.data.polygons)
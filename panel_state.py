@@ -0,0 +1,103 @@
+"""
+Cached panel state for the Tattoo Master addon
+
+TATTOO_PT_panel.draw runs on every redraw of the sidebar. Everything it needs
+to know about the active object's material is computed here once and kept
+until a depsgraph update touches the object, a material, a node tree or an
+image.
+"""
+import bpy
+from bpy.app.handlers import persistent
+from . import helpers
+from . import overlay
+
+
+class PanelState:
+    """What the panel shows for one object."""
+
+    def __init__(self, obj):
+        self.dirty = False
+        self.material_name = obj.active_material.name if obj.active_material else ""
+        self.image_name = ""
+        self.has_layer = overlay.get_layer_node(obj) is not None
+        self.image_loaded = False
+        self.width = 0
+        self.height = 0
+        self.tile_count = 0
+
+        image_node = helpers.get_active_image_texture_node(obj)
+        if image_node and image_node.image:
+            image = image_node.image
+            self.image_name = image.name
+            if image.source == 'TILED':
+                self.tile_count = len(image.tiles)
+            # Reading size of an image that is not loaded yet forces a load,
+            # so only report it once Blender has the pixels anyway
+            self.image_loaded = image.has_data
+            if self.image_loaded:
+                self.width, self.height = image.size
+
+    @property
+    def has_texture(self):
+        return bool(self.image_name)
+
+    @property
+    def can_resize(self):
+        # Unloaded images are validated by the operator itself
+        return self.has_texture and (not self.image_loaded or (self.width > 0 and self.height > 0))
+
+    can_export = can_resize
+
+
+_states = {}  # object name -> PanelState
+
+
+def get_state(obj):
+    """Return the cached state of an object, rebuilding it if it is stale."""
+    state = _states.get(obj.name)
+    if state is None or state.dirty:
+        state = PanelState(obj)
+        _states[obj.name] = state
+    return state
+
+
+def invalidate(obj=None):
+    """Mark one object's state (or every state) as stale."""
+    if obj is None:
+        for state in _states.values():
+            state.dirty = True
+    else:
+        state = _states.get(obj.name)
+        if state:
+            state.dirty = True
+
+
+@persistent
+def _on_depsgraph_update(scene, depsgraph):
+    for update in depsgraph.updates:
+        id_data = update.id
+        if isinstance(id_data, bpy.types.Object):
+            if update.is_updated_shading or update.is_updated_geometry:
+                invalidate(id_data.original)
+        elif isinstance(id_data, (bpy.types.Material, bpy.types.NodeTree, bpy.types.Image)):
+            # Materials can be shared between objects, so drop every state
+            invalidate()
+            return
+
+
+@persistent
+def _on_load_post(*args):
+    _states.clear()
+
+
+def register():
+    bpy.app.handlers.depsgraph_update_post.append(_on_depsgraph_update)
+    bpy.app.handlers.load_post.append(_on_load_post)
+
+
+def unregister():
+    if _on_depsgraph_update in bpy.app.handlers.depsgraph_update_post:
+        bpy.app.handlers.depsgraph_update_post.remove(_on_depsgraph_update)
+    if _on_load_post in bpy.app.handlers.load_post:
+        bpy.app.handlers.load_post.remove(_on_load_post)
+    _states.clear()
@@ -0,0 +1,387 @@
+"""
+NumPy pixel buffer functions for the Tattoo Master addon
+"""
+import bpy
+import os
+import struct
+import zlib
+import tempfile
+import numpy as np
+from . import profiling
+from . import resample
+from . import scratch
+
+
+# Pooled buffers keyed by (tag, dtype). They only ever grow, so repeated
+# reads of same-sized skins never reallocate. Buffers beyond the memory
+# budget are scratch-file backed (see scratch.py).
+_buffer_pool = {}
+
+
+def get_buffer(tag, shape, dtype=np.float32):
+    """Return a pooled array of the given shape, reusing memory across calls."""
+    dtype = np.dtype(dtype)
+    count = int(np.prod(shape))
+    key = (tag, dtype.str)
+    buf = _buffer_pool.get(key)
+    if buf is None or buf.size < count:
+        # Drop the old buffer first so both are never held at once
+        _buffer_pool.pop(key, None)
+        buf = None
+        buf = scratch.empty(count, dtype)
+        _buffer_pool[key] = buf
+    return buf[:count].reshape(shape)
+
+
+def release_buffers():
+    """Drop every pooled buffer."""
+    _buffer_pool.clear()
+
+
+def pooled_bytes():
+    """Total size of the pooled buffers in bytes."""
+    return sum(buf.nbytes for buf in _buffer_pool.values())
+
+
+def image_bytes(image):
+    """Estimated pixel memory of an image, 0 while its pixels are not loaded."""
+    # has_data first: asking an unloaded image for its size would load it
+    if not image.has_data:
+        return 0
+    width, height = image.size
+    return width * height * 4 * (4 if image.is_float else 1)
+
+
+def image_shape(image):
+    """Return (height, width, channels) of an image."""
+    width, height = image.size
+    return height, width, image.channels
+
+
+def read_pixels(image, tag="read"):
+    """Read image pixels into a pooled float32 (height, width, channels) array.
+
+    The returned array is a view into a shared buffer and is overwritten by
+    the next read with the same tag; copy it if it has to outlive that.
+    """
+    shape = image_shape(image)
+    buf = get_buffer(tag, shape, np.float32)
+    image.pixels.foreach_get(buf.ravel())
+    # Blender can only copy the whole image; page a spilled buffer out again right away
+    scratch.release_pages(buf)
+    return buf
+
+
+def write_pixels(image, array):
+    """Write a (height, width, channels) array into the image."""
+    if array.dtype != np.float32:
+        array = to_float32(array)
+    image.pixels.foreach_set(np.ascontiguousarray(array).ravel())
+    scratch.release_pages(array)
+    image.update()
+
+
+def is_linear(image):
+    """True for float color images: their pixels are scene linear, not sRGB like 8-bit ones."""
+    return image.is_float and image.colorspace_settings.name not in {'Non-Color', 'Raw'}
+
+
+def read_display(image, tag="read"):
+    """read_pixels with the colors in display (sRGB) space, whatever the image precision."""
+    array = read_pixels(image, tag)
+    if is_linear(image):
+        linear_to_srgb(array)
+    return array
+
+
+def write_display(image, array):
+    """write_pixels for display-space colors, converting them back for float images."""
+    if is_linear(image):
+        srgb_to_linear(array)
+    write_pixels(image, array)
+
+
+def to_uint8(array, tag="uint8"):
+    """Quantize a float array in [0, 1] to a pooled uint8 array, one band of rows at a time."""
+    out = get_buffer(tag, array.shape, np.uint8)
+    row_bytes = array.strides[0] if array.ndim > 1 else array.itemsize
+    for start, stop in scratch.bands(array.shape[0], row_bytes):
+        band = get_buffer(tag + "_band", array[start:stop].shape, np.float32)
+        np.multiply(array[start:stop], 255.0, out=band)
+        np.add(band, 0.5, out=band)
+        np.clip(band, 0.0, 255.0, out=band)
+        out[start:stop] = band
+        scratch.release_pages(array, start, stop)
+        scratch.release_pages(out, start, stop)
+    return out
+
+
+def to_float32(array, tag="float32", out=None):
+    """Convert a uint8 array to a pooled (or the given) float32 array in [0, 1]."""
+    out = get_buffer(tag, array.shape, np.float32) if out is None else out
+    for start, stop in scratch.bands(array.shape[0], out.strides[0] if out.ndim > 1 else 4):
+        np.multiply(array[start:stop], 1.0 / 255.0, out=out[start:stop], dtype=np.float32)
+        scratch.release_pages(array, start, stop)
+        scratch.release_pages(out, start, stop)
+    return out
+
+
+def _map_rgb_bands(array, curve):
+    """Apply `curve` to the color channels in place, one band of rows at a time."""
+    for start, stop in scratch.bands(array.shape[0], array.strides[0]):
+        rgb = array[start:stop, ..., :3]
+        np.copyto(rgb, curve(rgb))
+        scratch.release_pages(array, start, stop)
+    return array
+
+
+def _encode_srgb(rgb):
+    high = np.power(np.maximum(rgb, 0.0031308), 1.0 / 2.4) * 1.055 - 0.055
+    return np.where(rgb <= 0.0031308, rgb * 12.92, high)
+
+
+def _decode_srgb(rgb):
+    high = np.power((np.maximum(rgb, 0.04045) + 0.055) / 1.055, 2.4)
+    return np.where(rgb <= 0.04045, rgb / 12.92, high)
+
+
+def linear_to_srgb(array):
+    """Apply the sRGB transfer curve to the color channels in place."""
+    return _map_rgb_bands(array, _encode_srgb)
+
+
+def srgb_to_linear(array):
+    """Apply the inverse sRGB transfer curve to the color channels in place."""
+    return _map_rgb_bands(array, _decode_srgb)
+
+
+def to_rgba(array):
+    """Expand a (height, width, channels) array to four channels."""
+    channels = array.shape[2]
+    if channels == 4:
+        return array
+    out = scratch.empty(array.shape[:2] + (4,), array.dtype)
+    for start, stop in scratch.bands(array.shape[0], out.strides[0]):
+        if channels >= 3:
+            out[start:stop, :, :3] = array[start:stop, :, :3]
+        else:
+            out[start:stop, :, :3] = array[start:stop, :, :1]
+        out[start:stop, :, 3] = 255 if array.dtype == np.uint8 else 1.0
+        scratch.release_pages(out, start, stop)
+    return out
+
+
+def update_hash(digest, array):
+    """Feed an array to a hashlib digest band by band, without a full bytes copy."""
+    array = np.ascontiguousarray(array)
+    for start, stop in scratch.bands(array.shape[0], array.strides[0] if array.ndim > 1 else array.itemsize):
+        digest.update(memoryview(array[start:stop]).cast('B'))
+        scratch.release_pages(array, start, stop)
+    return digest
+
+
+def replace_image(image, array, float_buffer=None):
+    """Swap an image for a new datablock holding `array`, keeping its users.
+
+    Blender cannot reallocate a loaded image without `image.scale()`, which
+    resamples the whole buffer itself. Creating a fresh datablock of the target
+    size and remapping the users avoids that second resample.
+    """
+    height, width = array.shape[:2]
+    name = image.name
+    float_buffer = image.is_float if float_buffer is None else float_buffer
+    new_image = bpy.data.images.new(
+        f"{name}_resized",
+        width=width,
+        height=height,
+        alpha=True,
+        float_buffer=float_buffer,
+    )
+    if float_buffer:
+        new_image.use_half_precision = image.use_half_precision
+    new_image.colorspace_settings.name = image.colorspace_settings.name
+    new_image.alpha_mode = image.alpha_mode
+    new_image.filepath_raw = image.filepath_raw
+    new_image.file_format = image.file_format
+
+    write_pixels(new_image, to_rgba(array))
+
+    # Custom properties carry cache keys and ownership marks
+    for key in image.keys():
+        new_image[key] = image[key]
+
+    image.user_remap(new_image)
+    bpy.data.images.remove(image)
+    new_image.name = name
+    return new_image
+
+
+def to_byte_image(image):
+    """Replace a float image with an 8-bit one holding its display values."""
+    color = is_linear(image)
+    # Float pixels are scene linear; 8-bit color images store sRGB
+    array = read_display(image)
+    byte_image = replace_image(image, array, float_buffer=False)
+    if color:
+        byte_image.colorspace_settings.name = 'sRGB'
+    return byte_image
+
+
+def resample_settings():
+    """Return the (filter, worker count) configured in the addon preferences."""
+    try:
+        addon_prefs = bpy.context.preferences.addons.get(__package__)
+        if addon_prefs:
+            prefs = addon_prefs.preferences
+            return prefs.resample_filter, prefs.resample_threads or None
+    except:
+        pass
+    return 'LANCZOS3', None
+
+
+@profiling.profiled()
+def resize_image(image, width, height, filter_name=None, workers=None):
+    """Resize an image through the NumPy buffers and return the new datablock."""
+    if tuple(image.size) == (width, height):
+        return image
+
+    default_filter, default_workers = resample_settings()
+    source = read_pixels(image)
+    out = get_buffer("resize", (height, width, image.channels), np.float32)
+    resample.resample(
+        source, width, height,
+        filter_name=filter_name or default_filter,
+        out=out,
+        workers=workers or default_workers,
+        clamp=not image.is_float,
+        release=scratch.release_pages,
+    )
+    return replace_image(image, out)
+
+
+def snapshot_uint8(image, composite=None):
+    """Copy the image into an owned bottom-up RGBA uint8 array ready for encoding.
+
+    `composite` is called with the display-space float pixels before they are
+    quantized, so layers can be blended in without touching the image itself.
+    """
+    pixels = read_display(image, tag="snapshot")
+    if composite is not None:
+        composite(pixels)
+    return scratch.copy(to_rgba(to_uint8(pixels, tag="snapshot_uint8")))
+
+
+class ExportCancelled(Exception):
+    """Raised inside an encoder when its export was cancelled."""
+
+
+ENCODE_BAND_ROWS = 256
+
+
+def _bands(height, progress, cancel):
+    """Yield (start, stop) row bands, reporting progress and honouring cancellation."""
+    for start in range(0, height, ENCODE_BAND_ROWS):
+        if cancel is not None and cancel.is_set():
+            raise ExportCancelled()
+        yield start, min(start + ENCODE_BAND_ROWS, height)
+        if progress is not None:
+            progress(min(start + ENCODE_BAND_ROWS, height) / height)
+
+
+def write_png(f, rgba, progress=None, cancel=None, compress_level=6):
+    """Encode a bottom-up RGBA uint8 array as PNG into a binary file object."""
+    height, width = rgba.shape[:2]
+    flipped = rgba[::-1]
+
+    def chunk(tag, data):
+        body = tag + data
+        return struct.pack(">I", len(data)) + body + struct.pack(">I", zlib.crc32(body) & 0xFFFFFFFF)
+
+    header = struct.pack(">IIBBBBB", width, height, 8, 6, 0, 0, 0)
+    f.write(b"\x89PNG\r\n\x1a\n")
+    f.write(chunk(b"IHDR", header))
+
+    # Compress band by band so the raw scanlines never exist in full
+    compressor = zlib.compressobj(compress_level)
+    for start, stop in _bands(height, progress, cancel):
+        raw = np.empty((stop - start, 1 + width * 4), dtype=np.uint8)
+        raw[:, 0] = 0  # filter type None for every scanline
+        raw[:, 1:] = flipped[start:stop].reshape(stop - start, width * 4)
+        data = compressor.compress(raw.tobytes())
+        scratch.release_pages(rgba, height - stop, height - start)
+        if data:
+            f.write(chunk(b"IDAT", data))
+    f.write(chunk(b"IDAT", compressor.flush()))
+    f.write(chunk(b"IEND", b""))
+
+
+def write_tga(f, rgba, progress=None, cancel=None):
+    """Encode a bottom-up RGBA uint8 array as uncompressed 32-bit TGA into a binary file object."""
+    height, width = rgba.shape[:2]
+    f.write(struct.pack("<BBBHHBHHHHBB", 0, 0, 2, 0, 0, 0, 0, 0, width, height, 32, 8))
+    for start, stop in _bands(height, progress, cancel):
+        f.write(np.ascontiguousarray(rgba[start:stop, :, [2, 1, 0, 3]]).tobytes())
+        scratch.release_pages(rgba, start, stop)
+
+
+ENCODERS = {
+    'PNG': write_png,
+    'TARGA': write_tga,
+}
+
+
+# Permission mask for new files, read once since reading it means setting it
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+
+def encode_file(filepath, rgba, file_format, progress=None, cancel=None, **options):
+    """Write an RGBA uint8 snapshot with the encoder for `file_format`.
+
+    The file is written under a temporary name in the same folder and renamed
+    into place, so readers never see a half-written texture.
+    """
+    encoder = ENCODERS.get(file_format)
+    if encoder is None:
+        raise ValueError(f"Unsupported export format: {file_format}")
+
+    folder, name = os.path.split(os.path.abspath(filepath))
+    # A unique name per call: two exports of the same path may run at once
+    fd, tmp_path = tempfile.mkstemp(prefix=f".{name}.", suffix=".tmp", dir=folder)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            encoder(f, rgba, progress=progress, cancel=cancel, **options)
+            f.flush()
+            os.fsync(f.fileno())
+        # mkstemp creates the file readable by its owner only
+        os.chmod(tmp_path, 0o666 & ~_UMASK)
+        os.replace(tmp_path, filepath)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+# Formats the datablock can be pointed at after a save without losing quality
+LOSSLESS_FORMATS = {'PNG', 'TARGA'}
+
+
+@profiling.profiled()
+def save_image(image, filepath, file_format='PNG', composite=None, **options):
+    """Encode the image pixels to disk and point the datablock at the new file.
+
+    With a `composite` or a lossy format the written file differs from the
+    datablock, so the image is left as it is.
+    """
+    encode_file(filepath, snapshot_uint8(image, composite), file_format, **options)
+    if composite is None and file_format in LOSSLESS_FORMATS:
+        relink_image(image, filepath, file_format)
+
+
+def relink_image(image, filepath, file_format):
+    """Point the datablock at a freshly written file so it is no longer dirty."""
+    image.filepath_raw = filepath
+    image.file_format = file_format
+    if image.source != 'FILE':
+        image.source = 'FILE'
+    image.reload()
@@ -0,0 +1,73 @@
+"""
+Image precision policy for the Tattoo Master addon
+
+Skins are 8-bit sRGB, but a skin or stencil loaded from a 16-bit PNG or an
+EXR became a float image: four times the memory of an 8-bit one in RAM and
+on the GPU, kept through every resize. The policy in the preferences sets
+the precision of every image the addon creates, loads or resizes:
+8-bit stores it as bytes, Half Float keeps float pixels but uploads them to
+the GPU at 16 bits per channel, and Float keeps full 32-bit floats. 8-bit
+images are never widened, and tattoo layers stay 8-bit since they hold
+display values.
+"""
+import bpy
+from . import pixels
+
+
+POLICY_ITEMS = [
+    ('BYTE', "8-bit", "Store skins and stencils with 8 bits per channel"),
+    ('HALF', "Half Float", "Keep float images, but draw them from 16-bit GPU textures"),
+    ('FLOAT', "Float", "Keep float images at full 32-bit precision"),
+]
+
+# Policy set by scripts and benchmarks, taking precedence over the preferences
+overrides = {}
+
+# Bytes per RGBA pixel of a float source image in RAM and on the GPU
+FOOTPRINT = {
+    'BYTE': (4, 4),
+    'HALF': (16, 8),
+    'FLOAT': (16, 16),
+}
+
+
+def get_policy():
+    """Image precision from the overrides or the addon preferences."""
+    if "policy" in overrides:
+        return overrides["policy"]
+    policy = 'BYTE'
+    try:
+        addon_prefs = bpy.context.preferences.addons.get(__package__)
+        if addon_prefs:
+            policy = addon_prefs.preferences.image_precision
+    except:
+        pass
+    return policy
+
+
+def apply(image, policy=None):
+    """Bring an image to the precision policy; returns the image, or the 8-bit one replacing it."""
+    policy = policy or get_policy()
+    if not image.is_float:
+        return image
+    if policy == 'BYTE' and image.source != 'TILED':
+        return pixels.to_byte_image(image)
+    # Python cannot rewrite the tiles of a UDIM image, so those get half floats on the GPU at most
+    image.use_half_precision = policy != 'FLOAT'
+    return image
+
+
+def new_image(name, width, height, color, alpha=False, policy=None):
+    """Create a blank image at the precision of the policy."""
+    policy = policy or get_policy()
+    image = bpy.data.images.new(name, width=width, height=height, alpha=alpha, float_buffer=policy != 'BYTE')
+    image.generated_color = color
+    if policy == 'HALF':
+        image.use_half_precision = True
+    return image
+
+
+def footprint(size, policy):
+    """(RAM bytes, GPU bytes) of a square float source skin under a policy."""
+    ram, gpu = FOOTPRINT[policy]
+    return size * size * ram, size * size * gpu
@@ -4,7 +4,12 @@ Preferences panel for the Tattoo Master addon
 import bpy
 import os
 import json
-from bpy.props import StringProperty, BoolProperty, IntProperty
+from bpy.props import StringProperty, BoolProperty, IntProperty, EnumProperty, FloatProperty
+from . import resample
+from . import profiling
+from . import precision
+from . import image_memory
+from . import paint_proxy
 
 
 def get_config_path():
@@ -19,7 +24,22 @@ def save_settings(self, context):
         "default_export_path": self.default_export_path,
         "default_resolution": self.default_resolution,
         "use_auto_uv": self.use_auto_uv,
-        "auto_save_textures": self.auto_save_textures
+        "auto_save_textures": self.auto_save_textures,
+        "incremental_usd_export": self.incremental_usd_export,
+        "resample_filter": self.resample_filter,
+        "resample_threads": self.resample_threads,
+        "use_import_cache": self.use_import_cache,
+        "import_cache_dir": self.import_cache_dir,
+        "import_cache_size": self.import_cache_size,
+        "stencil_cache_size": self.stencil_cache_size,
+        "memory_budget": self.memory_budget,
+        "scratch_dir": self.scratch_dir,
+        "image_memory_budget": self.image_memory_budget,
+        "image_precision": self.image_precision,
+        "use_paint_proxy": self.use_paint_proxy,
+        "paint_proxy_ratio": self.paint_proxy_ratio,
+        "use_profiling": self.use_profiling,
+        "profiling_rows": self.profiling_rows
     }
     
     try:
@@ -29,6 +49,18 @@ def save_settings(self, context):
         print(f"Tattoo Master: Error saving config: {e}")
 
 
+def update_profiling(self, context):
+    profiling.enabled = self.use_profiling
+    save_settings(self, context)
+
+
+def update_image_precision(self, context):
+    # Images already loaded follow the new policy too
+    for image in image_memory.managed_images():
+        precision.apply(image, self.image_precision)
+    save_settings(self, context)
+
+
 def load_settings(package_name):
     path = get_config_path()
     if not os.path.exists(path):
@@ -48,6 +80,21 @@ def load_settings(package_name):
             if "default_resolution" in data: prefs.default_resolution = data["default_resolution"]
             if "use_auto_uv" in data: prefs.use_auto_uv = data["use_auto_uv"]
             if "auto_save_textures" in data: prefs.auto_save_textures = data["auto_save_textures"]
+            if "incremental_usd_export" in data: prefs.incremental_usd_export = data["incremental_usd_export"]
+            if "resample_filter" in data: prefs.resample_filter = data["resample_filter"]
+            if "resample_threads" in data: prefs.resample_threads = data["resample_threads"]
+            if "use_import_cache" in data: prefs.use_import_cache = data["use_import_cache"]
+            if "import_cache_dir" in data: prefs.import_cache_dir = data["import_cache_dir"]
+            if "import_cache_size" in data: prefs.import_cache_size = data["import_cache_size"]
+            if "stencil_cache_size" in data: prefs.stencil_cache_size = data["stencil_cache_size"]
+            if "memory_budget" in data: prefs.memory_budget = data["memory_budget"]
+            if "scratch_dir" in data: prefs.scratch_dir = data["scratch_dir"]
+            if "image_memory_budget" in data: prefs.image_memory_budget = data["image_memory_budget"]
+            if "image_precision" in data: prefs.image_precision = data["image_precision"]
+            if "use_paint_proxy" in data: prefs.use_paint_proxy = data["use_paint_proxy"]
+            if "paint_proxy_ratio" in data: prefs.paint_proxy_ratio = data["paint_proxy_ratio"]
+            if "use_profiling" in data: prefs.use_profiling = data["use_profiling"]
+            if "profiling_rows" in data: prefs.profiling_rows = data["profiling_rows"]
             print(f"Tattoo Master: Settings loaded from {path}")
     except Exception as e:
         print(f"Tattoo Master: Error loading config: {e}")
@@ -109,6 +156,130 @@ class TATTOO_AddonPreferences(bpy.types.AddonPreferences):
         update=save_settings
     )
 
+    incremental_usd_export: BoolProperty(
+        name="Incremental USD Export",
+        description="Reuse textures and meshes that did not change since the last export",
+        default=True,
+        update=save_settings
+    )
+
+    # Resampling settings
+    resample_filter: EnumProperty(
+        name="Resample Filter",
+        description="Filter used when textures are resized",
+        items=resample.FILTER_ITEMS,
+        default='LANCZOS3',
+        update=save_settings
+    )
+
+    resample_threads: IntProperty(
+        name="Resample Threads",
+        description="Worker threads used for resizing (0 = automatic)",
+        default=0,
+        min=0,
+        max=64,
+        update=save_settings
+    )
+
+    # Import cache settings
+    use_import_cache: BoolProperty(
+        name="Cache FBX Imports",
+        description="Reuse previously imported avatars instead of parsing the same FBX again",
+        default=True,
+        update=save_settings
+    )
+
+    import_cache_dir: StringProperty(
+        name="Import Cache Folder",
+        description="Folder for cached imports (empty = Blender user data folder)",
+        subtype='DIR_PATH',
+        update=save_settings
+    )
+
+    import_cache_size: IntProperty(
+        name="Import Cache Size (MB)",
+        description="Least recently used imports are removed above this size",
+        default=2048,
+        min=64,
+        update=save_settings
+    )
+
+    # Stencil cache settings
+    stencil_cache_size: IntProperty(
+        name="Stencil Cache Size (MB)",
+        description="Least recently used tattoo images are removed from memory above this size",
+        default=1024,
+        min=64,
+        update=save_settings
+    )
+
+    # Out-of-core settings
+    memory_budget: IntProperty(
+        name="Memory Budget (MB)",
+        description="Large pixel buffers are kept in scratch files so image processing stays around this size (0 = keep everything in RAM)",
+        default=4096,
+        min=0,
+        update=save_settings
+    )
+
+    scratch_dir: StringProperty(
+        name="Scratch Folder",
+        description="Folder for out-of-core pixel buffers, preferably on a fast local disk (empty = system temp folder)",
+        subtype='DIR_PATH',
+        update=save_settings
+    )
+
+    image_memory_budget: IntProperty(
+        name="Image Memory Budget (MB)",
+        description="Above this, unused stencils are evicted and saved images give their pixels back until they are needed again (0 = no limit)",
+        default=8192,
+        min=0,
+        update=save_settings
+    )
+
+    image_precision: EnumProperty(
+        name="Image Precision",
+        description="Precision of the skins, stencils and tattoo layers the addon creates, loads and resizes",
+        items=precision.POLICY_ITEMS,
+        default='BYTE',
+        update=update_image_precision
+    )
+
+    # Paint proxy settings
+    use_paint_proxy: BoolProperty(
+        name="Paint on Proxy",
+        description="Paint on a decimated copy of the mesh that shares its UVs and textures, for smoother strokes on dense meshes",
+        default=False,
+        update=save_settings
+    )
+
+    paint_proxy_ratio: FloatProperty(
+        name="Proxy Face Ratio",
+        description="Share of the faces kept in the paint proxy",
+        default=paint_proxy.DEFAULT_RATIO,
+        min=0.01,
+        max=1.0,
+        subtype='FACTOR',
+        update=save_settings
+    )
+
+    # Profiling settings
+    use_profiling: BoolProperty(
+        name="Profile Operations",
+        description="Record the time and memory of every Tattoo Master operation in a trace file",
+        default=False,
+        update=update_profiling
+    )
+
+    profiling_rows: IntProperty(
+        name="Profiling Rows",
+        description="Number of recent operations listed in the sidebar",
+        default=10,
+        min=1,
+        max=profiling.HISTORY_SIZE,
+        update=save_settings
+    )
+
     def draw(self, context):
         layout = self.layout
         
@@ -127,4 +298,57 @@ class TATTOO_AddonPreferences(bpy.types.AddonPreferences):
         col = box.column(align=True)
         col.prop(self, "default_resolution")
         col.prop(self, "use_auto_uv")
-        col.prop(self, "auto_save_textures")
\ No newline at end of file
+        col.prop(self, "auto_save_textures")
+        col.prop(self, "incremental_usd_export")
+
+        # Resampling section
+        box = layout.box()
+        box.label(text="Resampling", icon='IMAGE_DATA')
+        col = box.column(align=True)
+        col.prop(self, "resample_filter")
+        col.prop(self, "resample_threads")
+
+        # Import cache section
+        box = layout.box()
+        box.label(text="Import Cache", icon='FILE_CACHE')
+        col = box.column(align=True)
+        col.prop(self, "use_import_cache")
+        col.prop(self, "import_cache_dir")
+        col.prop(self, "import_cache_size")
+
+        # Stencil cache section
+        box = layout.box()
+        box.label(text="Stencil Cache", icon='IMAGE_DATA')
+        col = box.column(align=True)
+        col.prop(self, "stencil_cache_size")
+
+        # Out-of-core section
+        box = layout.box()
+        box.label(text="Memory", icon='MEMORY')
+        col = box.column(align=True)
+        col.prop(self, "memory_budget")
+        col.prop(self, "scratch_dir")
+        col.prop(self, "image_memory_budget")
+        col.prop(self, "image_precision")
+        for size in (4096, 8192):
+            ram, gpu = precision.footprint(size, self.image_precision)
+            float_ram, float_gpu = precision.footprint(size, 'FLOAT')
+            col.label(text=f"{size // 1024}K float skin: {ram >> 20} MB RAM + {gpu >> 20} MB GPU "
+                           f"(without policy: {float_ram >> 20} + {float_gpu >> 20} MB)")
+
+        # Paint proxy section
+        box = layout.box()
+        box.label(text="Texture Paint", icon='BRUSH_DATA')
+        col = box.column(align=True)
+        col.prop(self, "use_paint_proxy")
+        row = col.row()
+        row.enabled = self.use_paint_proxy
+        row.prop(self, "paint_proxy_ratio")
+
+        # Profiling section
+        box = layout.box()
+        box.label(text="Profiling", icon='TIME')
+        col = box.column(align=True)
+        col.prop(self, "use_profiling")
+        col.prop(self, "profiling_rows")
+        col.label(text=f"Trace: {profiling.get_trace_path()}")
\ No newline at end of file
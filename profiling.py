@@ -0,0 +1,199 @@
+"""
+Operation profiling for the Tattoo Master addon
+
+Operators and the heavy helpers (FBX import, material setup, resize, save,
+USD export) are wrapped with `operator`, `profiled` or `measure`. While
+profiling is enabled every wrapped call records its wall time, CPU time,
+growth of the process peak RSS and the pixel memory of the images it
+created, resized or dirtied. Records are appended to a rotating JSONL trace
+and the most recent ones are kept for the sidebar table. While disabled a
+wrapped call costs one flag check.
+"""
+import bpy
+import os
+import sys
+import json
+import time
+import threading
+from collections import deque
+from contextlib import contextmanager
+from functools import wraps
+
+
+TRACE_NAME = "trace.jsonl"
+MAX_TRACE_BYTES = 8 * 1024 * 1024
+TRACE_BACKUPS = 3
+HISTORY_SIZE = 50
+
+enabled = False
+
+# Most recent records, oldest first
+history = deque(maxlen=HISTORY_SIZE)
+
+_trace_lock = threading.Lock()
+_depth = threading.local()
+
+
+def get_trace_folder():
+    return bpy.utils.user_resource('DATAFILES', path=os.path.join("tattoo_master", "profiling"), create=True)
+
+
+def get_trace_path():
+    return os.path.join(get_trace_folder(), TRACE_NAME)
+
+
+def sync():
+    """Pick up the profiling switch from the addon preferences."""
+    global enabled
+    try:
+        addon_prefs = bpy.context.preferences.addons.get(__package__)
+        if addon_prefs:
+            enabled = addon_prefs.preferences.use_profiling
+    except:
+        pass
+
+
+if sys.platform == 'win32':
+    import ctypes
+    from ctypes import wintypes
+
+    class _MemoryCounters(ctypes.Structure):
+        _fields_ = [
+            ("cb", wintypes.DWORD),
+            ("PageFaultCount", wintypes.DWORD),
+            ("PeakWorkingSetSize", ctypes.c_size_t),
+            ("WorkingSetSize", ctypes.c_size_t),
+            ("QuotaPeakPagedPoolUsage", ctypes.c_size_t),
+            ("QuotaPagedPoolUsage", ctypes.c_size_t),
+            ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t),
+            ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+            ("PagefileUsage", ctypes.c_size_t),
+            ("PeakPagefileUsage", ctypes.c_size_t),
+        ]
+
+    def peak_rss():
+        """Peak resident size of the process so far, in bytes."""
+        counters = _MemoryCounters()
+        counters.cb = ctypes.sizeof(counters)
+        ctypes.windll.psapi.GetProcessMemoryInfo(
+            ctypes.windll.kernel32.GetCurrentProcess(), ctypes.byref(counters), counters.cb)
+        return counters.PeakWorkingSetSize
+else:
+    import resource
+
+    def peak_rss():
+        """Peak resident size of the process so far, in bytes."""
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Kilobytes on Linux, bytes on macOS
+        return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def _image_state():
+    """(width, height, float, dirty) of every image with pixels in memory."""
+    state = {}
+    for image in bpy.data.images:
+        # has_data first: asking an unloaded image for its size would load it
+        if image.has_data:
+            width, height = image.size
+            state[image.name] = (width, height, image.is_float, image.is_dirty)
+    return state
+
+
+def _touched_bytes(before, after):
+    """Pixel memory of the images that were created, resized or dirtied in between."""
+    total = count = 0
+    for name, (width, height, is_float, is_dirty) in after.items():
+        old = before.get(name)
+        if old is None or old[:2] != (width, height) or (is_dirty and not old[3]):
+            total += width * height * 4 * (4 if is_float else 1)
+            count += 1
+    return total, count
+
+
+def _append_trace(record):
+    line = json.dumps(record) + "\n"
+    with _trace_lock:
+        path = get_trace_path()
+        try:
+            if os.path.exists(path) and os.path.getsize(path) + len(line) > MAX_TRACE_BYTES:
+                for index in range(TRACE_BACKUPS - 1, 0, -1):
+                    older = f"{path}.{index}"
+                    if os.path.exists(older):
+                        os.replace(older, f"{path}.{index + 1}")
+                os.replace(path, f"{path}.1")
+            with open(path, 'a') as f:
+                f.write(line)
+        except OSError as e:
+            print(f"Tattoo Master: Error writing profiling trace: {e}")
+
+
+@contextmanager
+def measure(name, kind="call"):
+    """Record one profiled operation; yields the record (or None while disabled).
+
+    Extra fields can be added to the yielded record before the block ends.
+    """
+    if not enabled:
+        yield None
+        return
+
+    # Image data may only be looked at from the main thread
+    on_main = threading.current_thread() is threading.main_thread()
+    images_before = _image_state() if on_main else None
+    depth = getattr(_depth, "value", 0)
+    _depth.value = depth + 1
+    record = {"name": name, "kind": kind, "depth": depth, "time": time.time(), "status": "ok"}
+    peak_before = peak_rss()
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+    try:
+        yield record
+    except BaseException as e:
+        record["status"] = type(e).__name__
+        raise
+    finally:
+        record["wall"] = time.perf_counter() - wall_start
+        record["cpu"] = time.process_time() - cpu_start
+        record["peak_rss"] = peak_rss()
+        record["peak_rss_delta"] = record["peak_rss"] - peak_before
+        if on_main:
+            record["image_bytes"], record["images"] = _touched_bytes(images_before, _image_state())
+        _depth.value = depth
+        history.append(record)
+        _append_trace(record)
+
+
+def profiled(name=None):
+    """Decorator recording every call of a function while profiling is enabled."""
+    def decorator(func):
+        label = name or func.__name__
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not enabled:
+                return func(*args, **kwargs)
+            with measure(label):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def operator(execute):
+    """Decorator for Operator.execute, recording it under the operator's idname.
+
+    Blender checks the argument count of operator methods, so the wrapper
+    keeps the (self, context) signature.
+    """
+    @wraps(execute)
+    def wrapper(self, context):
+        if not enabled:
+            return execute(self, context)
+        with measure(self.bl_idname, kind="operator") as record:
+            result = execute(self, context)
+            record["result"] = sorted(result)
+            return result
+    return wrapper
+
+
+def clear():
+    history.clear()
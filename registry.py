@@ -0,0 +1,156 @@
+"""
+Character registry for the Tattoo Master addon
+
+Keeps an index of the inZOI meshes in the scene by role so the panel and the
+select operators never scan and lowercase every object name on redraw.
+Roles are stored on the objects as a custom property when known (set on
+import) and otherwise detected once from the object and mesh names.
+"""
+import bpy
+from bpy.app.handlers import persistent
+from . import paint_proxy
+
+
+ROLE_PROP = "tattoo_role"
+
+ROLE_BODY = 'BODY'
+ROLE_HEAD = 'HEAD'
+ROLE_CHARACTER = 'CHARACTER'
+ROLES = (ROLE_BODY, ROLE_HEAD, ROLE_CHARACTER)
+
+
+class _Registry:
+    def __init__(self):
+        self.scene_name = None
+        self.object_count = -1
+        self.roles = {}  # object name -> role
+        self.by_role = {role: {} for role in ROLES}  # role -> ordered {object name: None}
+
+    def clear(self):
+        self.roles.clear()
+        for names in self.by_role.values():
+            names.clear()
+
+    def set(self, name, role):
+        old_role = self.roles.get(name)
+        if old_role == role:
+            return
+        if old_role:
+            self.by_role[old_role].pop(name, None)
+        if role:
+            self.roles[name] = role
+            self.by_role[role][name] = None
+        else:
+            self.roles.pop(name, None)
+
+
+_registry = _Registry()
+
+
+def detect_role(obj):
+    """Return the role of a mesh object, or None if it is not an inZOI mesh."""
+    if obj.type != 'MESH' or obj.get(paint_proxy.PROXY_PROPERTY):
+        return None
+    role = obj.get(ROLE_PROP)
+    if role in ROLES:
+        return role
+
+    name = obj.name.lower()
+    data_name = obj.data.name.lower()
+    if 'head' in name or 'head' in data_name:
+        return ROLE_HEAD
+    if 'body' in name or 'body' in data_name:
+        return ROLE_BODY
+    if 'inzoi' in name or 'character' in name:
+        return ROLE_CHARACTER
+    return None
+
+
+def rebuild(scene=None):
+    """Rescan the scene and rebuild the whole index."""
+    scene = scene or bpy.context.scene
+    _registry.clear()
+    for obj in scene.objects:
+        _registry.set(obj.name, detect_role(obj))
+    _registry.scene_name = scene.name
+    _registry.object_count = len(scene.objects)
+
+
+def _ensure_current():
+    scene = bpy.context.scene
+    # Added or removed objects change the count; those are the only updates
+    # the depsgraph handler can miss
+    if _registry.scene_name != scene.name or _registry.object_count != len(scene.objects):
+        rebuild(scene)
+    return scene
+
+
+def update_object(obj):
+    """Re-detect the role of a single object."""
+    _registry.set(obj.name, detect_role(obj))
+
+
+def tag(obj, role):
+    """Store an explicit role on an object and index it."""
+    obj[ROLE_PROP] = role
+    _ensure_current()
+    update_object(obj)
+
+
+def _valid_objects(role, scene):
+    objects = scene.objects
+    for name in list(_registry.by_role[role]):
+        obj = objects.get(name)
+        if obj is None or obj.type != 'MESH':
+            # Renamed or deleted since it was indexed
+            _registry.set(name, None)
+            continue
+        yield obj
+
+
+def get_object(role, fallback=ROLE_CHARACTER):
+    """Return the first object with `role`, falling back to generic character meshes."""
+    scene = _ensure_current()
+    for candidate_role in (role, fallback) if fallback else (role,):
+        for obj in _valid_objects(candidate_role, scene):
+            return obj
+    return None
+
+
+def character_objects():
+    """Every indexed inZOI mesh, bodies first."""
+    scene = _ensure_current()
+    objects = []
+    for role in ROLES:
+        objects.extend(_valid_objects(role, scene))
+    return objects
+
+
+@persistent
+def _on_depsgraph_update(scene, depsgraph):
+    if _registry.scene_name != scene.name:
+        return  # Rebuilt lazily on the next lookup
+    for update in depsgraph.updates:
+        if isinstance(update.id, bpy.types.Object):
+            obj = scene.objects.get(update.id.name)
+            if obj is not None:
+                update_object(obj)
+
+
+@persistent
+def _on_load_post(*args):
+    _registry.scene_name = None
+
+
+def register():
+    bpy.app.handlers.depsgraph_update_post.append(_on_depsgraph_update)
+    bpy.app.handlers.load_post.append(_on_load_post)
+
+
+def unregister():
+    if _on_depsgraph_update in bpy.app.handlers.depsgraph_update_post:
+        bpy.app.handlers.depsgraph_update_post.remove(_on_depsgraph_update)
+    if _on_load_post in bpy.app.handlers.load_post:
+        bpy.app.handlers.load_post.remove(_on_load_post)
+    _registry.scene_name = None
+    _registry.clear()
@@ -0,0 +1,153 @@
+"""
+Tiled NumPy resampling engine for the Tattoo Master addon
+"""
+import os
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+
+def _box(x):
+    return ((x >= -0.5) & (x < 0.5)).astype(np.float32)
+
+
+def _triangle(x):
+    return np.maximum(1.0 - np.abs(x), 0.0).astype(np.float32)
+
+
+def _lanczos3(x):
+    x = np.abs(x)
+    out = np.sinc(x) * np.sinc(x / 3.0)
+    out[x >= 3.0] = 0.0
+    return out.astype(np.float32)
+
+
+def _kaiser(x, width=3.0, alpha=4.0):
+    x = np.abs(x)
+    window = np.i0(alpha * np.sqrt(np.clip(1.0 - (x / width) ** 2, 0.0, 1.0))) / np.i0(alpha)
+    out = np.sinc(x) * window
+    out[x >= width] = 0.0
+    return out.astype(np.float32)
+
+
+# Filter name -> (support radius in source pixels, kernel)
+FILTERS = {
+    'BOX': (0.5, _box),
+    'BILINEAR': (1.0, _triangle),
+    'LANCZOS3': (3.0, _lanczos3),
+    'KAISER': (3.0, _kaiser),
+}
+
+FILTER_ITEMS = [
+    ('BOX', "Box", "Nearest pixel when upscaling, area average when downscaling"),
+    ('BILINEAR', "Bilinear", "Linear interpolation between neighbouring pixels"),
+    ('LANCZOS3', "Lanczos3", "Sharp windowed sinc filter, best for skin detail"),
+    ('KAISER', "Kaiser", "Kaiser-windowed sinc, the usual choice for mipmaps"),
+]
+
+DEFAULT_STRIP_ROWS = 128
+
+
+def compute_weights(src_size, dst_size, filter_name='LANCZOS3'):
+    """Return (indices, weights) of shape (dst_size, taps) for one axis."""
+    support, kernel = FILTERS[filter_name]
+    scale = src_size / dst_size
+    filter_scale = max(scale, 1.0)
+    radius = support * filter_scale
+
+    centers = (np.arange(dst_size, dtype=np.float64) + 0.5) * scale
+    taps = int(np.ceil(radius)) * 2 + 1
+    first = np.floor(centers - radius).astype(np.intp)
+    indices = first[:, None] + np.arange(taps, dtype=np.intp)[None, :]
+
+    weights = kernel((indices + 0.5 - centers[:, None]) / filter_scale)
+    totals = weights.sum(axis=1, keepdims=True)
+    totals[totals == 0.0] = 1.0
+    weights /= totals
+
+    np.clip(indices, 0, src_size - 1, out=indices)
+    return indices, weights.astype(np.float32)
+
+
+def fit_size(width, height, target):
+    """Return the aspect-preserving size whose longest side is `target`."""
+    longest = max(width, height)
+    if longest <= 0:
+        return width, height
+    factor = target / longest
+    return max(1, round(width * factor)), max(1, round(height * factor))
+
+
+def strip_bytes(src_size, dst_size, channels, filter_name='LANCZOS3', strip_rows=DEFAULT_STRIP_ROWS):
+    """Estimate the scratch memory one strip needs, in bytes."""
+    src_w, src_h = src_size
+    dst_w, dst_h = dst_size
+    support = FILTERS[filter_name][0]
+    rows = int(np.ceil(strip_rows * src_h / dst_h + 2 * support * max(src_h / dst_h, 1.0))) + 1
+    return 2 * rows * dst_w * channels * 4
+
+
+def default_workers():
+    """Number of worker threads used when none is configured."""
+    return max(1, min(8, os.cpu_count() or 1))
+
+
+def _resample_strip(src, out, y0, y1, x_idx, x_w, y_idx, y_w, clamp):
+    rows = y_idx[y0:y1]
+    lo = int(rows.min())
+    hi = int(rows.max()) + 1
+    block = src[lo:hi]
+
+    # Horizontal pass over only the source rows this strip needs
+    horizontal = np.zeros((hi - lo, x_idx.shape[0], src.shape[2]), dtype=np.float32)
+    for k in range(x_idx.shape[1]):
+        horizontal += block[:, x_idx[:, k]] * x_w[None, :, k, None]
+
+    # Vertical pass straight into the output rows
+    dst = out[y0:y1]
+    dst[...] = 0.0
+    local = rows - lo
+    for k in range(y_idx.shape[1]):
+        dst += horizontal[local[:, k]] * y_w[y0:y1, k, None, None]
+
+    if clamp:
+        np.clip(dst, 0.0, 1.0, out=dst)
+
+
+def resample(src, width, height, filter_name='LANCZOS3', out=None,
+             strip_rows=DEFAULT_STRIP_ROWS, workers=None, clamp=True, release=None):
+    """Resample a (height, width, channels) float32 array to width x height.
+
+    The image is processed in strips of `strip_rows` output rows, so scratch
+    memory stays bounded by the strip size instead of the image size. Strips
+    are independent and are spread over a thread pool. `release(array, start,
+    stop)` is called with the rows of `src` and `out` a strip is done with,
+    so file-backed arrays can give their pages back.
+    """
+    if filter_name not in FILTERS:
+        raise ValueError(f"Unknown resample filter: {filter_name}")
+
+    src_h, src_w, channels = src.shape
+    if out is None:
+        out = np.empty((height, width, channels), dtype=np.float32)
+
+    x_idx, x_w = compute_weights(src_w, width, filter_name)
+    y_idx, y_w = compute_weights(src_h, height, filter_name)
+
+    starts = range(0, height, strip_rows)
+    workers = workers or default_workers()
+
+    def run(y0):
+        y1 = min(y0 + strip_rows, height)
+        _resample_strip(src, out, y0, y1, x_idx, x_w, y_idx, y_w, clamp)
+        if release is not None:
+            release(out, y0, y1)
+            release(src, int(y_idx[y0:y1].min()), int(y_idx[y0:y1].max()) + 1)
+
+    if workers == 1 or len(starts) == 1:
+        for y0 in starts:
+            run(y0)
+    else:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            list(pool.map(run, starts))
+
+    return out
@@ -0,0 +1,136 @@
+"""
+Out-of-core scratch buffers for the Tattoo Master addon
+
+At 8K-16K a float RGBA skin is 1-4 GB, and a resize or export needs several
+such buffers at once. Buffers larger than a share of the memory budget are
+backed by a scratch file through np.memmap instead. The band loops working
+on them hand processed pages back to the OS with release_pages(), so the
+resident size stays around the budget while the data lives in the page cache
+and on disk.
+"""
+import bpy
+import os
+import mmap
+import weakref
+import tempfile
+import numpy as np
+
+
+# Settings used instead of the addon preferences (benchmarks, batch workers)
+overrides = {}
+
+# Mappings of the scratch arrays; an entry goes away with its mapping
+_mappings = weakref.WeakSet()
+_windows_files = []
+
+
+def get_settings():
+    """Return (memory budget in bytes, scratch folder); a budget of 0 keeps everything in RAM."""
+    budget_mb, folder = 0, ""
+    try:
+        addon_prefs = bpy.context.preferences.addons.get(__package__)
+        if addon_prefs:
+            budget_mb = addon_prefs.preferences.memory_budget
+            folder = bpy.path.abspath(addon_prefs.preferences.scratch_dir) if addon_prefs.preferences.scratch_dir else ""
+    except:
+        pass
+    budget_mb = overrides.get("budget_mb", budget_mb)
+    folder = overrides.get("folder", folder) or os.path.join(tempfile.gettempdir(), "tattoo_master_scratch")
+    return budget_mb * 1024 * 1024, folder
+
+
+def spills(nbytes):
+    """True when a buffer of `nbytes` should live in a scratch file."""
+    budget, folder = get_settings()
+    return budget > 0 and nbytes > budget // 4
+
+
+def band_rows(row_bytes, minimum=1):
+    """Rows per band so one band's working set stays a small share of the budget."""
+    budget, folder = get_settings()
+    if budget <= 0:
+        return 1 << 30
+    return max(minimum, (budget // 16) // max(1, row_bytes))
+
+
+def bands(height, row_bytes):
+    """Yield (start, stop) row bands of an array with `row_bytes` per row."""
+    rows = band_rows(row_bytes)
+    for start in range(0, height, rows):
+        yield start, min(start + rows, height)
+
+
+def new_array(shape, dtype=np.float32):
+    """Return an uninitialized array backed by a scratch file.
+
+    The file is unlinked right away on POSIX, so it disappears with the last
+    reference to the array even if Blender crashes.
+    """
+    budget, folder = get_settings()
+    os.makedirs(folder, exist_ok=True)
+    handle, path = tempfile.mkstemp(prefix=f"{os.getpid()}_", suffix=".raw", dir=folder)
+    os.close(handle)
+    array = np.memmap(path, dtype=dtype, mode='w+', shape=shape)
+    if os.name == 'nt':
+        _windows_files.append(path)
+    else:
+        os.remove(path)
+    _mappings.add(array._mmap)
+    return array
+
+
+def empty(shape, dtype=np.float32):
+    """np.empty, or a scratch file array when it would not fit the budget."""
+    dtype = np.dtype(dtype)
+    if spills(int(np.prod(shape)) * dtype.itemsize):
+        return new_array(shape, dtype)
+    return np.empty(shape, dtype=dtype)
+
+
+def release_pages(array, start=0, stop=None):
+    """Drop the resident pages of rows [start, stop) of a scratch array.
+
+    The data stays in the file; touching the rows again reads it back.
+    Does nothing for in-memory arrays or where madvise is not available.
+    """
+    mapping = getattr(array, "_mmap", None)
+    if mapping is None or not hasattr(mapping, "madvise") or mapping not in _mappings:
+        return
+    stop = array.shape[0] if stop is None else stop
+    if stop <= start:
+        return
+    row_bytes = array.strides[0]
+    if row_bytes <= 0:
+        return
+    # Start address of the mapping, for page-aligned offsets
+    base = np.frombuffer(mapping, dtype=np.uint8).__array_interface__['data'][0]
+    first = array.__array_interface__['data'][0] - base + start * row_bytes
+    last = first + (stop - start) * row_bytes
+    # Only whole pages inside the range may be dropped
+    first = -(-first // mmap.PAGESIZE) * mmap.PAGESIZE
+    last = min(last // mmap.PAGESIZE * mmap.PAGESIZE, len(mapping))
+    if last > first:
+        mapping.madvise(mmap.MADV_DONTNEED, first, last - first)
+
+
+def copy(array):
+    """Owned copy of an array, made band by band into scratch space when it is large."""
+    out = empty(array.shape, array.dtype)
+    if not isinstance(out, np.memmap):
+        np.copyto(out, array)
+        return out
+    for start, stop in bands(array.shape[0], out.strides[0]):
+        out[start:stop] = array[start:stop]
+        release_pages(out, start, stop)
+        release_pages(array, start, stop)
+    return out
+
+
+def cleanup():
+    """Remove scratch files that could not be unlinked while mapped (Windows)."""
+    for path in list(_windows_files):
+        try:
+            os.remove(path)
+            _windows_files.remove(path)
+        except OSError:
+            pass
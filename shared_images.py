@@ -0,0 +1,122 @@
+"""
+Shared skin images for the Tattoo Master addon
+
+Loading the same skin atlas for the body and the head, or for several
+character variants, used to decode it once per material. Skin images are
+now keyed by a hash of the file contents, the colorspace and the target
+resolution, and a material asking for a key that is already loaded gets the
+existing datablock. A skin that was painted or changed by the addon no
+longer matches its file and loses its key, so it is never handed out again.
+The blank skin made when no file is given stays one per mesh: the body and
+the head both paint into the same 0-1 UV space. Each key counts the
+materials using it, and the memory that was not loaded a second time for
+another material is added up for the panel.
+"""
+import bpy
+from bpy.app.handlers import persistent
+from . import import_cache
+from . import pixels
+
+
+KEY_PROPERTY = "tattoo_image_key"
+
+# Session counters shown in the panel
+stats = {"hits": 0, "misses": 0, "shared": 0, "saved_bytes": 0}
+
+# File digests by path, size and mtime, so a file is only hashed once per session
+_hash_index = {"hashes": {}}
+
+_materials = {}  # key -> set of material names using it
+
+
+def file_key(filepath, resolution, colorspace='sRGB'):
+    """Key of a skin file loaded at a target resolution; raises OSError for a missing file."""
+    digest = import_cache.file_digest(bpy.path.abspath(filepath), _hash_index)
+    return f"{digest}|{colorspace}|{resolution}"
+
+
+def find(key):
+    for image in bpy.data.images:
+        if image.get(KEY_PROPERTY) != key:
+            continue
+        if image.is_dirty:
+            # Painted since it was loaded: the pixels are no longer the file's
+            detach(image)
+            continue
+        return image
+    return None
+
+
+def detach(image):
+    """Drop the key of an image whose pixels changed, so it is not handed out for its file again."""
+    key = image.pop(KEY_PROPERTY, None)
+    if key:
+        _materials.pop(key, None)
+
+
+def get(key, load):
+    """Return the unmodified image for a key, calling `load()` only when no datablock has it yet."""
+    image = find(key)
+    if image is not None:
+        stats["hits"] += 1
+        return image
+    stats["misses"] += 1
+    image = load()
+    image[KEY_PROPERTY] = key
+    return image
+
+
+def retain(material, image):
+    """Count `material` as a user of `image`, dropping its previous skin."""
+    key = image.get(KEY_PROPERTY)
+    known = key and material.name in _materials.get(key, ())
+    release(material)
+    if key:
+        names = _materials.setdefault(key, set())
+        if names and not known:
+            # Another material already holds this skin: it was not loaded twice
+            stats["shared"] += 1
+            stats["saved_bytes"] += pixels.image_bytes(image)
+        names.add(material.name)
+
+
+def release(material):
+    for key, names in list(_materials.items()):
+        names.discard(material.name)
+        if not names:
+            del _materials[key]
+
+
+def material_count(image):
+    return len(_materials.get(image.get(KEY_PROPERTY), ()))
+
+
+def shared_count():
+    """Number of skins used by more than one material."""
+    return sum(len(names) > 1 for names in _materials.values())
+
+
+def rebuild():
+    """Recount the materials of every keyed image from the node trees."""
+    _materials.clear()
+    for material in bpy.data.materials:
+        if not material.node_tree:
+            continue
+        for node in material.node_tree.nodes:
+            if node.type == 'TEX_IMAGE' and node.image and node.image.get(KEY_PROPERTY):
+                _materials.setdefault(node.image[KEY_PROPERTY], set()).add(material.name)
+
+
+@persistent
+def _on_load_post(*args):
+    rebuild()
+
+
+def register():
+    bpy.app.handlers.load_post.append(_on_load_post)
+
+
+def unregister():
+    if _on_load_post in bpy.app.handlers.load_post:
+        bpy.app.handlers.load_post.remove(_on_load_post)
+    _materials.clear()
@@ -0,0 +1,110 @@
+"""
+Stencil image cache for the Tattoo Master addon
+
+Loading a tattoo image used to create a new datablock every time (name.001,
+name.002, ...), leaving full-size orphans behind. Loaded stencils are now
+kept per file path, modification time, resize settings and precision
+policy, and the least recently used ones are removed once their pixels
+exceed the memory budget.
+"""
+import bpy
+import os
+from collections import OrderedDict
+from . import pixels
+from . import precision
+
+
+KEY_PROPERTY = "tattoo_stencil_key"
+
+# Session counters shown in the panel
+stats = {"hits": 0, "misses": 0, "evictions": 0, "evicted_bytes": 0}
+
+_entries = OrderedDict()  # key -> image name, least recently used first
+
+
+def get_budget():
+    """Memory budget in bytes from the addon preferences."""
+    budget_mb = 1024
+    try:
+        addon_prefs = bpy.context.preferences.addons.get(__package__)
+        if addon_prefs:
+            budget_mb = addon_prefs.preferences.stencil_cache_size
+    except:
+        pass
+    return budget_mb * 1024 * 1024
+
+
+def cache_key(filepath, resize_to_4k):
+    filepath = os.path.abspath(bpy.path.abspath(filepath))
+    stat = os.stat(filepath)
+    resize = pixels.resample_settings()[0] if resize_to_4k else "none"
+    # A stencil loaded under another precision policy holds other pixels
+    return f"{filepath}|{stat.st_mtime_ns}|{stat.st_size}|{resize}|{precision.get_policy()}"
+
+
+def used_bytes():
+    return sum(pixels.image_bytes(image) for image in map(bpy.data.images.get, _entries.values()) if image)
+
+
+def _find(key):
+    """Return the cached image for a key, also after the blend file was reloaded."""
+    image = bpy.data.images.get(_entries.get(key, ""))
+    if image is not None and image.get(KEY_PROPERTY) == key:
+        return image
+    _entries.pop(key, None)
+    for image in bpy.data.images:
+        if image.get(KEY_PROPERTY) == key:
+            _entries[key] = image.name
+            return image
+    return None
+
+
+def _remove(key):
+    image = bpy.data.images.get(_entries.pop(key))
+    if image is not None and image.get(KEY_PROPERTY) == key:
+        stats["evictions"] += 1
+        stats["evicted_bytes"] += pixels.image_bytes(image)
+        bpy.data.images.remove(image)
+
+
+def get(filepath, resize_to_4k, load):
+    """Return the stencil image for a file, calling `load()` only on a miss."""
+    key = cache_key(filepath, resize_to_4k)
+    image = _find(key)
+    if image is not None:
+        _entries.move_to_end(key)
+        stats["hits"] += 1
+        return image
+
+    stats["misses"] += 1
+    # Older versions of an edited file will never be asked for again
+    path, mtime = key.split("|")[:2]
+    for stale in [k for k in _entries if k.split("|")[0] == path and k.split("|")[1] != mtime]:
+        _remove(stale)
+
+    image = load()
+    image[KEY_PROPERTY] = key
+    _entries[key] = image.name
+    evict(keep=key)
+    return image
+
+
+def evict(keep=None, budget=None):
+    """Remove least recently used unused stencils until the cache fits in `budget` bytes."""
+    budget = get_budget() if budget is None else budget
+    total = used_bytes()
+    for key in list(_entries):
+        if total <= budget:
+            break
+        if key == keep:
+            continue
+        image = bpy.data.images.get(_entries[key])
+        if image is not None and image.users:
+            continue  # Still on a brush texture
+        total -= pixels.image_bytes(image) if image else 0
+        _remove(key)
+
+
+def clear():
+    for key in list(_entries):
+        _remove(key)
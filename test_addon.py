@@ -27,18 +27,31 @@ def test_addon():
     # Test operators exist
     operators = [
         "tattoo.import_metahuman_fbx",
+        "tattoo.clear_import_cache",
         "tattoo.resize_texture_to_4k", 
         "tattoo.setup_tattoo_brush",
         "tattoo.load_tattoo_image",
+        "tattoo.pick_library_stencil",
+        "tattoo.library_page",
+        "tattoo.refresh_library",
+        "tattoo.stamp_decal",
+        "tattoo.mirror_tattoo_x",
         "tattoo.rotate_stencil",
+        "tattoo.add_tattoo_layer",
+        "tattoo.remove_tattoo_layer",
         "tattoo.export_tattooed_texture",
+        "tattoo.cancel_exports",
         "tattoo.export_usd",
         "tattoo.select_body",
         "tattoo.select_head",
         "tattoo.select_object",
         "tattoo.load_skin_texture",
         "tattoo.clear_texture",
-        "tattoo.enter_texture_paint"
+        "tattoo.enter_texture_paint",
+        "tattoo.exit_paint_proxy",
+        "tattoo.purge_images",
+        "tattoo.toggle_profiling",
+        "tattoo.clear_profiling"
     ]
     
     missing_ops = []
@@ -0,0 +1,121 @@
+"""
+Round-trip tests of the BC1, BC3 and BC7 block encoders in dds.py
+
+The encoders are plain NumPy, but the addon package imports bpy, so run
+these with Blender's Python (pytest installed into it):
+    blender -b --python-expr "import sys, pytest; sys.exit(pytest.main(['tests']))"
+"""
+import os
+import sys
+import importlib
+import numpy as np
+import pytest
+
+pytest.importorskip("bpy")
+
+ADDON_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(ADDON_DIR))
+dds = importlib.import_module(f"{os.path.basename(ADDON_DIR)}.dds")
+
+
+def bits(block, offset, count):
+    """Read `count` bits LSB-first from a little-endian block."""
+    value = int.from_bytes(bytes(block), 'little')
+    return (value >> offset) & ((1 << count) - 1)
+
+
+def decode_565(color):
+    r, g, b = (color >> 11) & 31, (color >> 5) & 63, color & 31
+    return np.array([(r << 3) | (r >> 2), (g << 2) | (g >> 4), (b << 3) | (b >> 2)])
+
+
+def decode_bc1(block):
+    """(16, 3) RGB of one BC1 block, as a GPU decodes it."""
+    c0, c1 = bits(block, 0, 16), bits(block, 16, 16)
+    e0, e1 = decode_565(c0), decode_565(c1)
+    if c0 > c1:
+        palette = [e0, e1, (2 * e0 + e1) // 3, (e0 + 2 * e1) // 3]
+    else:
+        palette = [e0, e1, (e0 + e1) // 2, np.zeros(3, dtype=int)]
+    return np.array([palette[bits(block, 32 + 2 * i, 2)] for i in range(16)])
+
+
+def decode_bc3_alpha(block):
+    """(16,) alpha of the alpha half of one BC3 block."""
+    a0, a1 = bits(block, 0, 8), bits(block, 8, 8)
+    if a0 > a1:
+        palette = [a0, a1] + [((7 - i) * a0 + i * a1) // 7 for i in range(1, 7)]
+    else:
+        palette = [a0, a1] + [((5 - i) * a0 + i * a1) // 5 for i in range(1, 5)] + [0, 255]
+    return np.array([palette[bits(block, 16 + 3 * i, 3)] for i in range(16)])
+
+
+def decode_bc7_mode6(block):
+    """(16, 4) RGBA of one BC7 mode 6 block."""
+    assert bits(block, 0, 7) == 1 << 6
+    q0 = [bits(block, 7 + 14 * channel, 7) for channel in range(4)]
+    q1 = [bits(block, 14 + 14 * channel, 7) for channel in range(4)]
+    e0 = np.array([(q << 1) | bits(block, 63, 1) for q in q0])
+    e1 = np.array([(q << 1) | bits(block, 64, 1) for q in q1])
+    indices = [bits(block, 65, 3)] + [bits(block, 68 + 4 * (i - 1), 4) for i in range(1, 16)]
+    weights = dds.BC7_WEIGHTS4.astype(int)
+    return np.array([((64 - weights[i]) * e0 + weights[i] * e1 + 32) >> 6 for i in indices])
+
+
+def pattern_block(color_a, color_b):
+    """One (1, 16, 4) uint8 block of two colors in a checker pattern, and the pattern."""
+    mask = (np.indices((4, 4)).sum(axis=0) % 2).ravel().astype(bool)
+    block = np.where(mask[:, None], np.array(color_b), np.array(color_a)).astype(np.uint8)
+    return block[None], mask
+
+
+def test_to_blocks_pads_and_orders_pixels():
+    rgba = np.arange(6 * 5 * 4, dtype=np.uint8).reshape(6, 5, 4)
+    blocks = dds.to_blocks(rgba)
+    assert blocks.shape == (2, 2, 16, 4)
+    assert np.array_equal(blocks[0, 0].reshape(4, 4, 4), rgba[:4, :4])
+    # Padding repeats the last row and column
+    assert np.array_equal(blocks[1, 1].reshape(4, 4, 4)[-1, -1], rgba[-1, -1])
+
+
+def test_bc1_flat_block_is_exact():
+    block = np.full((1, 16, 4), (255, 0, 255, 255), dtype=np.uint8)
+    decoded = decode_bc1(dds.encode_bc1(block)[0])
+    assert np.array_equal(decoded, block[0, :, :3])
+
+
+def test_bc1_keeps_the_pattern():
+    block, mask = pattern_block((200, 40, 20, 255), (30, 120, 220, 255))
+    decoded = decode_bc1(dds.encode_bc1(block)[0])
+    # Every texel lands on the palette entry of its own color
+    assert len({tuple(c) for c in decoded[mask]}) == 1
+    assert len({tuple(c) for c in decoded[~mask]}) == 1
+    # Endpoints are inset by 1/16 of the color distance, plus 565 rounding
+    assert np.abs(decoded - block[0, :, :3].astype(int)).max() <= 20
+
+
+def test_bc3_alpha_levels_are_exact():
+    alpha = np.repeat(np.arange(8) * 35, 2).astype(np.uint8)
+    block = np.zeros((1, 16, 4), dtype=np.uint8)
+    block[0, :, 3] = alpha
+    encoded = dds.encode_bc3(block)
+    assert encoded.shape == (1, 16)
+    assert np.array_equal(decode_bc3_alpha(encoded[0, :8]), alpha)
+    assert np.array_equal(decode_bc1(encoded[0, 8:]), block[0, :, :3])
+
+
+def test_bc7_two_color_block_is_exact():
+    # Mode 6 shares one p-bit across the channels of an endpoint, so the dark
+    # color is all odd like the bright one. The first texel is the bright
+    # color, so the encoder has to swap endpoints
+    block, mask = pattern_block((255, 255, 255, 255), (1, 1, 1, 255))
+    decoded = decode_bc7_mode6(dds.encode_bc7(block)[0])
+    assert np.array_equal(decoded, block[0])
+
+
+def test_bc7_error_is_small_on_a_gradient():
+    ramp = np.linspace(0, 255, 16)
+    block = np.stack([ramp, ramp[::-1], np.full(16, 128.0), np.full(16, 255.0)], axis=1)
+    block = block.astype(np.uint8)[None]
+    decoded = decode_bc7_mode6(dds.encode_bc7(block)[0])
+    assert np.abs(decoded - block[0].astype(int)).max() <= 4
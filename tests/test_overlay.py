@@ -0,0 +1,91 @@
+"""
+Tests of the sparse tattoo layer in overlay.py against a dense reference blend
+
+Run with Blender's Python (pytest installed into it), like test_dds.py:
+    blender -b --python-expr "import sys, pytest; sys.exit(pytest.main(['tests']))"
+"""
+import os
+import sys
+import importlib
+import numpy as np
+import pytest
+
+pytest.importorskip("bpy")
+
+ADDON_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(ADDON_DIR))
+overlay = importlib.import_module(f"{os.path.basename(ADDON_DIR)}.overlay")
+
+
+def reference_blend(base, layer, mode, opacity):
+    """Dense blend of every texel, written out per mode."""
+    alpha = layer[..., 3:4] * opacity
+    color = layer[..., :3]
+    rgb = base[..., :3]
+    if mode == 'MULTIPLY':
+        result = rgb * color
+    elif mode == 'OVERLAY':
+        dark = 2.0 * rgb * color
+        light = 1.0 - 2.0 * (1.0 - rgb) * (1.0 - color)
+        result = np.where(rgb < 0.5, dark, light)
+    else:
+        result = color
+    out = base.copy()
+    out[..., :3] = rgb * (1.0 - alpha) + result * alpha
+    return out
+
+
+def painted_layer(height, width, seed=0):
+    """A float layer with a few painted blobs, on 8-bit levels like the tiles."""
+    rng = np.random.default_rng(seed)
+    layer = np.zeros((height, width, 4), dtype=np.float32)
+    for _ in range(3):
+        y, x = rng.integers(0, height - 10), rng.integers(0, width - 10)
+        layer[y:y + 10, x:x + 10] = rng.integers(1, 256, size=(10, 10, 4)) / 255.0
+    # Paint the last texel so the partial corner tile is kept
+    layer[-1, -1] = (0.2, 0.4, 0.6, 1.0)
+    return layer
+
+
+def skin(height, width, seed=1):
+    rng = np.random.default_rng(seed)
+    return rng.random((height, width, 4), dtype=np.float32)
+
+
+def test_from_array_keeps_only_painted_tiles():
+    layer = np.zeros((130, 200, 4), dtype=np.float32)
+    layer[5, 70, 3] = 0.5
+    layer[129, 199] = 1.0
+    sparse = overlay.SparseLayer.from_array(layer, tile_size=64)
+    assert set(sparse.tiles) == {(0, 1), (2, 3)}
+    assert sparse.tiles[(0, 1)][5, 6, 3] == 128
+    # The partial corner tile is padded with transparent texels
+    assert sparse.tiles[(2, 3)][1, 7, 3] == 255
+    assert sparse.tiles[(2, 3)][2:, :].max() == 0
+    assert sparse.coverage == pytest.approx(2 / 12)
+
+
+def test_empty_layer_leaves_the_skin_alone():
+    base = skin(64, 64)
+    sparse = overlay.SparseLayer.from_array(np.zeros((64, 64, 4), dtype=np.float32))
+    assert not sparse.tiles and sparse.nbytes == 0
+    assert np.array_equal(sparse.composite(base.copy()), base)
+
+
+@pytest.mark.parametrize("mode", ['MULTIPLY', 'NORMAL', 'OVERLAY'])
+@pytest.mark.parametrize("size", [(128, 192), (100, 150), (65, 1)])
+def test_composite_matches_dense_blend(mode, size):
+    # (128, 192) takes the tiled-view path, the odd sizes the per-tile loop
+    height, width = size
+    if width > 10:
+        layer = painted_layer(height, width)
+    else:
+        layer = np.full((height, width, 4), 128 / 255, dtype=np.float32)
+    base = skin(height, width)
+    expected = reference_blend(base, layer, mode, 0.75)
+
+    sparse = overlay.SparseLayer.from_array(layer)
+    result = sparse.composite(base.copy(), mode, 0.75)
+    np.testing.assert_allclose(result, expected, atol=1e-5)
+    # The alpha channel of the skin is never blended
+    assert np.array_equal(result[..., 3], base[..., 3])
@@ -0,0 +1,101 @@
+"""
+Tests of the NumPy PNG and TGA encoders and the atomic file writes in pixels.py
+
+Run with Blender's Python (pytest installed into it), like test_dds.py:
+    blender -b --python-expr "import sys, pytest; sys.exit(pytest.main(['tests']))"
+"""
+import os
+import sys
+import zlib
+import struct
+import importlib
+import threading
+import numpy as np
+import pytest
+
+pytest.importorskip("bpy")
+
+ADDON_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(ADDON_DIR))
+pixels = importlib.import_module(f"{os.path.basename(ADDON_DIR)}.pixels")
+
+
+def decode_png(data):
+    """(height, width, 4) top-down RGBA of an 8-bit RGBA PNG with unfiltered scanlines."""
+    assert data[:8] == b"\x89PNG\r\n\x1a\n"
+    offset, idat, header = 8, b"", None
+    while offset < len(data):
+        length, tag = struct.unpack(">I4s", data[offset:offset + 8])
+        body = data[offset + 8:offset + 8 + length]
+        crc, = struct.unpack(">I", data[offset + 8 + length:offset + 12 + length])
+        assert crc == zlib.crc32(tag + body) & 0xFFFFFFFF
+        if tag == b"IHDR":
+            header = struct.unpack(">IIBBBBB", body)
+        elif tag == b"IDAT":
+            idat += body
+        offset += 12 + length
+    width, height, depth, color_type = header[:4]
+    assert (depth, color_type) == (8, 6)
+    raw = np.frombuffer(zlib.decompress(idat), dtype=np.uint8).reshape(height, 1 + width * 4)
+    assert not raw[:, 0].any()
+    return raw[:, 1:].reshape(height, width, 4)
+
+
+def bottom_up_rgba(height, width, seed=0):
+    rng = np.random.default_rng(seed)
+    return rng.integers(0, 256, size=(height, width, 4), dtype=np.uint8)
+
+
+@pytest.mark.parametrize("height", [1, 255, pixels.ENCODE_BAND_ROWS + 3])
+def test_png_round_trip(tmp_path, height):
+    rgba = bottom_up_rgba(height, 7)
+    path = tmp_path / "skin.png"
+    pixels.encode_file(str(path), rgba, 'PNG')
+    # PNG rows are top-down, the snapshot is bottom-up like Blender's pixels
+    assert np.array_equal(decode_png(path.read_bytes()), rgba[::-1])
+
+
+def test_tga_round_trip(tmp_path):
+    rgba = bottom_up_rgba(pixels.ENCODE_BAND_ROWS + 3, 5)
+    path = tmp_path / "skin.tga"
+    pixels.encode_file(str(path), rgba, 'TARGA')
+    data = path.read_bytes()
+    header = struct.unpack("<BBBHHBHHHHBB", data[:18])
+    assert header[2] == 2 and header[8:] == (5, pixels.ENCODE_BAND_ROWS + 3, 32, 8)
+    bgra = np.frombuffer(data[18:], dtype=np.uint8).reshape(rgba.shape)
+    assert np.array_equal(bgra[..., [2, 1, 0, 3]], rgba)
+
+
+def test_progress_reaches_one(tmp_path):
+    values = []
+    rgba = bottom_up_rgba(pixels.ENCODE_BAND_ROWS * 2 + 1, 3)
+    pixels.encode_file(str(tmp_path / "skin.png"), rgba, 'PNG', progress=values.append)
+    assert values == sorted(values) and values[-1] == 1.0
+
+
+def test_cancelled_encode_leaves_nothing(tmp_path):
+    cancel = threading.Event()
+    cancel.set()
+    with pytest.raises(pixels.ExportCancelled):
+        pixels.encode_file(str(tmp_path / "skin.png"), bottom_up_rgba(8, 8), 'PNG', cancel=cancel)
+    assert os.listdir(tmp_path) == []
+
+
+def test_failed_encode_keeps_the_old_file(tmp_path):
+    path = tmp_path / "skin.png"
+    path.write_bytes(b"previous export")
+
+    def fail(value):
+        raise RuntimeError("disk full")
+
+    rgba = bottom_up_rgba(pixels.ENCODE_BAND_ROWS * 2, 4)
+    with pytest.raises(RuntimeError):
+        pixels.encode_file(str(path), rgba, 'TARGA', progress=fail)
+    assert os.listdir(tmp_path) == ["skin.png"]
+    assert path.read_bytes() == b"previous export"
+
+
+def test_unknown_format_is_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        pixels.encode_file(str(tmp_path / "skin.bmp"), bottom_up_rgba(2, 2), 'BMP')
+    assert os.listdir(tmp_path) == []
@@ -0,0 +1,86 @@
+"""
+Tests of the strip resampler and its filter kernels in resample.py
+
+Run with Blender's Python (pytest installed into it), like test_dds.py:
+    blender -b --python-expr "import sys, pytest; sys.exit(pytest.main(['tests']))"
+"""
+import os
+import sys
+import importlib
+import numpy as np
+import pytest
+
+pytest.importorskip("bpy")
+
+ADDON_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(ADDON_DIR))
+resample = importlib.import_module(f"{os.path.basename(ADDON_DIR)}.resample")
+
+FILTER_NAMES = list(resample.FILTERS)
+
+
+@pytest.mark.parametrize("size, target, expected", [
+    ((2048, 2048), 4096, (4096, 4096)),
+    ((1024, 512), 4096, (4096, 2048)),
+    ((300, 1000), 4096, (1229, 4096)),
+    ((4096, 1), 1024, (1024, 1)),
+    ((0, 0), 4096, (0, 0)),
+])
+def test_fit_size_keeps_the_aspect_ratio(size, target, expected):
+    assert resample.fit_size(*size, target) == expected
+
+
+@pytest.mark.parametrize("filter_name", FILTER_NAMES)
+@pytest.mark.parametrize("src_size, dst_size", [(37, 100), (100, 37), (64, 64), (5, 1)])
+def test_weights_are_normalized(filter_name, src_size, dst_size):
+    indices, weights = resample.compute_weights(src_size, dst_size, filter_name)
+    assert indices.shape == weights.shape and indices.shape[0] == dst_size
+    assert indices.min() >= 0 and indices.max() < src_size
+    np.testing.assert_allclose(weights.sum(axis=1), 1.0, atol=1e-5)
+
+
+@pytest.mark.parametrize("filter_name", FILTER_NAMES)
+@pytest.mark.parametrize("width, height", [(96, 40), (13, 300), (1, 1)])
+def test_constant_image_stays_constant(filter_name, width, height):
+    src = np.empty((50, 70, 4), dtype=np.float32)
+    src[...] = (0.25, 0.5, 0.75, 1.0)
+    out = resample.resample(src, width, height, filter_name, strip_rows=16)
+    assert out.shape == (height, width, 4) and out.dtype == np.float32
+    np.testing.assert_allclose(out, np.broadcast_to(src[0, 0], out.shape), atol=1e-5)
+
+
+def test_box_downscale_averages_blocks():
+    src = np.random.default_rng(0).random((8, 12, 1), dtype=np.float32)
+    out = resample.resample(src, 6, 4, 'BOX')
+    expected = src.reshape(4, 2, 6, 2, 1).mean(axis=(1, 3))
+    np.testing.assert_allclose(out, expected, atol=1e-6)
+
+
+def test_bilinear_upscale_interpolates_a_ramp():
+    ramp = np.linspace(0.0, 1.0, 16, dtype=np.float32)
+    src = np.broadcast_to(ramp[None, :, None], (4, 16, 1)).copy()
+    out = resample.resample(src, 32, 4, 'BILINEAR')
+    # Away from the clamped borders the output is still a ramp with half the step
+    np.testing.assert_allclose(np.diff(out[0, 2:-2, 0]), (ramp[1] - ramp[0]) / 2, atol=1e-5)
+
+
+@pytest.mark.parametrize("filter_name", FILTER_NAMES)
+def test_strips_and_threads_do_not_change_the_result(filter_name):
+    src = np.random.default_rng(1).random((90, 60, 3), dtype=np.float32)
+    whole = resample.resample(src, 45, 130, filter_name, strip_rows=1000, workers=1)
+    strips = resample.resample(src, 45, 130, filter_name, strip_rows=7, workers=4)
+    np.testing.assert_allclose(strips, whole, atol=1e-6)
+
+
+def test_lanczos_is_clamped_unless_asked_not_to():
+    src = np.zeros((1, 8, 1), dtype=np.float32)
+    src[:, 4:] = 1.0
+    clamped = resample.resample(src, 32, 1, 'LANCZOS3')
+    ringing = resample.resample(src, 32, 1, 'LANCZOS3', clamp=False)
+    assert clamped.min() >= 0.0 and clamped.max() <= 1.0
+    assert ringing.min() < 0.0 and ringing.max() > 1.0
+
+
+def test_unknown_filter_is_rejected():
+    with pytest.raises(ValueError):
+        resample.resample(np.zeros((2, 2, 1), dtype=np.float32), 4, 4, 'CUBIC')
@@ -0,0 +1,192 @@
+"""
+Baked texel maps for the Tattoo Master addon
+
+For a mesh and a texture size, bakes the object-space position, the normal
+and the triangle index behind every texel of the active UV map. The maps are
+stored as .npy files named after a hash of the mesh positions, topology and
+UVs, and opened memory-mapped, so a later placement, mirror or seam lookup is
+plain array indexing. A texel holds one triangle only, so triangles whose UVs
+overlap others (mirrored or stacked islands) are flagged and rasterized
+again when stamped. A depsgraph handler drops the maps of a mesh when its
+geometry changes; the next lookup rebakes them under the new hash if needed.
+"""
+import bpy
+import os
+import shutil
+import hashlib
+import numpy as np
+from bpy.app.handlers import persistent
+from . import decal
+
+
+# The last map is written last: an entry without it (older or unfinished) is rebaked
+MAP_NAMES = ("position", "normal", "triangle", "order", "offsets", "overlapped")
+MAX_ENTRIES = 8
+BAKE_CHUNK = 16384  # Triangles rasterized per pass
+
+# Session counters
+stats = {"bakes": 0, "loads": 0}
+
+_maps = {}  # object name -> TexelMaps
+
+
+def get_cache_folder():
+    return bpy.utils.user_resource('DATAFILES', path=os.path.join("tattoo_master", "texel_maps"), create=True)
+
+
+def mesh_key(surface, width, height):
+    """Hash of the mesh data the maps are baked from."""
+    digest = hashlib.blake2b()
+    for array in (surface.local_positions, surface.triangles, surface.uvs):
+        digest.update(np.ascontiguousarray(array).tobytes())
+    digest.update(f"{width}x{height}".encode('ascii'))
+    return digest.hexdigest()
+
+
+class TexelMaps:
+    """Memory-mapped per-texel maps of one mesh at one texture size.
+
+    `position` and `normal` are (height, width, 3) float32 in object space,
+    `triangle` is (height, width) int32 with -1 for texels outside every UV
+    island. `order` lists the covered texels (flat indices) grouped by
+    triangle, with triangle t owning order[offsets[t]:offsets[t + 1]].
+    `overlapped` is a bool per triangle, set when its UVs cover texels inside
+    another triangle, so it may own only part of its texels or none.
+    """
+
+    def __init__(self, folder, key):
+        self.folder = folder
+        self.key = key
+        for name in MAP_NAMES:
+            setattr(self, name, np.load(os.path.join(folder, name + ".npy"), mmap_mode='r'))
+        self.height, self.width = self.triangle.shape
+
+    def texels_of(self, triangles):
+        """Flat indices of the texels owned by the given triangles."""
+        starts = self.offsets[triangles]
+        counts = self.offsets[np.asarray(triangles) + 1] - starts
+        if not counts.sum():
+            return np.empty(0, dtype=np.int64)
+        index = np.repeat(starts - (np.cumsum(counts) - counts), counts) + np.arange(counts.sum())
+        return self.order[index]
+
+    def lookup(self, x, y):
+        """(position, normal, triangle) behind texel coordinates."""
+        return self.position[y, x], self.normal[y, x], self.triangle[y, x]
+
+
+def bake(surface, width, height, folder):
+    """Rasterize the maps of a surface into .npy files in `folder`."""
+    os.makedirs(folder, exist_ok=True)
+    position = np.lib.format.open_memmap(os.path.join(folder, "position.npy"), 'w+', np.float32, (height, width, 3))
+    normal = np.lib.format.open_memmap(os.path.join(folder, "normal.npy"), 'w+', np.float32, (height, width, 3))
+    triangle = np.lib.format.open_memmap(os.path.join(folder, "triangle.npy"), 'w+', np.int32, (height, width))
+    triangle[:] = -1
+    flat_position = position.reshape(-1, 3)
+    flat_normal = normal.reshape(-1, 3)
+    flat_triangle = triangle.reshape(-1)
+    overlapped = np.zeros(len(surface.triangles), dtype=bool)
+
+    for start in range(0, len(surface.triangles), BAKE_CHUNK):
+        chunk = surface.triangles[start:start + BAKE_CHUNK]
+        index, x, y, weights = decal.rasterize(surface.uvs[start:start + BAKE_CHUNK], width, height)
+        corners = chunk[index]
+        flat = y * width + x
+
+        # Texel centres well inside two triangles mean overlapping UVs. Both
+        # are flagged, since the order of the writes decides which one wins.
+        # Centres on a shared edge belong to both neighbours and do not count
+        interior = weights.min(axis=1) > decal.BARY_EPSILON
+        inner_flat, inner_triangle = flat[interior], start + index[interior]
+        earlier = flat_triangle[inner_flat]
+        clash = earlier >= 0
+        overlapped[earlier[clash]] = True
+        overlapped[inner_triangle[clash]] = True
+        unique, counts = np.unique(inner_flat, return_counts=True)
+        repeated = np.isin(inner_flat, unique[counts > 1])
+        overlapped[inner_triangle[repeated]] = True
+
+        flat_triangle[flat] = start + index
+        flat_position[flat] = np.einsum('nk,nkc->nc', weights, surface.local_positions[corners])
+        normals = np.einsum('nk,nkc->nc', weights, surface.vertex_normals[corners])
+        flat_normal[flat] = normals / np.maximum(np.linalg.norm(normals, axis=1, keepdims=True), 1e-12)
+
+    # Texels grouped by triangle for texels_of()
+    covered = np.flatnonzero(flat_triangle >= 0)
+    owners = flat_triangle[covered]
+    np.save(os.path.join(folder, "order.npy"), covered[np.argsort(owners, kind='stable')])
+    offsets = np.zeros(len(surface.triangles) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(owners, minlength=len(surface.triangles)), out=offsets[1:])
+    np.save(os.path.join(folder, "offsets.npy"), offsets)
+    np.save(os.path.join(folder, "overlapped.npy"), overlapped)
+
+    for array in (position, normal, triangle):
+        array.flush()
+    del position, normal, triangle, flat_position, flat_normal, flat_triangle
+
+
+def _evict(cache, keep):
+    entries = [os.path.join(cache, name) for name in os.listdir(cache) if name != keep]
+    entries = [path for path in entries if os.path.isdir(path) and not path.endswith(".tmp")]
+    entries.sort(key=os.path.getmtime)
+    for path in entries[:max(0, len(entries) + 1 - MAX_ENTRIES)]:
+        shutil.rmtree(path, ignore_errors=True)
+
+
+def get_maps(obj, width, height, surface=None):
+    """Return the TexelMaps of an object's active UV map, baking them on first use."""
+    maps = _maps.get(obj.name)
+    if maps is not None and (maps.width, maps.height) == (width, height):
+        return maps
+
+    surface = surface or decal.MeshSurface(obj)
+    key = mesh_key(surface, width, height)
+    cache = get_cache_folder()
+    folder = os.path.join(cache, key)
+    if not os.path.exists(os.path.join(folder, MAP_NAMES[-1] + ".npy")):
+        # Baked under a temporary name so a half-written entry is never loaded
+        tmp_folder = f"{folder}.{os.getpid()}.tmp"
+        bake(surface, width, height, tmp_folder)
+        shutil.rmtree(folder, ignore_errors=True)
+        os.replace(tmp_folder, folder)
+        stats["bakes"] += 1
+        _evict(cache, key)
+    else:
+        os.utime(folder)
+        stats["loads"] += 1
+
+    maps = TexelMaps(folder, key)
+    _maps[obj.name] = maps
+    return maps
+
+
+def invalidate(obj=None):
+    if obj is None:
+        _maps.clear()
+    else:
+        _maps.pop(obj.name, None)
+
+
+@persistent
+def _on_depsgraph_update(scene, depsgraph):
+    for update in depsgraph.updates:
+        if isinstance(update.id, bpy.types.Object) and update.is_updated_geometry:
+            invalidate(update.id.original)
+
+
+@persistent
+def _on_load_post(*args):
+    invalidate()
+
+
+def register():
+    bpy.app.handlers.depsgraph_update_post.append(_on_depsgraph_update)
+    bpy.app.handlers.load_post.append(_on_load_post)
+
+
+def unregister():
+    if _on_depsgraph_update in bpy.app.handlers.depsgraph_update_post:
+        bpy.app.handlers.depsgraph_update_post.remove(_on_depsgraph_update)
+    if _on_load_post in bpy.app.handlers.load_post:
+        bpy.app.handlers.load_post.remove(_on_load_post)
+    invalidate()
@@ -0,0 +1,308 @@
+"""
+UDIM skins for the Tattoo Master addon
+
+A skin split into UDIM tiles (skin.1001.png, skin.1002.png, ...) is loaded
+as one tiled image, so it is painted as one surface across the tiles.
+Blender only reads the pixels of a tile when it is drawn or painted, and
+Python can only reach the pixels of the first tile, so resize and export
+work on the tile files instead. Each tile is loaded on its own, only when it
+has to be processed, and handed to a thread pool that resamples or encodes
+it. Painted tiles are first saved by Blender to a working tile set. Exports
+keep a hash per tile next to the files, and tiles that did not change since
+the last export are neither read nor written.
+"""
+import bpy
+import os
+import re
+import json
+import shutil
+import struct
+import hashlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from . import pixels
+from . import precision
+from . import resample
+from . import import_cache
+
+
+TOKEN = "<UDIM>"
+MANIFEST_SUFFIX = ".json"
+WORKING_SUFFIX = "_painted"
+
+# name.1001.png; name_1024.png is far more likely a resolution than a tile
+TILE_PATTERN = re.compile(r"^(.*\.)(1\d{3})(\.[^.]+)$")
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+# File digests by path, size and mtime, so an unchanged tile is only hashed once per session
+_hash_index = {"hashes": {}}
+
+
+def is_tiled(image):
+    return image is not None and image.source == 'TILED'
+
+
+def token_path(filepath):
+    """The path of a tile set with the tile number replaced by the UDIM token, or None."""
+    if TOKEN in filepath:
+        return filepath
+    folder, name = os.path.split(filepath)
+    match = TILE_PATTERN.match(name)
+    if not match or int(match.group(2)) < 1001:
+        return None
+    return os.path.join(folder, match.group(1) + TOKEN + match.group(3))
+
+
+def tile_path(token, number):
+    return token.replace(TOKEN, str(number))
+
+
+def tile_files(filepath):
+    """{tile number: file} of every tile of the set a path belongs to."""
+    token = token_path(filepath)
+    if token is None:
+        return {}
+    folder, name = os.path.split(token)
+    prefix, suffix = name.split(TOKEN)
+    pattern = re.compile(re.escape(prefix) + r"(1\d{3})" + re.escape(suffix) + "$")
+    try:
+        names = os.listdir(folder or ".")
+    except OSError:
+        return {}
+    return {
+        int(match.group(1)): os.path.join(folder, entry)
+        for entry in names
+        for match in [pattern.match(entry)]
+        if match and int(match.group(1)) >= 1001
+    }
+
+
+def is_udim_path(filepath):
+    """True when a path names a tile of a set of more than one tile, or holds the UDIM token."""
+    filepath = bpy.path.abspath(filepath)
+    return TOKEN in filepath or len(tile_files(filepath)) > 1
+
+
+def file_key(filepath, resolution, colorspace='sRGB'):
+    """Key of a tile set loaded at a target resolution; raises OSError when no tile exists."""
+    files = tile_files(bpy.path.abspath(filepath))
+    if not files:
+        raise OSError(f"No UDIM tiles found for {filepath}")
+    digest = hashlib.sha256()
+    for number, path in sorted(files.items()):
+        digest.update(f"{number}:{import_cache.file_digest(path, _hash_index)}".encode('utf-8'))
+    return f"udim:{digest.hexdigest()}|{colorspace}|{resolution}"
+
+
+def load_skin_tiles(filepath, target_resolution):
+    """Load a UDIM skin as a tiled image, upscaling tiles smaller than the target resolution."""
+    image = bpy.data.images.load(token_path(bpy.path.abspath(filepath)))
+    if not is_tiled(image):
+        image.source = 'TILED'
+    image = precision.apply(image)
+    resize_tiles(image, target_resolution)
+    return image
+
+
+def covered_tiles(obj):
+    """UDIM tile numbers the active UV map of a mesh reaches into."""
+    uv_layer = obj.data.uv_layers.active
+    if not uv_layer or not len(uv_layer.data):
+        return set()
+    uvs = np.empty(len(uv_layer.data) * 2, dtype=np.float32)
+    uv_layer.data.foreach_get("uv", uvs)
+    # Points on a tile's upper or right border belong to the tile, not the next one
+    cells = np.ceil(uvs.reshape(-1, 2) - 1.0).clip(0, 9).astype(np.int32)
+    return set((1001 + cells[:, 0] + 10 * cells[:, 1]).tolist())
+
+
+def missing_tiles(obj, image):
+    """Tiles the mesh UVs reach that the image has no tile for; paint there goes nowhere."""
+    return sorted(covered_tiles(obj) - {tile.number for tile in image.tiles})
+
+
+def sibling_path(image, suffix):
+    """Tile set path next to the image's tiles, named after them with `suffix` added once."""
+    source = bpy.path.abspath(image.filepath_raw)
+    folder, name = os.path.split(token_path(source) or source)
+    stem = (name.split(TOKEN)[0] if TOKEN in name else os.path.splitext(name)[0]).rstrip('._')
+    if not stem.endswith(suffix):
+        stem += suffix
+    return os.path.join(folder, f"{stem}.{TOKEN}.png")
+
+
+def tile_sources(image):
+    """{tile number: file} holding the current pixels of every tile.
+
+    Painted tiles only exist in memory, so a dirty image is first saved by
+    Blender to a working tile set next to its source tiles (never over them)
+    and points there from then on.
+    """
+    if image.is_dirty:
+        working = sibling_path(image, WORKING_SUFFIX)
+        image.file_format = 'PNG'
+        image.save(filepath=working)
+        image.filepath_raw = working
+    return tile_files(bpy.path.abspath(image.filepath_raw))
+
+
+def tile_size(path):
+    """(width, height) of a tile file, read from the PNG or TGA header when it has one.
+
+    Other formats are loaded by Blender to get their size.
+    """
+    try:
+        with open(path, 'rb') as f:
+            header = f.read(24)
+    except OSError:
+        header = b""
+    if header[:8] == PNG_SIGNATURE and header[12:16] == b"IHDR":
+        return struct.unpack(">II", header[16:24])
+    if path.lower().endswith(".tga") and len(header) >= 18:
+        return struct.unpack("<HH", header[12:16])
+    image = bpy.data.images.load(path)
+    try:
+        return tuple(image.size)
+    finally:
+        bpy.data.images.remove(image)
+
+
+def read_tile(path):
+    """Bottom-up RGBA uint8 pixels of one tile file, loaded only for this read."""
+    image = bpy.data.images.load(path)
+    try:
+        return pixels.snapshot_uint8(image)
+    finally:
+        bpy.data.images.remove(image)
+
+
+def run_tiles(sources, read, job, workers=None):
+    """Read tiles one at a time and run `job(number, path, data)` on them in a thread pool.
+
+    Blender data may only be touched from the main thread, so `read(path)`
+    runs here. At most `workers` tiles are held in memory at once. Returns
+    {tile number: job result}.
+    """
+    workers = workers or resample.default_workers()
+    results = {}
+    pending = deque()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for number, path in sorted(sources.items()):
+            if len(pending) >= workers:
+                done, future = pending.popleft()
+                results[done] = future.result()
+            pending.append((number, pool.submit(job, number, path, read(path))))
+        for number, future in pending:
+            results[number] = future.result()
+    return results
+
+
+def relink(image, token, file_format=None):
+    """Point a tiled image at a tile set on disk and reload its tiles from there."""
+    image.filepath_raw = token
+    if file_format:
+        image.file_format = file_format
+    image.reload()
+
+
+def resize_tiles(image, resolution, workers=None):
+    """Upscale the tiles smaller than `resolution` into a new tile set next to the source.
+
+    Tile sizes are read from the file headers first; nothing is decoded or
+    written when every tile is big enough. Returns the number of tiles resampled.
+    """
+    filter_name, default_workers = pixels.resample_settings()
+    sources = tile_sources(image)
+    small = {path for path in sources.values() if max(tile_size(path)) < resolution}
+    if not small:
+        return 0
+    target = sibling_path(image, f"_{resolution}")
+
+    def read(path):
+        # Tiles already big enough are copied as they are
+        return read_tile(path) if path in small else None
+
+    def job(number, path, rgba):
+        destination = tile_path(target, number)
+        if rgba is None:
+            if os.path.abspath(path) != os.path.abspath(destination):
+                shutil.copyfile(path, destination)
+            return False
+        height, width = rgba.shape[:2]
+        new_width, new_height = resample.fit_size(width, height, resolution)
+        out = resample.resample(rgba.astype(np.float32) * (1.0 / 255.0), new_width, new_height,
+                                filter_name=filter_name, workers=1)
+        out = np.clip(out * 255.0 + 0.5, 0.0, 255.0).astype(np.uint8)
+        pixels.encode_file(destination, out, 'PNG')
+        return True
+
+    resized = run_tiles(sources, read, job, workers or default_workers)
+    relink(image, target, 'PNG')
+    return sum(resized.values())
+
+
+def export_path(filepath):
+    """Tile set path of an export path: skin.png is written as skin.<UDIM>.png."""
+    token = token_path(filepath)
+    if token:
+        return token
+    base, extension = os.path.splitext(filepath)
+    return f"{base}.{TOKEN}{extension}"
+
+
+def manifest_path(token):
+    return os.path.splitext(token)[0].replace(TOKEN, "udim") + MANIFEST_SUFFIX
+
+
+def read_manifest(token):
+    try:
+        with open(manifest_path(token), 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {"format": None, "tiles": {}}
+
+
+def write_manifest(token, manifest):
+    path = manifest_path(token)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=1)
+    os.replace(tmp_path, path)
+
+
+def export_tiles(image, filepath, file_format, workers=None, relink_image=True, **options):
+    """Write every tile of a tiled image, skipping tiles unchanged since the last export.
+
+    Tiles are compared by a hash of their source file, so an unchanged tile
+    is not even decoded. Returns (written, skipped) lists of tile paths.
+    """
+    target = export_path(os.path.abspath(filepath))
+    manifest = read_manifest(target)
+    signature = json.dumps([file_format, options], sort_keys=True)
+    previous = manifest["tiles"] if manifest.get("format") == signature else {}
+    manifest = {"format": signature, "tiles": {}}
+
+    changed, skipped = {}, []
+    for number, path in tile_sources(image).items():
+        digest = import_cache.file_digest(path, _hash_index)
+        manifest["tiles"][str(number)] = digest
+        destination = tile_path(target, number)
+        # After a lossless export the image reads its tiles from the exported files themselves
+        same_file = os.path.abspath(path) == os.path.abspath(destination)
+        if same_file or previous.get(str(number)) == digest and os.path.exists(destination):
+            skipped.append(destination)
+        else:
+            changed[number] = path
+
+    def job(number, path, rgba):
+        pixels.encode_file(tile_path(target, number), rgba, file_format, **options)
+
+    run_tiles(changed, read_tile, job, workers or pixels.resample_settings()[1])
+    written = [tile_path(target, number) for number in sorted(changed)]
+
+    write_manifest(target, manifest)
+    if relink_image and file_format in pixels.LOSSLESS_FORMATS:
+        relink(image, target, file_format)
+    return written, skipped
@@ -0,0 +1,360 @@
+"""
+Incremental USD export for the Tattoo Master addon
+
+Every texture and every object is written to its own file in a folder next
+to the USD file, and a manifest records a content hash for each of them.
+Later exports to the same file only rewrite the assets whose hash changed.
+The USD file itself is a small root layer listing the per-object layers as
+sublayers, and the materials of those layers point at the texture files
+already on disk.
+"""
+import bpy
+import os
+import json
+import time
+import hashlib
+from contextlib import contextmanager
+import numpy as np
+from . import helpers
+from . import overlay
+from . import pixels
+from . import udim
+from . import profiling
+
+
+ASSET_DIR_SUFFIX = "_assets"
+TEXTURE_DIR = "textures"
+OBJECT_DIR = "objects"
+MANIFEST_SUFFIX = ".manifest.json"
+
+
+class ExportReport:
+    """What an incremental export wrote and what it skipped."""
+
+    def __init__(self):
+        self.written = []
+        self.skipped = []
+        self.bytes_written = 0
+        self.bytes_skipped = 0
+        self.seconds = 0.0
+        self.full_seconds = 0.0  # Estimated time of a full export
+
+    @property
+    def seconds_saved(self):
+        return max(0.0, self.full_seconds - self.seconds)
+
+    def summary(self):
+        return (f"wrote {len(self.written)} of {len(self.written) + len(self.skipped)} assets "
+                f"({self.bytes_written / (1024 * 1024):.1f} MB), "
+                f"saved {self.seconds_saved:.1f}s and {self.bytes_skipped / (1024 * 1024):.1f} MB "
+                f"compared with a full export")
+
+
+# ---------------------------------------------------------------------------
+# Manifest
+
+
+def manifest_path(filepath):
+    return os.path.splitext(filepath)[0] + MANIFEST_SUFFIX
+
+
+def read_manifest(filepath):
+    try:
+        with open(manifest_path(filepath), 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {"assets": {}}
+
+
+def write_manifest(filepath, manifest):
+    path = manifest_path(filepath)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=1)
+    os.replace(tmp_path, path)
+
+
+def _is_current(entry, digest, folder, relpath):
+    return entry is not None and entry["hash"] == digest and os.path.exists(os.path.join(folder, relpath))
+
+
+# ---------------------------------------------------------------------------
+# Content hashes
+
+
+def _update(digest, array):
+    pixels.update_hash(digest, array)
+
+
+def texture_hash(image, composite=None):
+    """Return (hash, RGBA snapshot or None) of the pixels a texture would be written with.
+
+    A saved image that was not painted since is hashed by its file stats,
+    so its pixels are only read when the file has to be written.
+    """
+    if composite is None and image.source == 'FILE' and not image.is_dirty and not image.packed_file:
+        path = bpy.path.abspath(image.filepath_raw)
+        if os.path.exists(path):
+            stat = os.stat(path)
+            token = f"{os.path.abspath(path)}:{stat.st_size}:{stat.st_mtime}"
+            return hashlib.blake2b(token.encode('utf-8')).hexdigest(), None
+
+    rgba = pixels.snapshot_uint8(image, composite)
+    digest = hashlib.blake2b()
+    _update(digest, np.array(rgba.shape, dtype=np.int64))
+    _update(digest, rgba)
+    return digest.hexdigest(), rgba
+
+
+def _material_signature(material):
+    """Node types, names, input values and links of a material, as JSON-friendly data."""
+    if not material or not material.use_nodes:
+        return material.name if material else None
+    nodes = []
+    for node in material.node_tree.nodes:
+        inputs = []
+        for socket in node.inputs:
+            value = getattr(socket, "default_value", None)
+            if value is not None and not isinstance(value, (int, float, str)):
+                value = [round(v, 6) for v in value]
+            elif isinstance(value, float):
+                value = round(value, 6)
+            inputs.append(value)
+        image = node.image.name if node.type == 'TEX_IMAGE' and node.image else None
+        nodes.append([node.name, node.bl_idname, image, inputs])
+    links = [[link.from_node.name, link.from_socket.identifier, link.to_node.name, link.to_socket.identifier]
+             for link in material.node_tree.links]
+    return [material.name, sorted(nodes, key=lambda n: n[0]), sorted(links)]
+
+
+def object_hash(obj, depsgraph, texture_paths):
+    """Hash of everything the USD layer of one object is written from."""
+    digest = hashlib.blake2b()
+    digest.update(obj.name.encode('utf-8'))
+    digest.update(obj.type.encode('utf-8'))
+    _update(digest, np.array(obj.matrix_world, dtype=np.float32))
+
+    if obj.type == 'MESH':
+        evaluated = obj.evaluated_get(depsgraph)
+        mesh = evaluated.to_mesh()
+        try:
+            arrays = [
+                (mesh.vertices, "co", np.float32, 3),
+                (mesh.loops, "vertex_index", np.int32, 1),
+                (mesh.polygons, "loop_total", np.int32, 1),
+                (mesh.polygons, "material_index", np.int32, 1),
+            ]
+            arrays += [(layer.data, "uv", np.float32, 2) for layer in mesh.uv_layers]
+            for collection, attribute, dtype, width in arrays:
+                values = np.empty(len(collection) * width, dtype=dtype)
+                collection.foreach_get(attribute, values)
+                _update(digest, values)
+        finally:
+            evaluated.to_mesh_clear()
+
+    materials = [_material_signature(slot.material) for slot in obj.material_slots]
+    digest.update(json.dumps([materials, texture_paths], sort_keys=True).encode('utf-8'))
+    return digest.hexdigest()
+
+
+# ---------------------------------------------------------------------------
+# Writers
+
+
+def image_nodes(obj):
+    """Image texture nodes of every material on the object, tattoo layer nodes excluded."""
+    for slot in obj.material_slots:
+        material = slot.material
+        if material and material.use_nodes:
+            for node in material.node_tree.nodes:
+                if node.type == 'TEX_IMAGE' and node.image and not node.name.startswith(overlay.LAYER_NODE):
+                    yield node
+
+
+@contextmanager
+def textures_swapped(swaps):
+    """Point image nodes at the exported texture files while the USD layers are written."""
+    originals = []
+    loaded = []
+    try:
+        for node, filepath in swaps:
+            image = bpy.data.images.load(filepath, check_existing=True)
+            if image not in loaded:
+                loaded.append(image)
+            originals.append((node, node.image))
+            node.image = image
+        yield
+    finally:
+        for node, image in originals:
+            node.image = image
+        for image in loaded:
+            if image.users == 0:
+                bpy.data.images.remove(image)
+
+
+@contextmanager
+def only_selected(obj):
+    """Select just `obj` for the duration of a selected-objects-only export."""
+    view_layer = bpy.context.view_layer
+    selection = [o for o in view_layer.objects if o.select_get()]
+    active = view_layer.objects.active
+    for o in selection:
+        o.select_set(False)
+    obj.select_set(True)
+    view_layer.objects.active = obj
+    try:
+        yield
+    finally:
+        obj.select_set(False)
+        for o in selection:
+            o.select_set(True)
+        view_layer.objects.active = active
+
+
+def write_object_layer(obj, filepath):
+    with only_selected(obj), profiling.measure("wm.usd_export"):
+        bpy.ops.wm.usd_export(
+            filepath=filepath,
+            selected_objects_only=True,
+            export_materials=True,
+            export_textures=False,
+            relative_paths=True
+        )
+
+
+def write_root_layer(filepath, layer_paths):
+    """Write the USD file as a root layer that sublayers every object layer."""
+    from pxr import Sdf
+
+    layer = Sdf.Layer.CreateAnonymous(os.path.splitext(filepath)[1])
+    for path in layer_paths:
+        layer.subLayerPaths.append(path)
+
+    # Stage metadata of sublayers is ignored, so carry it over to the root
+    if layer_paths:
+        first = Sdf.Layer.FindOrOpen(os.path.join(os.path.dirname(filepath), layer_paths[0]))
+        if first:
+            for key in ("upAxis", "metersPerUnit", "defaultPrim"):
+                if first.pseudoRoot.HasInfo(key):
+                    layer.pseudoRoot.SetInfo(key, first.pseudoRoot.GetInfo(key))
+    layer.Export(filepath)
+
+
+def _write_asset(report, manifest, relpath, digest, folder, write):
+    start = time.perf_counter()
+    write(os.path.join(folder, relpath))
+    seconds = time.perf_counter() - start
+    size = os.path.getsize(os.path.join(folder, relpath))
+    manifest["assets"][relpath] = {"hash": digest, "bytes": size, "seconds": seconds}
+    report.written.append(relpath)
+    report.bytes_written += size
+    report.full_seconds += seconds
+
+
+def _skip_asset(report, entry, relpath):
+    report.skipped.append(relpath)
+    report.bytes_skipped += entry["bytes"]
+    report.full_seconds += entry["seconds"]
+
+
+def _write_tiles(report, manifest, entry, relpath, folder, image):
+    """Export the tiles of a UDIM texture, writing only the tiles that changed."""
+    start = time.perf_counter()
+    written, skipped = udim.export_tiles(image, os.path.join(folder, relpath), 'PNG', relink_image=False)
+    seconds = time.perf_counter() - start
+    for path in written:
+        report.written.append(os.path.relpath(path, folder))
+        report.bytes_written += os.path.getsize(path)
+    for path in skipped:
+        report.skipped.append(os.path.relpath(path, folder))
+        report.bytes_skipped += os.path.getsize(path)
+
+    # Time of writing every tile, from the tiles written now or the last full estimate
+    if written:
+        full_seconds = seconds * (len(written) + len(skipped)) / len(written)
+    else:
+        full_seconds = entry["seconds"] if entry else seconds
+    report.full_seconds += full_seconds
+    manifest["assets"][relpath] = {
+        "hash": udim.TOKEN,
+        "bytes": sum(os.path.getsize(path) for path in written + skipped),
+        "seconds": full_seconds,
+    }
+
+
+def export(filepath, objects):
+    """Export `objects` to `filepath`, rewriting only what changed since the last export."""
+    start = time.perf_counter()
+    filepath = os.path.abspath(filepath)
+    folder = os.path.dirname(filepath)
+    extension = os.path.splitext(filepath)[1]
+    # One asset folder per USD file, so exports sharing a folder never clean up each other's files
+    assets = bpy.path.clean_name(os.path.splitext(os.path.basename(filepath))[0]) + ASSET_DIR_SUFFIX
+    os.makedirs(os.path.join(folder, assets, TEXTURE_DIR), exist_ok=True)
+    os.makedirs(os.path.join(folder, assets, OBJECT_DIR), exist_ok=True)
+
+    manifest = read_manifest(filepath)
+    previous = manifest["assets"]
+    manifest["assets"] = {}
+    report = ExportReport()
+
+    # Textures first: object layers reference their paths
+    swaps = []
+    texture_paths = {}
+    for obj in objects:
+        skin = helpers.get_active_image_texture_node(obj)
+        composite = overlay.compositor(obj) if skin else None
+        for node in image_nodes(obj):
+            node_composite = composite if node == skin else None
+            name = bpy.path.clean_name(node.image.name) + ("_Tattooed" if node_composite else "")
+            if udim.is_tiled(node.image):
+                relpath = f"{assets}/{TEXTURE_DIR}/{name}.{udim.TOKEN}.png"
+                if relpath not in manifest["assets"]:
+                    _write_tiles(report, manifest, previous.get(relpath), relpath, folder, node.image)
+                swaps.append((node, os.path.join(folder, relpath)))
+                texture_paths[node.image.name] = relpath
+                continue
+            relpath = f"{assets}/{TEXTURE_DIR}/{name}.png"
+            if relpath not in manifest["assets"]:
+                digest, rgba = texture_hash(node.image, node_composite)
+                entry = previous.get(relpath)
+                if _is_current(entry, digest, folder, relpath):
+                    manifest["assets"][relpath] = entry
+                    _skip_asset(report, entry, relpath)
+                else:
+                    if rgba is None:
+                        rgba = pixels.snapshot_uint8(node.image)
+                    _write_asset(report, manifest, relpath, digest, folder,
+                                 lambda path: pixels.encode_file(path, rgba, 'PNG'))
+            swaps.append((node, os.path.join(folder, relpath)))
+            texture_paths[node.image.name] = relpath
+
+    # Hash before the swap: the images loaded for it may get suffixed names
+    depsgraph = bpy.context.evaluated_depsgraph_get()
+    digests = [object_hash(obj, depsgraph, texture_paths) for obj in objects]
+
+    layer_paths = []
+    with textures_swapped(swaps):
+        for obj, digest in zip(objects, digests):
+            relpath = f"{assets}/{OBJECT_DIR}/{bpy.path.clean_name(obj.name)}{extension}"
+            entry = previous.get(relpath)
+            if _is_current(entry, digest, folder, relpath):
+                manifest["assets"][relpath] = entry
+                _skip_asset(report, entry, relpath)
+            else:
+                _write_asset(report, manifest, relpath, digest, folder,
+                             lambda path: write_object_layer(obj, path))
+            layer_paths.append(relpath)
+
+    write_root_layer(filepath, layer_paths)
+
+    # Files of assets that are no longer exported
+    for relpath in set(previous) - set(manifest["assets"]):
+        try:
+            os.remove(os.path.join(folder, relpath))
+        except OSError:
+            pass
+
+    write_manifest(filepath, manifest)
+    report.seconds = time.perf_counter() - start
+    return report
@@ -0,0 +1,307 @@
+"""
+Warm Blender worker pool for the Tattoo Master addon
+
+A small localhost TCP server keeps background Blender processes running with
+the addon registered and hands them batch jobs, so the Blender startup,
+addon registration and repeated FBX parsing are paid once per worker instead
+of once per job. Start the server from Blender:
+
+    blender -b --python-expr "import tattoo_master.worker_pool as w; w.main()" -- --workers 4
+
+and submit jobs (same format as a batch manifest entry) with `submit()`.
+Messages are newline-delimited JSON.
+"""
+import bpy
+import os
+import sys
+import json
+import time
+import queue
+import socket
+import argparse
+import importlib
+import threading
+import subprocess
+import socketserver
+from . import helpers
+from . import batch
+
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 47820
+
+
+def send_message(stream, message):
+    """Write one JSON message to a socket stream."""
+    stream.write((json.dumps(message) + "\n").encode('utf-8'))
+    stream.flush()
+
+
+def recv_message(stream):
+    """Read one JSON message from a socket stream, or None when it is closed."""
+    line = stream.readline()
+    if not line:
+        return None
+    return json.loads(line.decode('utf-8'))
+
+
+# ---------------------------------------------------------------------------
+# Worker side (runs inside each warm background Blender)
+
+# (fbx path, mtime) -> [(object name, mesh, matrix_world)]
+_mesh_cache = {}
+# (stencil path, mtime, resize) -> RGBA float32 array
+_stencil_cache = {}
+
+
+def _file_key(path):
+    return os.path.abspath(path), os.path.getmtime(path)
+
+
+def cached_import(job):
+    """Import the job's FBX, reusing meshes already imported by this worker.
+
+    Only mesh objects are cached; they are recreated in their imported pose,
+    which is all texture work needs.
+    """
+    key = _file_key(job["fbx"])
+    entries = _mesh_cache.get(key)
+    if entries is None:
+        obj = batch.import_job_object(job)
+        entries = []
+        for scene_obj in bpy.context.scene.objects:
+            if scene_obj.type == 'MESH':
+                mesh = scene_obj.data.copy()
+                mesh.use_fake_user = True
+                entries.append((scene_obj.name, mesh, scene_obj.matrix_world.copy()))
+        _mesh_cache[key] = entries
+        return obj
+
+    for name, mesh, matrix in entries:
+        obj = bpy.data.objects.new(name, mesh.copy())
+        obj.matrix_world = matrix
+        bpy.context.scene.collection.objects.link(obj)
+    bpy.context.view_layer.update()
+
+    obj = batch._target_object(job["target"]) or helpers.get_inzoi_body_object()
+    if not obj:
+        raise RuntimeError(f"No body object found in {job['fbx']}")
+    return obj
+
+
+def cached_stencil(placement):
+    """Return stencil pixels, loading the stencil only the first time."""
+    key = _file_key(placement["image"]) + (bool(placement.get("resize", False)),)
+    stencil = _stencil_cache.get(key)
+    if stencil is None:
+        stencil = batch.load_stencil(placement).copy()
+        _stencil_cache[key] = stencil
+    return stencil
+
+
+def reset_scene():
+    """Remove everything a job created while keeping the worker caches."""
+    if bpy.context.mode != 'OBJECT':
+        bpy.ops.object.mode_set(mode='OBJECT')
+    bpy.data.batch_remove(list(bpy.data.objects))
+    # Cached meshes carry a fake user and survive the purge
+    bpy.data.orphans_purge(do_local_ids=True, do_recursive=True)
+
+
+def _register_addon():
+    package = __package__
+    try:
+        import addon_utils
+        addon_utils.enable(package, default_set=True)
+    except Exception:
+        importlib.import_module(package).register()
+
+
+def worker_main(argv=None):
+    """Entry point of a warm worker: connect to the server and run jobs until told to stop."""
+    argv = argv if argv is not None else sys.argv[sys.argv.index("--") + 1:]
+    host, port, preload = argv[0], int(argv[1]), argv[2:]
+
+    bpy.ops.wm.read_factory_settings(use_empty=True)
+    _register_addon()
+    for fbx in preload:
+        try:
+            cached_import({"fbx": fbx, "target": "body"})
+        except Exception as e:
+            print(f"Tattoo Master: could not preload {fbx}: {e}")
+        reset_scene()
+
+    with socket.create_connection((host, port)) as sock:
+        stream = sock.makefile('rwb')
+        send_message(stream, {"op": "worker", "pid": os.getpid()})
+        while True:
+            message = recv_message(stream)
+            if message is None or message.get("op") == "shutdown":
+                break
+
+            job = message.get("job")
+            result = {"status": "failed"}
+            start = time.perf_counter()
+            try:
+                result["id"] = job["id"]
+                result["timings"] = batch.run_job(job, message["output"],
+                                                  importer=cached_import, stencil_loader=cached_stencil)
+                result["status"] = "done"
+            except Exception as e:
+                result["error"] = str(e)
+            finally:
+                reset_scene()
+            result["worker_time"] = time.perf_counter() - start
+            result["output"] = message["output"]
+            send_message(stream, result)
+
+
+# ---------------------------------------------------------------------------
+# Server side
+
+
+class _PendingJob:
+    def __init__(self, job, output):
+        self.job = job
+        self.output = output
+        self.submitted = time.perf_counter()
+        self.result = None
+        self.done = threading.Event()
+
+    def finish(self, result):
+        self.result = result
+        self.done.set()
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        message = recv_message(self.rfile)
+        if message is None:
+            return
+        op = message.get("op")
+        if op == "worker":
+            self._serve_worker()
+        elif op == "submit":
+            self._serve_client(message)
+        elif op == "status":
+            send_message(self.wfile, self.server.status())
+
+    def _serve_worker(self):
+        self.server.worker_connected(+1)
+        try:
+            while True:
+                pending = self.server.jobs.get()
+                if pending is None:
+                    send_message(self.wfile, {"op": "shutdown"})
+                    return
+                try:
+                    send_message(self.wfile, {"op": "job", "job": pending.job, "output": pending.output})
+                    result = recv_message(self.rfile)
+                except OSError:
+                    result = None
+                if result is None:
+                    pending.finish({"id": pending.job.get("id"), "status": "failed", "error": "Worker connection lost"})
+                    return
+                pending.finish(result)
+        finally:
+            self.server.worker_connected(-1)
+
+    def _serve_client(self, message):
+        job = message.get("job")
+        try:
+            # Paths were made absolute by submit(), so the server's directory does not matter
+            job = batch.prepare_job(dict(job), os.getcwd())
+            output = message["output"]
+        except (TypeError, ValueError, KeyError) as e:
+            job_id = job.get("id") if isinstance(job, dict) else None
+            send_message(self.wfile, {"id": job_id, "status": "failed", "error": f"Invalid job: {e}"})
+            return
+        pending = _PendingJob(job, output)
+        self.server.jobs.put(pending)
+        pending.done.wait()
+        result = dict(pending.result)
+        result["latency"] = time.perf_counter() - pending.submitted
+        send_message(self.wfile, result)
+
+
+class JobServer(socketserver.ThreadingTCPServer):
+    """Localhost job server that feeds a pool of warm Blender workers."""
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self, host=DEFAULT_HOST, port=DEFAULT_PORT, preload=()):
+        super().__init__((host, port), _Handler)
+        self.jobs = queue.Queue()
+        self.preload = list(preload)
+        self.processes = []
+        self.workers = 0
+        self._workers_changed = threading.Condition()
+
+    def worker_connected(self, delta):
+        with self._workers_changed:
+            self.workers += delta
+            self._workers_changed.notify_all()
+
+    def wait_for_workers(self, count, timeout=None):
+        """Block until `count` workers are connected; return whether they are."""
+        with self._workers_changed:
+            return self._workers_changed.wait_for(lambda: self.workers >= count, timeout)
+
+    def status(self):
+        return {"workers": self.workers, "queued": self.jobs.qsize(), "processes": len(self.processes)}
+
+    def start_workers(self, count, blender=None):
+        """Launch `count` background Blender workers that connect back to this server."""
+        host, port = self.server_address[:2]
+        for _ in range(count):
+            command = batch.blender_command("worker_pool", "worker_main", [host, port] + self.preload, blender)
+            self.processes.append(subprocess.Popen(command, stdout=subprocess.DEVNULL))
+
+    def stop_workers(self, timeout=10.0):
+        """Ask every worker to exit and wait for the processes."""
+        for _ in self.processes:
+            self.jobs.put(None)
+        for process in self.processes:
+            try:
+                process.wait(timeout)
+            except subprocess.TimeoutExpired:
+                process.kill()
+        self.processes = []
+
+
+def submit(job, output, host=DEFAULT_HOST, port=DEFAULT_PORT, timeout=None, base_dir=None):
+    """Send a job to a running server and wait for its result record.
+
+    The job is validated and its relative paths resolved against `base_dir`
+    (the current directory by default) before it is sent.
+    """
+    job = batch.prepare_job(dict(job), base_dir or os.getcwd())
+    with socket.create_connection((host, port), timeout=timeout) as sock:
+        stream = sock.makefile('rwb')
+        send_message(stream, {"op": "submit", "job": job, "output": output})
+        return recv_message(stream)
+
+
+def main(argv=None):
+    """Command line entry point of the warm worker server."""
+    if argv is None:
+        argv = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else []
+
+    parser = argparse.ArgumentParser(prog="tattoo_master.worker_pool", description="Serve tattoo jobs to warm Blender workers")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("-w", "--workers", type=int, default=os.cpu_count() or 1, help="Number of warm Blender workers")
+    parser.add_argument("--preload", nargs="*", default=[], help="FBX files every worker imports before serving")
+    parser.add_argument("--blender", default=None, help="Blender executable for the workers")
+    args = parser.parse_args(argv)
+
+    server = JobServer(args.host, args.port, args.preload)
+    server.start_workers(args.workers, args.blender)
+    print(f"Tattoo Master: serving on {args.host}:{args.port} with {args.workers} workers")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop_workers()
+        server.server_close()